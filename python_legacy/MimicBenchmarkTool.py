@@ -3,6 +3,7 @@
 import csv
 import time
 import os
+import threading
 from datetime import datetime
 from typing import List, Dict
 from dataclasses import dataclass, field
@@ -10,6 +11,13 @@ import math
 import statistics
 from pathlib import Path
 
+import numpy as np
+
+from analysis.pollscan import scan_poll_rate
+from analysis.bootstrap import bootstrap_diagnostics
+from analysis.longmemory import long_memory
+from analysis.joint import JointDensity, from_pairs
+
 try:
     from pynput import mouse
     PYNPUT_AVAILABLE = True
@@ -54,14 +62,21 @@ class ClickSession:
     double_click_threshold: float = 0.05  # 50ms threshold
     technique: str = "unlabelled"   # butterfly / jitter / normal -- lets the
                                     # clicker fit each style as its own state
-
-    def add_click(self, button: str = "LEFT"):
-        """Record a click event"""
-        current_time = time.time()
+    # (hold, next interval) pairs, filled press by press during capture.
+    joint: JointDensity = field(default_factory=JointDensity, repr=False, compare=False)
+    # diagnostics_ci() result as (click count, CIs); the lock keeps a
+    # background warm-up and an export from running the bootstrap twice.
+    _ci: tuple = field(default=None, repr=False, compare=False)
+    _ci_lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def add_click(self, button: str = "LEFT", t: float = None):
+        """Record a click event (at time t, if the input source stamped one)"""
+        current_time = time.time() if t is None else t
         click_num = len(self.clicks) + 1
         delay_ms = 0.0
         if self.clicks:
             delay_ms = (current_time - self.clicks[-1].timestamp) * 1000
+            self.joint.add(self.clicks[-1].hold_ms, delay_ms)
 
         click_event = ClickEvent(
             click_number=click_num,
@@ -72,7 +87,7 @@ class ClickSession:
         self.clicks.append(click_event)
         return True
 
-    def close_click(self):
+    def close_click(self, t: float = None):
         """Stamp the hold duration onto the most recent click, on release.
 
         Button hold time is a first-class anti-cheat signal and was previously
@@ -80,7 +95,8 @@ class ClickSession:
         clicker's hold model had no measured data behind it at all.
         """
         if self.clicks and self.clicks[-1].hold_ms == 0.0:
-            self.clicks[-1].hold_ms = (time.time() - self.clicks[-1].timestamp) * 1000
+            now = time.time() if t is None else t
+            self.clicks[-1].hold_ms = (now - self.clicks[-1].timestamp) * 1000
             return True
         return False
 
@@ -270,34 +286,23 @@ class ClickSession:
         return result
 
     @staticmethod
-    def estimate_poll_rate(delays: List[float]) -> Dict:
+    def estimate_poll_rate(delays: List[float], with_spectrum: bool = False) -> Dict:
         """Infer the mouse's USB polling rate from interval quantization.
 
         A mouse can only raise an event on a polling boundary, so intervals
-        cluster near multiples of 1000/rate ms. Scoring each candidate rate by
+        cluster near multiples of 1000/rate ms. Scoring candidate rates by
         the circular concentration of the residuals recovers the rate, which
         is what the clicker needs for Config.POLL_RATE_HZ.
+
+        Used to score only 125/250/500/1000 Hz. Now a dense scan of thousands
+        of rates from 100 Hz to 10 kHz (see analysis.pollscan), so 2-8 kHz
+        mice and off-nominal clocks are found too. poll_scores still lists
+        the standard rates; with_spectrum adds the whole scan as arrays.
         """
         out = {'poll_rate_hz': None, 'poll_confidence': 0.0, 'poll_scores': {}}
         if len(delays) < 30:
             return out
-
-        best, best_score = None, 0.0
-        for hz in (125, 250, 500, 1000):
-            grid = 1000.0 / hz
-            ang = [2.0 * math.pi * (d / grid) for d in delays]
-            c = sum(math.cos(a) for a in ang) / len(ang)
-            s = sum(math.sin(a) for a in ang) / len(ang)
-            r = math.sqrt(c * c + s * s)          # mean resultant length, 0..1
-            z = len(delays) * r * r               # Rayleigh statistic
-            out['poll_scores'][hz] = round(z, 1)
-            if z > best_score:
-                best, best_score = hz, z
-
-        # Rayleigh z above ~10 is strong evidence against uniform scatter.
-        if best_score >= 10.0:
-            out['poll_rate_hz'] = best
-            out['poll_confidence'] = round(min(1.0, best_score / 50.0), 2)
+        out.update(scan_poll_rate(delays, with_spectrum=with_spectrum))
         return out
 
     @staticmethod
@@ -343,6 +348,11 @@ class ClickSession:
             'cv': round(sd / mean, 3) if mean else 0.0,
         }
 
+    def _hold_pairs(self) -> List[tuple]:
+        """(hold_ms, following delay_ms) for every press with a hold recorded."""
+        return [(c.hold_ms, self.clicks[i + 1].delay_ms)
+                for i, c in enumerate(self.clicks[:-1]) if c.hold_ms > 0]
+
     def get_hold_stats(self) -> Dict:
         """Button hold duration -- a first-class anti-cheat signal."""
         holds = [c.hold_ms for c in self.clicks if c.hold_ms > 0]
@@ -351,16 +361,13 @@ class ClickSession:
 
         # Does hold length predict the interval that follows? The clicker
         # currently assumes it does not; if it does, that is itself a tell.
-        pairs = [(c.hold_ms, self.clicks[i + 1].delay_ms)
-                 for i, c in enumerate(self.clicks[:-1]) if c.hold_ms > 0]
+        pairs = self._hold_pairs()
         corr = 0.0
         if len(pairs) >= 10:
-            hs = [p[0] for p in pairs]
-            ds = [p[1] for p in pairs]
-            mh, md = statistics.mean(hs), statistics.mean(ds)
-            num = sum((h - mh) * (d - md) for h, d in pairs)
-            den = math.sqrt(sum((h - mh) ** 2 for h in hs) * sum((d - md) ** 2 for d in ds))
-            corr = num / den if den else 0.0
+            hs, ds = np.asarray(pairs, dtype=float).T
+            hc, dc = hs - hs.mean(), ds - ds.mean()
+            den = math.sqrt(float(hc @ hc) * float(dc @ dc))
+            corr = float(hc @ dc) / den if den else 0.0
 
         return {
             'hold_samples': len(holds),
@@ -370,10 +377,44 @@ class ClickSession:
             'hold_max_ms': round(max(holds), 3),
             'hold_median_ms': round(statistics.median(holds), 3),
             'hold_delay_corr': round(corr, 3),
+            'hold_joint': self.joint_density(pairs).summary(),
         }
 
-    def get_stats(self) -> dict:
-        """Calculate detailed statistics"""
+    def joint_density(self, pairs=None) -> JointDensity:
+        """The (hold, next interval) density; rebuilt if capture didn't fill it.
+
+        A live session fills self.joint as it goes. One loaded from CSV, or
+        one whose last hold was closed after its pair was counted, is
+        rebuilt from the clicks in one pass.
+        """
+        pairs = self._hold_pairs() if pairs is None else pairs
+        if self.joint.total != len(pairs):
+            self.joint = from_pairs(pairs)
+        return self.joint
+
+    def diagnostics_ci(self, corrected=None, workers: int = None) -> dict:
+        """Block-bootstrap intervals for the fit diagnostics, once per click count.
+
+        10,000 replicates take about a second per thousand clicks, so the
+        result is kept on the session. corrected: the chatter-folded delays,
+        if the caller already has them.
+        """
+        with self._ci_lock:
+            if self._ci is None or self._ci[0] != len(self.clicks):
+                if corrected is None:
+                    corrected = self.detect_chatter(
+                        [c.delay_ms for c in self.clicks[1:]])['corrected_delays']
+                self._ci = (len(self.clicks), bootstrap_diagnostics(
+                    corrected, pairs=self._hold_pairs() or None, workers=workers))
+            return self._ci[1]
+
+    def get_stats(self, bootstrap_workers: int = None, with_ci: bool = False) -> dict:
+        """Calculate detailed statistics
+
+        with_ci adds 'diagnostics_ci' (see diagnostics_ci(); slow the first
+        time). bootstrap_workers is passed to the bootstrap; pass 1 when
+        already running inside a process pool.
+        """
         if not self.clicks:
             return {}
 
@@ -449,6 +490,9 @@ class ClickSession:
             **self.estimate_poll_rate(corrected),
             **self.get_hold_stats(),
             'diagnostics': self.fit_diagnostics(corrected),
+            'long_memory': long_memory(corrected),
+            **({'diagnostics_ci': self.diagnostics_ci(corrected, bootstrap_workers)}
+               if with_ci else {}),
         }
 
     @staticmethod
@@ -494,6 +538,13 @@ class ClickSession:
             lines += [
                 f"USB POLLING RATE: ~{rate} Hz (confidence {stats.get('poll_confidence')})",
                 f"  Rayleigh scores: {stats.get('poll_scores')}",
+                f"  Spectrum peak {stats.get('poll_peak_hz')} Hz, "
+                f"{stats.get('poll_offset_ppm'):+} ppm from nominal",
+            ]
+            if 'poll_drift_hz_per_min' in stats:
+                lines.append(f"  Drift {stats['poll_drift_hz_per_min']:+} Hz/min, "
+                             f"drift-corrected {stats['poll_corrected_hz']} Hz")
+            lines += [
                 f"  -> set Config.POLL_RATE_HZ = {rate} in the clicker.",
                 "",
             ]
@@ -509,6 +560,7 @@ class ClickSession:
                 f"  range {stats['hold_min_ms']} - {stats['hold_max_ms']} ms   "
                 f"(n={stats['hold_samples']})",
                 f"  correlation with next interval: {stats['hold_delay_corr']:+.3f}",
+                *ClickSession._format_hold_joint(stats.get('hold_joint') or {}),
                 "",
             ]
         else:
@@ -521,13 +573,57 @@ class ClickSession:
                 f"  runs-test z      {d['runs_z']:+.2f}   (0 = human-like; large |z| = streaky)",
                 f"  skew {d['skew']:+.3f}   kurtosis {d['kurtosis']:+.3f}   mean/median {d['mean_over_median']:.3f}",
                 f"  coeff. variation {d['cv']:.3f}",
+                *ClickSession._format_long_memory(stats.get('long_memory') or {}),
                 f"  clean intervals  {stats.get('clean_intervals')}   "
                 f"corrected mean {stats.get('corrected_avg_delay_ms')} ms "
                 f"+/- {stats.get('corrected_std_dev_ms')} ms",
                 "",
             ]
+        boot = stats.get('diagnostics_ci') or {}
+        if boot:
+            ci = boot['ci']
+            lines.append(f"  {round(boot['level'] * 100)}% intervals  (block bootstrap, "
+                         f"{boot['replicates']} replicates, block {boot['block_len']})")
+            for k, (lo, hi) in ci.items():
+                point = d.get(k, stats.get(k))
+                point = f"{point:+.3f}" if point is not None else "   n/a"
+                lines.append(f"    {k:<18} {point}   [{lo:+.3f}, {hi:+.3f}]")
+            lines += ["  An interval that straddles the engine's value means the",
+                      "  difference is within what this many clicks can resolve.", ""]
         return "\n".join(lines)
 
+    @staticmethod
+    def _format_hold_joint(joint: dict) -> list:
+        """Report lines for analysis.joint: hold modes and interval quantiles by hold."""
+        if not joint.get('pairs'):
+            return []
+        lines = [f"  hold modes: {', '.join(f'{m} ms' for m in joint['hold_modes_ms']) or 'none'}",
+                 "  next interval by hold      n      p10      p50      p90"]
+        for row in joint['conditional']:
+            band = (f"{row['hold_lo_ms']:.0f}-{row['hold_hi_ms']:.0f} ms"
+                    if row['hold_hi_ms'] is not None else f"{row['hold_lo_ms']:.0f}+ ms")
+            if 'p50_ms' in row:
+                lines.append(f"    {band:<16} {row['pairs']:>7}  {row['p10_ms']:>7.1f}  "
+                             f"{row['p50_ms']:>7.1f}  {row['p90_ms']:>7.1f}")
+            else:
+                lines.append(f"    {band:<16} {row['pairs']:>7}")
+        return lines
+
+    @staticmethod
+    def _format_long_memory(lm: dict) -> list:
+        """Report lines for analysis.longmemory; none if it had too few intervals."""
+        if not lm:
+            return []
+
+        def f(v):
+            return f"{v:+.3f}" if v is not None else "  n/a"
+        return [
+            f"  long memory      DFA alpha {f(lm['dfa_alpha'])}   R/S Hurst {f(lm['hurst_rs'])}",
+            f"                   d: GPH {f(lm['gph_d'])} (se {lm['gph_se']})   "
+            f"Whittle {f(lm['whittle_d'])} (se {lm['whittle_se']})",
+            "                   (alpha/H 0.5, d 0 = no memory; alpha/H near 1 = 1/f drift)",
+        ]
+
     def _export_stats_to_txt(self, stats: dict, filename: str):
         """Export detailed statistics to text file"""
         base, _ = os.path.splitext(filename)
@@ -674,16 +770,117 @@ Location: Desktop/click_data/
             print(f"❌ Error saving to {filename}: {e}")
             return None, None
 
-        stats = self.get_stats()
+        stats = self.get_stats(with_ci=True)
         stats_file = self._export_stats_to_txt(stats, filename)
 
         return filename, stats_file
 
+    @classmethod
+    def from_csv(cls, filename: str, technique: str = "unlabelled") -> "ClickSession":
+        """Rebuild a finished session from one of export_to_csv()'s files.
+
+        The CSV does not record when the timer expired, so the session is
+        taken to end on its last press. Older recordings have no hold_ms
+        column; their holds load as 0.0, which get_hold_stats() already
+        treats as not captured.
+        """
+        session = cls(session_name=Path(filename).stem, duration_seconds=0,
+                      technique=technique)
+        with open(filename, 'r', newline='', encoding='utf-8') as fh:
+            for row in csv.DictReader(fh):
+                session.clicks.append(ClickEvent(
+                    click_number=int(row['click_number']),
+                    timestamp=float(row['timestamp']),
+                    delay_ms=float(row['delay_ms']),
+                    button=row.get('button', 'LEFT'),
+                    hold_ms=float(row.get('hold_ms') or 0.0),
+                ))
+        if session.clicks:
+            session.start_time = session.clicks[0].timestamp
+            session.end_time = session.clicks[-1].timestamp
+            session.duration_seconds = int(round(session.end_time - session.start_time))
+        return session
+
+class BenchmarkRecorder:
+    """Press/release handling for one timed benchmark run.
+
+    Wired to an input source's callbacks. The timer starts on the first
+    press and the run ends on the first press past the duration. Shared by
+    ClickTrackerGUI and headless replay (python -m mimic.replay), so a
+    replayed recording goes through exactly what a live one does.
+
+    The input thread only bumps counters (presses, last_press); whoever
+    displays progress reads them on its own schedule.
+    """
+
+    IDLE_AFTER_S = 2.0      # a gap this long without a press shows as idle
+
+    def __init__(self, session: ClickSession, duration: float, on_finish=None):
+        self.session = session
+        self.duration = duration
+        self.on_finish = on_finish or (lambda: None)
+        self.active = True
+        self.started = False
+        self.presses = 0
+        self.last_press = 0.0
+
+    def elapsed(self, t: float) -> float:
+        return t - self.session.start_time if self.started else 0.0
+
+    def on_press(self, t: float, button: str):
+        if not self.active:
+            return False
+        if not self.started:
+            self.started = True
+            self.session.start_time = t
+
+        elapsed = t - self.session.start_time
+        if elapsed >= self.duration:
+            self.finish(t)
+            return False
+
+        self.session.add_click(button=button, t=t)
+        self.presses += 1
+        self.last_press = t
+        return True
+
+    def progress(self, now: float) -> str:
+        """One status line for the run as of now.
+
+        After IDLE_AFTER_S without a press, it also shows the seconds since
+        last_press.
+        """
+        elapsed = min(self.elapsed(now), self.duration)
+        cps = self.presses / elapsed if elapsed > 0 else 0
+        if self.active:
+            line = f"Clicks: {self.presses} | CPS: {cps:.2f} | {self.duration - elapsed:.1f}s remaining"
+            idle = now - self.last_press
+            if self.presses and idle >= self.IDLE_AFTER_S:
+                line += f" | idle {idle:.0f}s"
+            return line
+        return f"Clicks: {self.presses} | CPS: {cps:.2f} | COMPLETE"
+
+    def on_release(self, t: float, button: str):
+        if self.active:
+            # Release: close out the hold duration on the open click.
+            self.session.close_click(t)
+
+    def finish(self, t: float):
+        if not self.active:
+            return
+        self.active = False
+        self.session.end_time = t
+        self.on_finish()
+
+
 class ClickTrackerGUI:
     """Graphical interface for click tracking"""
 
-    def __init__(self, root):
-        if not PYNPUT_AVAILABLE:
+    def __init__(self, root, input_source_factory=None):
+        # input_source_factory builds a fresh InputSource per test; default
+        # is the live pynput listener (see mimic.inputsource for replay).
+        self.input_source_factory = input_source_factory
+        if input_source_factory is None and not PYNPUT_AVAILABLE:
             messagebox.showerror("Error", "pynput is required. Install with: pip install pynput")
             root.destroy()
             return
@@ -724,8 +921,11 @@ class ClickTrackerGUI:
         style.configure('TButton', background=self.button_color, foreground=self.fg_color)
 
         self.session = None
-        self.listener = None
+        self.source = None
+        self.recorder = None
         self.is_testing = False
+        self._joint_key = None
+        self._timer_logged = False
 
         self.setup_ui()
         self.root.deiconify()
@@ -881,6 +1081,27 @@ class ClickTrackerGUI:
         self.status_frame = tk.Frame(self.root, bg=self.panel_color, relief=tk.RIDGE, bd=2)
         self.status_frame.pack(padx=15, pady=5, fill="both", expand=True)
 
+        # Clicks / CPS / time left, rewritten in place by the status tick.
+        self.progress_var = tk.StringVar(value="")
+        tk.Label(self.status_frame, textvariable=self.progress_var, anchor="w",
+                 bg=self.panel_color, fg=self.accent_color,
+                 font=("Courier", 10, "bold")).pack(side="bottom", fill="x", padx=8, pady=(0, 6))
+
+        # Hold vs next interval (analysis.joint), redrawn live during capture
+        # as one PhotoImage.
+        w, h = self.JOINT_VIEW
+        self.joint_canvas = tk.Canvas(self.status_frame, width=w + 34, height=h + 26,
+                                      bg=self.header_color, highlightthickness=0)
+        self.joint_canvas.pack(side="right", padx=8, pady=8)
+        self.joint_photo = tk.PhotoImage(width=w, height=h)
+        self.joint_image = self.joint_canvas.create_image(30, 4, image=self.joint_photo,
+                                                          anchor="nw", state="hidden")
+        for x, y, text, anchor in ((26, 4, "2000", "ne"), (26, h + 4, "10", "se"),
+                                   (30, h + 8, "5", "nw"), (w + 30, h + 8, "500", "ne"),
+                                   (w // 2 + 30, h + 8, "hold →  next interval ↑ (ms)", "n")):
+            self.joint_canvas.create_text(x, y, text=text, anchor=anchor,
+                                          fill=self.inactive_color, font=("Arial", 7))
+
         self.status_text = tk.Text(
             self.status_frame,
             height=8,
@@ -943,13 +1164,47 @@ class ClickTrackerGUI:
         results_scroll.pack(side="right", fill="y")
         self.results_text.config(yscrollcommand=results_scroll.set)
 
+    JOINT_VIEW = (240, 140)
+    STATUS_TICK_MS = 100      # one display update per tick, however fast the clicks come
+    STATUS_LOG_LINES = 500    # older status lines are dropped
+
+    def draw_joint(self):
+        """Redraw the hold/interval heatmap if the session's density changed."""
+        from mimic.heatmap import to_ppm
+        if self.session is None:
+            return
+        jd = self.session.joint
+        key = (id(jd), jd.version)
+        if key == self._joint_key:
+            return
+        self._joint_key = key
+        if jd.total < 2:
+            self.joint_canvas.itemconfig(self.joint_image, state="hidden")
+            return
+        self.joint_photo.configure(data=to_ppm(jd.to_rgb(*self.JOINT_VIEW)), format="PPM")
+        self.joint_canvas.itemconfig(self.joint_image, state="normal")
+
     def log_status(self, message: str):
-        """Add message to status display"""
+        """Add message to status display, keeping the last STATUS_LOG_LINES lines"""
         self.status_text.config(state="normal")
         self.status_text.insert("end", message + "\n")
+        # The Text always ends in one empty line after the newline above.
+        excess = int(self.status_text.index("end-1c").split(".")[0]) - 1 - self.STATUS_LOG_LINES
+        if excess > 0:
+            self.status_text.delete("1.0", f"{excess + 1}.0")
         self.status_text.see("end")
         self.status_text.config(state="disabled")
-        self.root.update()
+
+    def show_progress(self, now: float):
+        """Status tick: read the recorder's counters and redraw the progress line."""
+        if not self.recorder.started:
+            return
+        if not self._timer_logged:
+            self._timer_logged = True
+            self.log_status("Timer started!")
+        line = self.recorder.progress(now)
+        if line != self.progress_var.get():
+            self.progress_var.set(line)
 
     def start_test(self):
         """Start a click test session"""
@@ -973,6 +1228,8 @@ class ClickTrackerGUI:
             self.status_text.config(state="normal")
             self.status_text.delete("1.0", "end")
             self.status_text.config(state="disabled")
+            self.progress_var.set("")
+            self._timer_logged = False
 
             self.results_text.config(state="normal")
             self.results_text.delete("1.0", "end")
@@ -983,83 +1240,61 @@ class ClickTrackerGUI:
             self.log_status("(Timer begins on your first click)")
             self.log_status("")
 
-            first_click_detected = False
+            def on_finish():
+                self.is_testing = False
+                self.root.after(0, self.finish_test)
 
-            def on_click(x, y, button, pressed):
-                nonlocal first_click_detected
-                if pressed and self.is_testing:
-                    if not first_click_detected:
-                        first_click_detected = True
-                        self.session.start_time = time.time()
-                        self.root.after(0, self.log_status, "Timer started!")
-
-                    elapsed = time.time() - self.session.start_time
-
-                    if elapsed >= duration:
-                        self.is_testing = False
-                        self.session.end_time = time.time()
-                        self.root.after(0, self.finish_test)
-                        return False
-
-                    self.session.add_click(button=str(button).split('.')[-1])
-
-                    if len(self.session.clicks) % 5 == 0 or len(self.session.clicks) <= 1:
-                        cps = len(self.session.clicks) / elapsed if elapsed > 0 else 0
-                        remaining = duration - elapsed
-
-                        if remaining > 0:
-                            status_msg = f"Clicks: {len(self.session.clicks)} | CPS: {cps:.2f} | {remaining:.1f}s remaining"
-                        else:
-                            status_msg = f"Clicks: {len(self.session.clicks)} | CPS: {cps:.2f} | COMPLETE"
-
-                        self.root.after(0, self.log_status, status_msg)
-
-                    return self.is_testing
-
-                if not pressed and self.is_testing:
-                    # Release: close out the hold duration on the open click.
-                    self.session.close_click()
-
-            self.listener = mouse.Listener(on_click=on_click)
-            self.listener.start()
+            self.recorder = BenchmarkRecorder(self.session, duration, on_finish=on_finish)
+            if self.input_source_factory is None:
+                from mimic.inputsource import PynputSource
+                self.source = PynputSource()
+            else:
+                self.source = self.input_source_factory()
+            self.source.start(self.recorder.on_press, self.recorder.on_release)
 
             def check_test_completion():
-                if self.is_testing and self.session.start_time > 0:
-                    elapsed = time.time() - self.session.start_time
-                    if elapsed >= duration:
-                        self.is_testing = False
-                        self.session.end_time = time.time()
-                        self.finish_test()
+                if self.is_testing and self.recorder.started:
+                    now = self.source.now()
+                    if self.recorder.elapsed(now) >= duration:
+                        self.recorder.finish(now)
                         return
 
-                    if self.is_testing:
-                        self.root.after(100, check_test_completion)
+                if self.is_testing:
+                    self.show_progress(self.source.now())
+                    self.draw_joint()
+                    self.root.after(self.STATUS_TICK_MS, check_test_completion)
 
-            self.root.after(100, check_test_completion)
+            self.root.after(self.STATUS_TICK_MS, check_test_completion)
 
         except ValueError:
             messagebox.showerror("Error", "Invalid duration")
 
     def finish_test(self):
         """Finish the test and clean up"""
-        if self.listener:
-            self.listener.stop()
-            self.listener = None
+        if self.source:
+            self.source.stop()
+            self.source = None
 
         self.start_btn.config(state="normal")
         self.stop_btn.config(state="disabled")
         self.export_btn.config(state="normal")
 
+        if self.recorder.started:
+            self.show_progress(self.session.end_time)
+            self.log_status(self.progress_var.get())
         self.display_results()
+        if self.session and self.session.clicks:
+            # The exported report's bootstrap intervals, computed off the Tk
+            # thread and in-process so an export later finds them ready.
+            threading.Thread(target=self.session.diagnostics_ci, kwargs={'workers': 1},
+                             daemon=True).start()
 
     def stop_test(self):
         """Stop the current test"""
         if not self.is_testing or self.session is None:
             return
 
-        self.is_testing = False
-        self.session.end_time = time.time()
-        self.finish_test()
+        self.recorder.finish(self.source.now() if self.source else time.time())
 
     def display_results(self):
         """Display test results"""
@@ -1071,6 +1306,10 @@ class ClickTrackerGUI:
             return
 
         stats = self.session.get_stats()
+        self.draw_joint()
+        _joint = "\n".join(ClickSession._format_hold_joint(stats.get('hold_joint') or {}))
+        if _joint:
+            _joint = f"\nHOLD vs NEXT INTERVAL:\n\n{_joint}\n"
 
         _mark = {"USABLE": "[OK]", "THIN": "[THIN]", "CONTAMINATED": "[BAD]"}
         _verdict = f"{_mark.get(stats.get('verdict'), '[?]')} {stats.get('verdict', 'UNKNOWN')}"
@@ -1110,7 +1349,7 @@ Avg Delay: {stats['avg_delay_ms']} ms
 Std Deviation: {stats['std_dev_ms']} ms
 
 Consistency: {stats['consistency']}
-
+{_joint}
 PERCENTILE ANALYSIS:
 
 P10: {stats['percentiles'].get('p10', 'N/A')} ms
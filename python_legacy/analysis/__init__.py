@@ -0,0 +1,5 @@
+"""Offline analysis of click recordings.
+
+Part of Mimic. Headless companion to MimicBenchmarkTool: everything here
+works on the exported CSVs in click_data/ and needs neither Tk nor pywin32.
+"""
@@ -0,0 +1,240 @@
+"""Headless batch analysis of every recording under a directory.
+
+Part of Mimic. Runs the same ClickSession.get_stats() the Tk benchmark flow
+uses, but across all recordings at once in a process pool, and writes the
+usual *_STATS.txt report for each plus one summary table for all of them.
+
+Results are cached by a hash of the CSV's contents, so re-running over a
+directory of hundreds of recordings only analyses the new or edited ones.
+
+    cd python_legacy
+    python -m analysis.batch ../click_data
+    python -m analysis.batch ../click_data --out reports --workers 4
+"""
+
+import os
+import csv
+import json
+import hashlib
+import argparse
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from MimicBenchmarkTool import ClickSession
+
+
+# Bump whenever get_stats() changes what it reports, so stale cache entries
+# are recomputed instead of silently reused.
+CACHE_VERSION = 7
+CACHE_FILE = ".batch_cache.json"
+SUMMARY_BASENAME = "batch_summary"
+
+REQUIRED_COLUMNS = ("click_number", "timestamp", "delay_ms")
+
+# Scalars pulled out of get_stats() into the summary table, in column order.
+SUMMARY_FIELDS = [
+    'technique', 'verdict', 'total_clicks', 'duration_seconds', 'cps',
+    'true_cps', 'clean_intervals', 'avg_delay_ms', 'std_dev_ms',
+    'corrected_avg_delay_ms', 'corrected_std_dev_ms', 'chatter_detected',
+    'chatter_pct', 'chatter_mean_ms', 'poll_rate_hz', 'poll_confidence',
+    'poll_peak_hz', 'poll_offset_ppm', 'poll_drift_hz_per_min',
+    'hold_samples', 'hold_mean_ms', 'hold_std_ms', 'hold_delay_corr',
+]
+DIAGNOSTIC_FIELDS = ['acf_lag1', 'acf_lag2', 'acf_lag3', 'runs_z', 'skew',
+                     'kurtosis', 'mean_over_median', 'cv']
+LONG_MEMORY_FIELDS = ['dfa_alpha', 'gph_d', 'whittle_d', 'hurst_rs']
+
+
+def find_recordings(directory: Path) -> list:
+    """Every click CSV under directory, skipping our own summary output."""
+    found = []
+    for path in sorted(directory.rglob("*.csv")):
+        if path.stem == SUMMARY_BASENAME:
+            continue
+        with open(path, 'r', encoding='utf-8') as fh:
+            header = fh.readline().strip().split(',')
+        if all(col in header for col in REQUIRED_COLUMNS):
+            found.append(path)
+    return found
+
+
+def read_technique(csv_path: Path) -> str:
+    """Technique label from an existing STATS report, if one was written.
+
+    The CSV schema has no technique column; the Tk flow only records the
+    label in the report. Reading it back keeps a re-run from erasing it.
+    """
+    stats_path = csv_path.with_name(f"{csv_path.stem}_STATS.txt")
+    if stats_path.exists():
+        with open(stats_path, 'r', encoding='utf-8') as fh:
+            for line in fh:
+                if line.startswith("Technique:"):
+                    return line.split(":", 1)[1].strip() or "unlabelled"
+    return "unlabelled"
+
+
+def content_hash(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def analyze_recording(csv_path: str, technique: str, report_path: str) -> dict:
+    """Worker: load one recording, analyse it, write its STATS report."""
+    session = ClickSession.from_csv(csv_path, technique=technique)
+    stats = session.get_stats(bootstrap_workers=1, with_ci=True)
+    if stats:
+        session._export_stats_to_txt(stats, report_path)
+    return stats
+
+
+def _load_cache(path: Path) -> dict:
+    try:
+        with open(path, 'r', encoding='utf-8') as fh:
+            cache = json.load(fh)
+        if cache.get('version') == CACHE_VERSION:
+            entries = cache.get('entries', {})
+            # JSON turns the integer Hz keys into strings; put them back.
+            for entry in entries.values():
+                scores = entry['stats'].get('poll_scores')
+                if scores:
+                    entry['stats']['poll_scores'] = {int(k): v for k, v in scores.items()}
+            return entries
+    except FileNotFoundError:
+        pass
+    except (ValueError, KeyError, AttributeError) as e:
+        print(f"[BATCH] Ignoring unreadable cache {path}: {e}")
+    return {}
+
+
+def _save_cache(path: Path, entries: dict) -> None:
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, 'w', encoding='utf-8') as fh:
+        json.dump({'version': CACHE_VERSION, 'entries': entries}, fh)
+    os.replace(tmp, path)
+
+
+def summary_row(name: str, stats: dict) -> dict:
+    row = {'file': name}
+    row.update({k: stats.get(k) for k in SUMMARY_FIELDS})
+    diag = stats.get('diagnostics') or {}
+    row.update({k: diag.get(k) for k in DIAGNOSTIC_FIELDS})
+    lm = stats.get('long_memory') or {}
+    row.update({k: lm.get(k) for k in LONG_MEMORY_FIELDS})
+    return row
+
+
+def write_summary(out_dir: Path, rows: list) -> tuple:
+    json_path = out_dir / f"{SUMMARY_BASENAME}.json"
+    csv_path = out_dir / f"{SUMMARY_BASENAME}.csv"
+
+    with open(json_path, 'w', encoding='utf-8') as fh:
+        json.dump({'generated': datetime.now().isoformat(), 'recordings': rows},
+                  fh, indent=2)
+
+    fieldnames = ['file'] + SUMMARY_FIELDS + DIAGNOSTIC_FIELDS + LONG_MEMORY_FIELDS
+    with open(csv_path, 'w', newline='', encoding='utf-8') as fh:
+        writer = csv.DictWriter(fh, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+    return json_path, csv_path
+
+
+def run_batch(directory, out_dir=None, workers=None, use_cache=True, segment=False) -> list:
+    """Analyse every recording under directory. Returns the summary rows.
+
+    STATS reports land next to each CSV unless out_dir is given, in which
+    case they keep their path relative to directory under it. A recording
+    whose contents hash to a cached entry is not re-analysed; its report is
+    only rewritten if it has gone missing. segment also writes each
+    recording's per-click technique labels (analysis.segment), cached or not.
+    """
+    directory = Path(directory)
+    out_dir = Path(out_dir) if out_dir else None
+    cache_dir = out_dir or directory
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    cache_path = cache_dir / CACHE_FILE
+    cache = _load_cache(cache_path) if use_cache else {}
+
+    recordings = find_recordings(directory)
+    results, pending = {}, []
+    for path in recordings:
+        technique = read_technique(path)
+        digest = content_hash(path)
+        # Mirror subfolders under out_dir so same-named recordings don't collide.
+        report_dir = out_dir / path.relative_to(directory).parent if out_dir else path.parent
+        report_dir.mkdir(parents=True, exist_ok=True)
+        report_path = report_dir / path.name
+        entry = cache.get(digest)
+        if entry is not None:
+            stats = dict(entry['stats'], technique=technique)
+            stats_txt = report_dir / f"{path.stem}_STATS.txt"
+            if stats and not stats_txt.exists():
+                ClickSession(session_name=path.stem, duration_seconds=0)._export_stats_to_txt(
+                    stats, str(report_path))
+            results[path] = stats
+        else:
+            pending.append((path, digest, technique, report_path))
+
+    print(f"[BATCH] {len(recordings)} recordings, {len(recordings) - len(pending)} cached, "
+          f"{len(pending)} to analyse")
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(analyze_recording, str(path), technique, str(report_path)):
+                    (path, digest)
+                for path, digest, technique, report_path in pending
+            }
+            for fut in as_completed(futures):
+                path, digest = futures[fut]
+                try:
+                    stats = fut.result()
+                except Exception as e:
+                    print(f"[BATCH] Failed on {path.name}: {e}")
+                    continue
+                results[path] = stats
+                cache[digest] = {'file': path.name, 'stats': stats}
+
+    if use_cache:
+        _save_cache(cache_path, cache)
+
+    rows = [summary_row(str(path.relative_to(directory)), results[path])
+            for path in recordings if results.get(path)]
+    json_path, csv_path = write_summary(cache_dir, rows)
+    print(f"[BATCH] Summary: {json_path}")
+    print(f"[BATCH] Summary: {csv_path}")
+
+    if segment and recordings:
+        from analysis.segment import segment_files
+        segment_files(recordings, out_dir, workers, root=directory)
+        print(f"[BATCH] Segmented {len(recordings)} recordings by technique")
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Analyse every click recording under a directory.")
+    parser.add_argument("directory", help="folder to search for recordings, e.g. ../click_data")
+    parser.add_argument("--out", default=None,
+                        help="write reports and summary here instead of beside each CSV")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: one per core)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="re-analyse everything, ignoring and not updating the cache")
+    parser.add_argument("--segment", action="store_true",
+                        help="also label every click with its technique (*_SEGMENTS.csv)")
+    args = parser.parse_args(argv)
+
+    if not Path(args.directory).is_dir():
+        parser.error(f"not a directory: {args.directory}")
+    run_batch(args.directory, out_dir=args.out, workers=args.workers,
+              use_cache=not args.no_cache, segment=args.segment)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,173 @@
+"""Block-bootstrap confidence intervals for the fit diagnostics.
+
+Part of Mimic. ClickSession.fit_diagnostics() reports point estimates, but at
+a few hundred intervals skew and kurtosis carry a standard error of ~0.2, so
+two sessions (or a session and the engine) can differ by chance alone. This
+puts an interval on every diagnostic.
+
+Intervals are resampled in circular blocks rather than one at a time: the
+autocorrelation and runs tests measure serial structure, and an i.i.d.
+resample would destroy exactly what they are looking at. Each batch of
+replicates is a (replicates x n) matrix gathered with one fancy index, and
+every statistic is computed along axis 1, so there is no Python loop per
+replicate. Batches are spread over a process pool.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+
+N_REPLICATES = 10000
+CI_LEVEL = 0.95
+BATCH_ELEMENTS = 1 << 21    # replicates x n per batch; bounds memory (~16 MB)
+MIN_PARALLEL_ELEMENTS = 1 << 24   # below this a pool costs more than it saves
+
+DIAGNOSTIC_KEYS = ('acf_lag1', 'acf_lag2', 'acf_lag3', 'runs_z', 'skew',
+                   'kurtosis', 'mean_over_median', 'cv')
+
+
+def default_block_length(n: int) -> int:
+    """n^(1/3), the usual rate-optimal choice for variance-type statistics."""
+    return max(1, int(round(n ** (1.0 / 3.0))))
+
+
+def block_indices(n: int, block_len: int, reps: int, rng) -> np.ndarray:
+    """(reps x n) circular-block resample indices into a length-n series."""
+    n_blocks = -(-n // block_len)
+    starts = rng.integers(0, n, size=(reps, n_blocks, 1))
+    idx = (starts + np.arange(block_len)) % n
+    return idx.reshape(reps, -1)[:, :n]
+
+
+def diagnostics_matrix(x: np.ndarray) -> dict:
+    """fit_diagnostics() for every row of x at once. Returns key -> array."""
+    n = x.shape[1]
+    mean = x.mean(axis=1, keepdims=True)
+    c = x - mean
+    c2 = c * c
+    ss = c2.sum(axis=1)
+    sd = np.sqrt(ss / n)
+    ok = sd > 0
+    safe_ss = np.where(ok, ss, 1.0)
+    safe_sd = np.where(ok, sd, 1.0)
+
+    out = {}
+    for lag in (1, 2, 3):
+        num = np.einsum('ij,ij->i', c[:, :-lag], c[:, lag:])
+        out[f'acf_lag{lag}'] = np.where(ok, num / safe_ss, 0.0)
+
+    # Raw third/fourth central moments, scaled once per row afterwards.
+    out['skew'] = np.where(ok, np.einsum('ij,ij->i', c2, c) / n / safe_sd ** 3, 0.0)
+    out['kurtosis'] = np.where(ok, np.einsum('ij,ij->i', c2, c2) / n / safe_sd ** 4 - 3.0, 0.0)
+
+    med = np.median(x, axis=1)
+    m = mean[:, 0]
+    out['mean_over_median'] = np.where(med != 0, m / np.where(med != 0, med, 1.0), 0.0)
+    out['cv'] = np.where(m != 0, sd / np.where(m != 0, m, 1.0), 0.0)
+    out['runs_z'] = _runs_z(x, med)
+    return out
+
+
+def _runs_z(x: np.ndarray, med: np.ndarray) -> np.ndarray:
+    """Wald-Wolfowitz runs z per row, ties with the median dropped.
+
+    Dropping ties is done without compaction: each tie takes the sign of the
+    last non-tie before it, which leaves the number of sign changes
+    unchanged, and leading ties (sign 0) are excluded from the count.
+    """
+    above = x > med[:, None]
+    below = x < med[:, None]
+    n1 = above.sum(axis=1)
+    n2 = below.sum(axis=1)
+    s = above.view(np.int8) - below.view(np.int8)
+    ties = ~(above | below)
+    if ties.any():
+        pos = np.where(ties, 0, np.arange(s.shape[1], dtype=np.int32))
+        np.maximum.accumulate(pos, axis=1, out=pos)
+        s = np.take_along_axis(s, pos, axis=1)
+    runs = 1 + ((s[:, 1:] != s[:, :-1]) & (s[:, :-1] != 0)).sum(axis=1)
+
+    tot = n1 + n2
+    exp = 1.0 + 2.0 * n1 * n2 / np.where(tot > 0, tot, 1)
+    var = (exp - 1.0) * (exp - 2.0) / np.where(tot > 1, tot - 1, 1)
+    ok = (n1 > 0) & (n2 > 0) & (var > 0)
+    return np.where(ok, (runs - exp) / np.sqrt(np.where(ok, var, 1.0)), 0.0)
+
+
+def correlation_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pearson r between matching rows of a and b."""
+    ca = a - a.mean(axis=1, keepdims=True)
+    cb = b - b.mean(axis=1, keepdims=True)
+    den = np.sqrt(np.einsum('ij,ij->i', ca, ca) * np.einsum('ij,ij->i', cb, cb))
+    num = np.einsum('ij,ij->i', ca, cb)
+    return np.where(den > 0, num / np.where(den > 0, den, 1.0), 0.0)
+
+
+def _replicate_batch(delays, pairs, block_len, pair_block_len, reps, seed) -> dict:
+    """Worker: one batch of replicates. Returns key -> (reps,) array."""
+    rng = np.random.default_rng(seed)
+    d = np.asarray(delays, dtype=float)
+    out = {k: np.empty(reps) for k in DIAGNOSTIC_KEYS}
+    if pairs is not None:
+        out['hold_delay_corr'] = np.empty(reps)
+    step = max(1, BATCH_ELEMENTS // d.size)
+    for i in range(0, reps, step):
+        r = min(step, reps - i)
+        stats = diagnostics_matrix(d[block_indices(d.size, block_len, r, rng)])
+        for k in DIAGNOSTIC_KEYS:
+            out[k][i:i + r] = stats[k]
+        if pairs is not None:
+            idx = block_indices(pairs.shape[0], pair_block_len, r, rng)
+            out['hold_delay_corr'][i:i + r] = correlation_matrix(pairs[idx, 0], pairs[idx, 1])
+    return out
+
+
+def bootstrap_diagnostics(delays, pairs=None, reps=N_REPLICATES, level=CI_LEVEL,
+                          block_len=None, workers=None, seed=0) -> dict:
+    """Percentile confidence intervals for every fit diagnostic.
+
+    delays: the clean intervals fit_diagnostics() was given.
+    pairs:  optional (hold_ms, next delay_ms) pairs; adds hold_delay_corr.
+    workers: process count. None uses one per core once the job is big
+    enough to be worth it; 1 keeps everything in-process (use that when
+    already inside a pool worker).
+
+    Returns {'replicates', 'level', 'block_len', 'ci': {key: (lo, hi)}}, or
+    {} when there are too few intervals for the diagnostics to exist.
+    """
+    d = np.asarray(delays, dtype=float)
+    if d.size < 20:
+        return {}
+    block_len = int(block_len or default_block_length(d.size))
+    p = None
+    pair_block_len = 1
+    if pairs is not None and len(pairs) >= 10:
+        p = np.asarray(pairs, dtype=float).reshape(-1, 2)
+        pair_block_len = default_block_length(p.shape[0])
+
+    if workers is None:
+        big = reps * d.size >= MIN_PARALLEL_ELEMENTS
+        workers = (os.cpu_count() or 1) if big else 1
+    workers = max(1, min(int(workers), reps))
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    shares = [reps // workers + (1 if i < reps % workers else 0) for i in range(workers)]
+
+    if workers == 1:
+        parts = [_replicate_batch(d, p, block_len, pair_block_len, reps, seeds[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_replicate_batch, d, p, block_len, pair_block_len,
+                                   share, s)
+                       for share, s in zip(shares, seeds) if share]
+            parts = [f.result() for f in futures]
+
+    alpha = (1.0 - level) / 2.0
+    ci = {}
+    for k in parts[0]:
+        samples = np.concatenate([part[k] for part in parts])
+        lo, hi = np.quantile(samples, [alpha, 1.0 - alpha])
+        ci[k] = (round(float(lo), 3), round(float(hi), 3))
+    return {'replicates': int(reps), 'level': level, 'block_len': block_len, 'ci': ci}
+
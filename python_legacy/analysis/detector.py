@@ -0,0 +1,436 @@
+"""Streaming detector over many press-interval streams at once.
+
+Part of Mimic. ClickSession.fit_diagnostics() and estimate_poll_rate()
+compute, once per finished recording, the statistics a detector can get for
+free: autocorrelation at lags 1-3, runs z, skew, kurtosis, mean/median, CV
+and how tightly intervals sit on a USB polling grid. This keeps the same
+features live, per stream, over a sliding window of the last WINDOW
+intervals, and scores each stream against a profile fitted to recordings.
+
+Every feature is kept as running sums that a new interval adds to and the
+interval leaving the window subtracts from, so an update is O(1) however
+long the window:
+
+    moments     sums of y, y^2, y^3, y^4 with y = x - ref
+    ACF 1-3     sums of y_i * y_(i+k); the mean correction needs only the
+                first and last three values of the window
+    runs        sign changes between neighbours about the window median
+    poll grid   phasor sums exp(2*pi*i*f*x) at the nominal rates; each rate
+                is double the one before, so one cos/sin pair per interval
+                and repeated squaring give all of them
+
+The median is read from a sorted copy of the window, kept with bisect (a
+memmove of at most WINDOW pointers). The runs test is exactly
+fit_diagnostics()'s, about the current median with ties dropped. Its counts
+are kept about a threshold that features() first moves to the median: only
+values between the old and the new threshold change side, so they are found
+in the sorted copy, their positions looked up by value, and their neighbour
+pairs recounted -- a couple of values when features are read every
+interval, more when many intervals tie at the median (quantised streams).
+Runs of ties are bridged as features are read, at a cost of the number of
+ties. All of this comes to about 4 us per features() read. Every RESYNC
+intervals the sums are recomputed from the window so float rounding in the
+add/subtract pairs cannot build up over a long stream.
+
+DetectorService runs the windows for thousands of streams in one asyncio
+task fed by a queue, and calls back with a score per stream on every
+interval once it has MIN_INTERVALS. benchmarks/detector.py drives it with
+click_data/ recordings and engine output.
+"""
+
+import asyncio
+import bisect
+import json
+import math
+import time
+
+import numpy as np
+
+from analysis.pollscan import NOMINAL_RATES_HZ
+from mimic.latency import LatencyHistogram
+
+
+WINDOW = 128            # intervals per stream the features are taken over
+MIN_INTERVALS = 32      # no score before this many
+RESYNC = 8192           # intervals between full recomputes of the sums
+MAX_GAP_MS = 2000.0     # a longer gap is a pause between holds, not an interval
+
+FEATURES = ('acf_lag1', 'acf_lag2', 'acf_lag3', 'runs_z', 'skew',
+            'kurtosis', 'mean_over_median', 'cv', 'poll_r')
+Z_CLIP = 10.0           # one wild feature cannot swamp the score
+
+RATES_HZ = NOMINAL_RATES_HZ
+assert all(b == 2 * a for a, b in zip(RATES_HZ, RATES_HZ[1:]))
+BASE_CYCLES_PER_MS = RATES_HZ[0] / 1000.0
+
+
+def _sign(v: float, t: float) -> int:
+    return (v > t) - (v < t)
+
+
+def _phasors(x: float) -> list:
+    """exp(2*pi*i*f*x) for every rate in RATES_HZ, x in ms."""
+    a = 2.0 * math.pi * ((x * BASE_CYCLES_PER_MS) % 1.0)
+    z = complex(math.cos(a), math.sin(a))
+    out = [z]
+    for _ in RATES_HZ[1:]:
+        z = z * z
+        out.append(z)
+    return out
+
+
+class StreamFeatures:
+    """Sliding-window fit diagnostics of one interval stream."""
+
+    __slots__ = ("window", "buf", "sorted", "where", "head", "n", "ref", "thr", "pushed",
+                 "s1", "s2", "s3", "s4", "lag", "above", "below", "changes", "grid")
+
+    def __init__(self, window: int = WINDOW):
+        self.window = window
+        self.buf = [0.0] * window       # ring: interval number j sits at j % window
+        self.sorted = []                # the same values, ascending
+        self.where = {}                 # value -> interval numbers holding it, ascending
+        self.head = 0
+        self.n = 0
+        self.ref = 0.0                  # offset the power sums are taken about
+        self.thr = 0.0                  # runs threshold: the window median
+        self.pushed = 0
+        self.s1 = self.s2 = self.s3 = self.s4 = 0.0
+        self.lag = [0.0, 0.0, 0.0]
+        self.above = 0                  # values > thr
+        self.below = 0                  # values < thr
+        self.changes = 0                # neighbours on opposite sides of thr
+        self.grid = [0j] * len(RATES_HZ)
+
+    def _at(self, i: int) -> float:
+        """i-th value of the window, oldest first."""
+        return self.buf[(self.head + i) % self.window]
+
+    def push(self, x: float) -> None:
+        n, w, buf, ref, thr = self.n, self.window, self.buf, self.ref, self.thr
+        if n == w:
+            self._evict()
+            n -= 1
+        y = x - ref
+        for k in range(min(3, n)):
+            self.lag[k] += (buf[(self.head + n - 1 - k) % w] - ref) * y
+        j = self.pushed
+        side = (x > thr) - (x < thr)
+        if n:
+            p = buf[(j - 1) % w]
+            if side * ((p > thr) - (p < thr)) < 0:
+                self.changes += 1
+        buf[j % w] = x
+        bisect.insort(self.sorted, x)
+        self.where.setdefault(x, []).append(j)
+        self.n = n + 1
+        y2 = y * y
+        self.s1 += y
+        self.s2 += y2
+        self.s3 += y2 * y
+        self.s4 += y2 * y2
+        self.above += side > 0
+        self.below += side < 0
+        grid = self.grid
+        for r, z in enumerate(_phasors(x)):
+            grid[r] += z
+
+        self.pushed = j + 1
+        if self.n == MIN_INTERVALS or self.pushed % RESYNC == 0:
+            self.rebuild()
+
+    def _evict(self) -> None:
+        buf, w, h, ref, thr = self.buf, self.window, self.head, self.ref, self.thr
+        x = buf[h]
+        y = x - ref
+        for k in range(3):
+            self.lag[k] -= y * (buf[(h + 1 + k) % w] - ref)
+        side = (x > thr) - (x < thr)
+        q = buf[(h + 1) % w]
+        if self.n > 1 and side * ((q > thr) - (q < thr)) < 0:
+            self.changes -= 1
+        y2 = y * y
+        self.s1 -= y
+        self.s2 -= y2
+        self.s3 -= y2 * y
+        self.s4 -= y2 * y2
+        self.above -= side > 0
+        self.below -= side < 0
+        grid = self.grid
+        for r, z in enumerate(_phasors(x)):
+            grid[r] -= z
+        del self.sorted[bisect.bisect_left(self.sorted, x)]
+        seqs = self.where[x]
+        del seqs[0]                     # the oldest interval is the first of its value
+        if not seqs:
+            del self.where[x]
+        self.head = (h + 1) % w
+        self.n -= 1
+
+    @property
+    def median(self) -> float:
+        v, n = self.sorted, self.n
+        return v[n // 2] if n % 2 else (v[n // 2 - 1] + v[n // 2]) / 2.0
+
+    def _values(self) -> list:
+        """The window, oldest first."""
+        h, n = self.head, self.n
+        return self.buf[h:h + n] + self.buf[:max(0, h + n - self.window)]
+
+    def _retarget(self, new: float) -> None:
+        """Move the runs threshold to new, recounting only what changes side.
+
+        Values strictly outside [old, new] keep their side. For the rest,
+        the pairs they belong to are scored about the old threshold and
+        about the new one, and the difference applied.
+        """
+        old = self.thr
+        if new == old:
+            return
+        self.thr = new
+        v = self.sorted
+        a = bisect.bisect_left(v, min(old, new))
+        b = bisect.bisect_right(v, max(old, new))
+        if a == b:
+            return
+        where, buf, w = self.where, self.buf, self.window
+        moved = set()
+        for value in v[a:b]:
+            moved.update(where[value])  # repeats of a value add nothing
+        first, last = self.pushed - self.n, self.pushed - 1
+        pairs = set()
+        above = below = 0
+        for j in moved:
+            x = buf[j % w]
+            above += (x > new) - (x > old)
+            below += (x < new) - (x < old)
+            if j > first:
+                pairs.add(j - 1)
+            if j < last:
+                pairs.add(j)
+        changes = 0
+        for j in pairs:                 # the pair (j, j + 1)
+            p, q = buf[j % w], buf[(j + 1) % w]
+            changes += ((((p > new) - (p < new)) * ((q > new) - (q < new)) < 0)
+                        - (((p > old) - (p < old)) * ((q > old) - (q < old)) < 0))
+        self.above += above
+        self.below += below
+        self.changes += changes
+
+    def _tie_bridges(self) -> int:
+        """Sign changes across runs of values equal to the threshold.
+
+        fit_diagnostics() drops ties, joining the values either side of a
+        run of them; changes counts only directly adjacent pairs.
+        """
+        seqs = self.where.get(self.thr)
+        if not seqs:
+            return 0
+        buf, w, thr = self.buf, self.window, self.thr
+        first, last = self.pushed - self.n, self.pushed - 1
+        bridges = 0
+        i = 0
+        while i < len(seqs):
+            k = i
+            while k + 1 < len(seqs) and seqs[k + 1] == seqs[k] + 1:
+                k += 1
+            a, b = seqs[i] - 1, seqs[k] + 1
+            if a >= first and b <= last:
+                bridges += _sign(buf[a % w], thr) != _sign(buf[b % w], thr)
+            i = k + 1
+        return bridges
+
+    def rebuild(self) -> None:
+        """Recompute the threshold, ref and every running sum from the window."""
+        n = self.n
+        if not n:
+            return
+        x = np.array(self._values())
+        self.thr = self.median
+        self.ref = float(x.mean())
+        y = x - self.ref
+        y2 = y * y
+        self.s1, self.s2 = float(y.sum()), float(y2.sum())
+        self.s3, self.s4 = float((y2 * y).sum()), float((y2 * y2).sum())
+        self.lag = [float(np.dot(y[:-k], y[k:])) if n > k else 0.0 for k in (1, 2, 3)]
+        side = np.sign(x - self.thr)
+        self.above = int(np.count_nonzero(side > 0))
+        self.below = int(np.count_nonzero(side < 0))
+        self.changes = int(np.count_nonzero(side[1:] * side[:-1] < 0))
+        ph = np.exp(2j * np.pi * np.mod(np.outer(np.asarray(RATES_HZ) / 1000.0, x), 1.0))
+        self.grid = ph.sum(axis=1).tolist()
+
+    def features(self) -> dict:
+        """The fit_diagnostics() statistics of the window, plus poll_r."""
+        n = self.n
+        if n < 4:
+            return {}
+        self._retarget(self.median)
+        d = self.s1 / n
+        m2 = self.s2 / n - d * d
+        m3 = self.s3 / n - 3 * d * self.s2 / n + 2 * d ** 3
+        m4 = self.s4 / n - 4 * d * self.s3 / n + 6 * d * d * self.s2 / n - 3 * d ** 4
+        mean = self.ref + d
+        out = dict.fromkeys(FEATURES, 0.0)
+
+        if m2 > 0:
+            den = n * m2
+            head = tail = 0.0
+            for k in range(1, 4):
+                tail += self._at(k - 1) - self.ref       # first k values
+                head += self._at(n - k) - self.ref       # last k values
+                num = self.lag[k - 1] - d * ((self.s1 - head) + (self.s1 - tail)) + (n - k) * d * d
+                out[f'acf_lag{k}'] = num / den
+            out['skew'] = m3 / m2 ** 1.5
+            out['kurtosis'] = m4 / (m2 * m2) - 3
+            out['cv'] = math.sqrt(m2) / mean if mean else 0.0
+
+        n1, n2 = self.above, self.below
+        if n1 and n2:
+            tot = n1 + n2
+            exp = 1 + 2 * n1 * n2 / tot
+            var = (exp - 1) * (exp - 2) / (tot - 1)
+            if var > 0:
+                out['runs_z'] = (self.changes + self._tie_bridges() + 1 - exp) / math.sqrt(var)
+        med = self.median
+        out['mean_over_median'] = mean / med if med else 0.0
+        out['poll_r'] = max(abs(z) for z in self.grid) / n
+        return out
+
+
+class DetectorProfile:
+    """Per-feature mean and spread of windows from known-human recordings.
+
+    score() is the RMS of the standardised feature deviations: around 1 for
+    a window like the reference, growing as a stream departs from it.
+    """
+
+    def __init__(self, mean: dict, std: dict, windows: int = 0, window: int = WINDOW):
+        self.mean = mean
+        self.std = std
+        self.windows = windows
+        self.window = window
+
+    @classmethod
+    def fit(cls, series, window: int = WINDOW, stride: int = 8) -> "DetectorProfile":
+        """Fit to interval lists (ms), taking a window every stride intervals."""
+        rows = []
+        for delays in series:
+            sf = StreamFeatures(window)
+            for i, d in enumerate(delays):
+                sf.push(d)
+                if sf.n >= MIN_INTERVALS and i % stride == 0:
+                    rows.append([sf.features()[k] for k in FEATURES])
+        if len(rows) < 2:
+            raise ValueError("need longer recordings to fit a detector profile")
+        a = np.array(rows)
+        std = np.maximum(a.std(axis=0), 1e-9)
+        return cls(dict(zip(FEATURES, a.mean(axis=0).tolist())),
+                   dict(zip(FEATURES, std.tolist())), len(rows), window)
+
+    def deviations(self, feats: dict) -> dict:
+        return {k: max(-Z_CLIP, min(Z_CLIP, (feats[k] - self.mean[k]) / self.std[k]))
+                for k in FEATURES}
+
+    def score(self, feats: dict) -> float:
+        zs = self.deviations(feats).values()
+        return math.sqrt(sum(z * z for z in zs) / len(FEATURES))
+
+    def to_json(self, filepath: str) -> None:
+        with open(filepath, 'w', encoding='utf-8') as fh:
+            json.dump({'window': self.window, 'windows': self.windows,
+                       'mean': self.mean, 'std': self.std}, fh, indent=2)
+
+    @classmethod
+    def from_json(cls, filepath: str) -> "DetectorProfile":
+        with open(filepath, 'r', encoding='utf-8') as fh:
+            d = json.load(fh)
+        return cls(d['mean'], d['std'], d.get('windows', 0), d.get('window', WINDOW))
+
+
+class DetectorService:
+    """Scores every stream fed to it, from one asyncio task.
+
+    Producers call submit(stream_id, press_time_s) (or put_nowait from the
+    loop's thread); run() consumes the queue until stop(). on_score(stream_id,
+    score, features) is called for every interval of a stream that has
+    MIN_INTERVALS. Gaps over MAX_GAP_MS start a new hold and are skipped.
+
+    latency: enqueue to score, ns (queueing included)
+    compute: window update plus scoring, ns
+    """
+
+    def __init__(self, profile: DetectorProfile, on_score=None, maxsize: int = 65536,
+                 batch: int = 256):
+        self.profile = profile
+        self.window = profile.window
+        self.on_score = on_score
+        self.batch = batch
+        self.queue = asyncio.Queue(maxsize)
+        self.streams = {}               # stream_id -> [last press time, StreamFeatures]
+        self.scores = {}                # stream_id -> latest score
+        self.events = 0
+        self.scored = 0
+        self.latency = LatencyHistogram()
+        self.compute = LatencyHistogram()
+
+    async def submit(self, stream_id, press_time_s: float) -> None:
+        await self.queue.put((stream_id, press_time_s, time.perf_counter_ns()))
+
+    def put_nowait(self, stream_id, press_time_s: float) -> None:
+        self.queue.put_nowait((stream_id, press_time_s, time.perf_counter_ns()))
+
+    async def stop(self) -> None:
+        await self.queue.put(None)
+
+    def end_stream(self, stream_id) -> None:
+        self.streams.pop(stream_id, None)
+        self.scores.pop(stream_id, None)
+
+    def process(self, stream_id, press_time_s: float, enqueued_ns: int = None):
+        """One press of one stream. Returns its score, or None before MIN_INTERVALS."""
+        t0 = time.perf_counter_ns()
+        self.events += 1
+        st = self.streams.get(stream_id)
+        if st is None:
+            self.streams[stream_id] = [press_time_s, StreamFeatures(self.window)]
+            return None
+        gap_ms = (press_time_s - st[0]) * 1000.0
+        st[0] = press_time_s
+        sf = st[1]
+        if not 0.0 <= gap_ms <= MAX_GAP_MS:
+            return None
+        sf.push(gap_ms)
+        if sf.n < MIN_INTERVALS:
+            return None
+        feats = sf.features()
+        score = self.profile.score(feats)
+        self.scores[stream_id] = score
+        self.scored += 1
+        t1 = time.perf_counter_ns()
+        self.compute.record(t1 - t0)
+        if enqueued_ns is not None:
+            self.latency.record(t1 - enqueued_ns)
+        if self.on_score:
+            self.on_score(stream_id, score, feats)
+        return score
+
+    async def run(self) -> None:
+        """Consume the queue until stop().
+
+        Takes up to batch items per wakeup, then yields so blocked producers
+        can refill the queue.
+        """
+        q = self.queue
+        while True:
+            item = await q.get()
+            taken = 1
+            while item is not None:
+                self.process(*item)
+                if taken == self.batch or q.empty():
+                    break
+                item = q.get_nowait()
+                taken += 1
+            if item is None:
+                return
+            await asyncio.sleep(0)
@@ -0,0 +1,240 @@
+"""Pairwise distances between recordings, and clusters of them.
+
+Part of Mimic. Comparing sessions meant reading their STATS reports side by
+side. This computes, for every pair of sessions:
+
+    w1_delay, w1_hold           1-D Wasserstein (earth mover's) distance, ms
+    energy_delay, energy_hold   energy distance, ms^(1/2)
+    acf                         Euclidean distance between ACF vectors
+                                (lags 1..ACF_LAGS)
+
+Both distribution distances come out of one pass over the two sorted
+samples. In one dimension W1 = integral |F - G| and the energy distance is
+sqrt(2 * integral (F - G)^2), with F and G the empirical CDFs. Both are
+step functions, so merging the samples (a stable sort of two sorted runs
+is a single linear merge) and a running sum of +1/na, -1/nb steps gives
+F - G between every pair of neighbouring points; the integrals are dot
+products with the gaps between them. Rows of the matrix are spread over a
+process pool. The ACF matrix is one broadcast.
+
+Sessions are then clustered by average linkage on a combined distance:
+each metric divided by its median over all pairs, then averaged over the
+metrics both sessions have (older recordings have no holds).
+
+    cd python_legacy
+    python -m analysis.distance ../click_data --out distances.npz
+    python -m analysis.distance ../click_data --simulate 5000 --clusters 3 --out d.npz
+"""
+
+import os
+import argparse
+import time
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+
+ACF_LAGS = 10
+MIN_SAMPLES = 20        # fewer delays (or holds) than this and the metric is NaN
+MIN_PARALLEL_PAIRS = 2000
+METRICS = ('w1_delay', 'energy_delay', 'w1_hold', 'energy_hold', 'acf')
+
+
+def cdf_distances(a: np.ndarray, b: np.ndarray) -> tuple:
+    """(W1, energy distance) between two sorted samples."""
+    x = np.concatenate([a, b])
+    order = np.argsort(x, kind='stable')     # timsort: one merge of two runs
+    x = x[order]
+    # F - G steps up 1/na at each point of a and down 1/nb at each of b.
+    # Ties are taken one at a time, but the gap between them is zero.
+    diff = np.cumsum(np.where(order < a.size, 1.0 / a.size, -1.0 / b.size)[:-1])
+    gaps = np.diff(x)
+    return float(np.dot(np.abs(diff), gaps)), float(np.sqrt(2.0 * np.dot(diff * diff, gaps)))
+
+
+def acf_vector(delays, lags: int = ACF_LAGS) -> np.ndarray:
+    """Autocorrelation at lags 1..lags, as fit_diagnostics() defines it."""
+    x = np.asarray(delays, dtype=float)
+    c = x - x.mean()
+    den = np.dot(c, c)
+    if not den or x.size <= lags:
+        return np.full(lags, np.nan)
+    return np.array([np.dot(c[:-k], c[k:]) / den for k in range(1, lags + 1)])
+
+
+def _rows(samples, rows) -> list:
+    """Worker: (i, j, w1/energy for delays and holds) for j > i, for each row i."""
+    out = []
+    for i in rows:
+        di, hi = samples[i]
+        for j in range(i + 1, len(samples)):
+            dj, hj = samples[j]
+            vals = [np.nan] * 4
+            if di is not None and dj is not None:
+                vals[0:2] = cdf_distances(di, dj)
+            if hi is not None and hj is not None:
+                vals[2:4] = cdf_distances(hi, hj)
+            out.append((i, j, vals))
+    return out
+
+
+def _sorted_or_none(values):
+    a = np.sort(np.asarray(values, dtype=float))
+    return a if a.size >= MIN_SAMPLES else None
+
+
+def distance_matrices(sessions, lags: int = ACF_LAGS, workers=None) -> dict:
+    """metric -> (n x n) matrix for sessions = [(name, kind, delays, holds)].
+
+    Holds of 0 (not captured) are dropped. workers as in analysis.bootstrap:
+    None uses a pool only when there are enough pairs to pay for it.
+    """
+    n = len(sessions)
+    samples = [(_sorted_or_none(d), _sorted_or_none([h for h in (hs if hs is not None else ())
+                                                     if h > 0]))
+               for _, _, d, hs in sessions]
+    out = {m: np.zeros((n, n)) for m in METRICS}
+
+    pairs = n * (n - 1) // 2
+    if workers is None:
+        workers = (os.cpu_count() or 1) if pairs >= MIN_PARALLEL_PAIRS else 1
+    workers = max(1, min(int(workers), n))
+    # Interleaved rows even out the triangle: row i has n - 1 - i pairs.
+    shares = [list(range(w, n, workers)) for w in range(workers)]
+    if workers == 1:
+        parts = [_rows(samples, shares[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_rows, [samples] * workers, shares))
+    for part in parts:
+        for i, j, vals in part:
+            for m, v in zip(METRICS[:4], vals):
+                out[m][i, j] = out[m][j, i] = v
+    for k, metrics in ((0, METRICS[0:2]), (1, METRICS[2:4])):
+        missing = np.array([s[k] is None for s in samples])
+        for m in metrics:
+            out[m][missing, :] = np.nan
+            out[m][:, missing] = np.nan
+
+    acf = np.array([acf_vector(d, lags) for _, _, d, _ in sessions]).reshape(n, lags)
+    out['acf'] = np.sqrt(((acf[:, None, :] - acf[None, :, :]) ** 2).sum(axis=2))
+    return out
+
+
+def combined_distance(mats: dict) -> np.ndarray:
+    """Each metric over its median off-diagonal value, averaged where present."""
+    n = next(iter(mats.values())).shape[0]
+    off = ~np.eye(n, dtype=bool)
+    scaled = []
+    for m in METRICS:
+        v = mats[m][off]
+        med = np.nanmedian(v) if np.isfinite(v).any() else np.nan
+        if med and np.isfinite(med):
+            scaled.append(mats[m] / med)
+    stack = np.array(scaled)
+    have = np.isfinite(stack)
+    d = np.where(have, stack, 0.0).sum(axis=0) / np.maximum(have.sum(axis=0), 1)
+    d[have.sum(axis=0) == 0] = np.nan
+    np.fill_diagonal(d, 0.0)
+    return d
+
+
+def average_linkage(d: np.ndarray) -> np.ndarray:
+    """Agglomerative clustering by average linkage.
+
+    Returns scipy-style linkage rows (a, b, distance, size): cluster ids
+    below n are sessions, n + k the cluster made at step k. Pairs with no
+    distance (NaN) are merged last.
+    """
+    n = d.shape[0]
+    big = np.nanmax(d) * 10 + 1 if np.isfinite(d).any() else 1.0
+    dist = np.where(np.isfinite(d), d, big).astype(float)
+    np.fill_diagonal(dist, np.inf)
+    size = np.ones(n)
+    ids = list(range(n))
+    alive = np.ones(n, dtype=bool)
+    links = []
+    for step in range(n - 1):
+        flat = np.argmin(dist)
+        i, j = divmod(int(flat), n)
+        if i > j:
+            i, j = j, i
+        links.append((ids[i], ids[j], float(dist[i, j]), size[i] + size[j]))
+        # Lance-Williams update for average linkage: the new cluster's
+        # distance is the size-weighted mean of its parts' distances.
+        row = (size[i] * dist[i] + size[j] * dist[j]) / (size[i] + size[j])
+        row[~alive] = np.inf
+        dist[i, :] = row
+        dist[:, i] = row
+        dist[i, i] = np.inf
+        dist[j, :] = np.inf
+        dist[:, j] = np.inf
+        alive[j] = False
+        size[i] += size[j]
+        ids[i] = n + step
+    return np.array(links).reshape(-1, 4)
+
+
+def cut(links: np.ndarray, n: int, clusters: int) -> np.ndarray:
+    """Cluster label per session after undoing the last clusters - 1 merges."""
+    parent = list(range(n + len(links)))
+    for step, (a, b, _, _) in enumerate(links[:max(0, n - clusters)]):
+        parent[int(a)] = parent[int(b)] = n + step
+
+    def root(x):
+        while parent[x] != x:
+            x = parent[x]
+        return x
+    roots = [root(i) for i in range(n)]
+    relabel = {r: k for k, r in enumerate(dict.fromkeys(roots))}
+    return np.array([relabel[r] for r in roots], dtype=np.int32)
+
+
+def main(argv=None):
+    from analysis.batch import find_recordings
+    from analysis.features import recording_session, engine_session
+    from mimic.config import ClickEnginePresets
+
+    parser = argparse.ArgumentParser(
+        description="Pairwise distances between recordings, and clusters of them.")
+    parser.add_argument("directory", help="folder of recordings, e.g. ../click_data")
+    parser.add_argument("--out", required=True, help=".npz path to write")
+    parser.add_argument("--clusters", type=int, default=3)
+    parser.add_argument("--lags", type=int, default=ACF_LAGS, help="ACF lags compared")
+    parser.add_argument("--simulate", type=int, default=0, metavar="PRESSES",
+                        help="add a simulated session of this many presses per preset")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    if not Path(args.directory).is_dir():
+        parser.error(f"not a directory: {args.directory}")
+    sessions = [recording_session(p) for p in find_recordings(Path(args.directory))]
+    if args.simulate:
+        sessions += [engine_session(p, args.simulate, args.seed)
+                     for p in ClickEnginePresets.get_preset_list()]
+    if len(sessions) < 2:
+        parser.error("need at least two sessions to compare")
+
+    t0 = time.perf_counter()
+    mats = distance_matrices(sessions, args.lags, args.workers)
+    combined = combined_distance(mats)
+    links = average_linkage(combined)
+    labels = cut(links, len(sessions), min(args.clusters, len(sessions)))
+    elapsed = time.perf_counter() - t0
+
+    names = [name for name, *_ in sessions]
+    np.savez_compressed(args.out, names=np.array(names),
+                        kinds=np.array([kind for _, kind, *_ in sessions]),
+                        combined=combined, linkage=links, labels=labels, **mats)
+    print(f"[DISTANCE] {len(sessions)} sessions, {len(sessions) * (len(sessions) - 1) // 2} "
+          f"pairs in {elapsed:.2f} s -> {args.out}")
+    for k in range(labels.max() + 1):
+        members = [names[i] for i in np.flatnonzero(labels == k)]
+        print(f"  cluster {k} ({len(members)}): {', '.join(members)}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
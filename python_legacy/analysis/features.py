@@ -0,0 +1,220 @@
+"""Windowed feature matrix over many sessions, for training a classifier.
+
+Part of Mimic. A classifier needs one row per window of a session and one
+column per diagnostic. Each session's intervals are viewed as overlapping
+windows with sliding_window_view (no copy), and a block of windows at a
+time goes through bootstrap.diagnostics_matrix(), so every
+fit_diagnostics() statistic is computed for all windows at once.
+
+The hold/interval coupling and the Rayleigh polling scores are sums over a
+window, so they come from prefix sums instead: one cumulative sum per
+quantity over the session, and every window's total is a difference of
+two entries. Their cost does not depend on the window length.
+
+The result is written as a compressed .npz: float32 features plus the
+session, kind and start interval of every row. A million windows of 128
+intervals take about seven seconds on one core.
+
+Intervals are used as recorded. get_stats() folds switch chatter away
+before its diagnostics; a classifier should see it.
+
+    cd python_legacy
+    python -m analysis.features ../click_data --out features.npz
+    python -m analysis.features ../click_data --simulate 200000 --window 64 --stride 4 --out f.npz
+"""
+
+import os
+import argparse
+import time
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from analysis.bootstrap import (BATCH_ELEMENTS, DIAGNOSTIC_KEYS, MIN_PARALLEL_ELEMENTS,
+                                diagnostics_matrix)
+from analysis.pollscan import NOMINAL_RATES_HZ
+
+
+WINDOW = 128
+STRIDE = 8
+MIN_HOLDS = 3           # held pairs in a window below which coupling is NaN
+
+HOLD_KEYS = ('hold_mean_ms', 'hold_std_ms', 'hold_delay_corr')
+POLL_KEYS = tuple(f'poll_z_{hz}' for hz in NOMINAL_RATES_HZ)
+FEATURES = ('mean_ms', 'std_ms') + DIAGNOSTIC_KEYS + HOLD_KEYS + POLL_KEYS
+
+
+def _window_sums(a: np.ndarray, window: int, starts: np.ndarray) -> np.ndarray:
+    """Sum of a[s:s + window] for every s in starts, by prefix sums."""
+    cs = np.zeros(a.shape[0] + 1, dtype=a.dtype)
+    np.cumsum(a, out=cs[1:])
+    return cs[starts + window] - cs[starts]
+
+
+def _hold_features(d, holds, window, starts) -> dict:
+    """Hold mean/std and Pearson r with the interval each hold starts.
+
+    Presses without a hold (hold 0, older recordings) are left out; fewer
+    than MIN_HOLDS in a window gives NaN.
+    """
+    held = holds > 0
+    w = held.astype(float)
+    # Centre on the session means so the prefix sums stay well conditioned.
+    offset = holds[held].mean() if held.any() else 0.0
+    h = np.where(held, holds - offset, 0.0)
+    x = np.where(held, d - d.mean(), 0.0)
+    c = _window_sums(w, window, starts)
+    sh, sx = _window_sums(h, window, starts), _window_sums(x, window, starts)
+    shh, sxx = _window_sums(h * h, window, starts), _window_sums(x * x, window, starts)
+    shx = _window_sums(h * x, window, starts)
+
+    ok = c >= MIN_HOLDS
+    cs = np.where(ok, c, 1.0)
+    mh, mx = sh / cs, sx / cs
+    vh = np.maximum(shh / cs - mh * mh, 0.0)
+    vx = np.maximum(sxx / cs - mx * mx, 0.0)
+    cov = shx / cs - mh * mx
+    den = np.sqrt(vh * vx)
+    corr = np.where(den > 0, cov / np.where(den > 0, den, 1.0), 0.0)
+    nan = np.full(starts.shape, np.nan)
+    return {
+        'hold_mean_ms': np.where(ok, mh + offset, nan),
+        'hold_std_ms': np.where(ok, np.sqrt(vh), nan),
+        'hold_delay_corr': np.where(ok, corr, nan),
+    }
+
+
+def _poll_features(d, window, starts) -> dict:
+    """pollscan's Rayleigh z = |sum exp(2*pi*i*f*d)|^2 / n at each nominal rate."""
+    out = {}
+    for hz, key in zip(NOMINAL_RATES_HZ, POLL_KEYS):
+        a = 2.0 * np.pi * np.mod(d * (hz / 1000.0), 1.0)
+        s = _window_sums(np.cos(a), window, starts) + 1j * _window_sums(np.sin(a), window, starts)
+        out[key] = (s.real ** 2 + s.imag ** 2) / window
+    return out
+
+
+def session_features(delays, holds=None, window: int = WINDOW, stride: int = STRIDE):
+    """(starts, features) for one session's windows.
+
+    delays: the session's intervals in ms. holds: hold_ms of the press that
+    starts each interval (same length), or None. features is (windows x
+    len(FEATURES)) float64; starts the first interval of each window.
+    """
+    d = np.asarray(delays, dtype=float)
+    if d.size < window:
+        return np.empty(0, dtype=np.int64), np.empty((0, len(FEATURES)))
+    starts = np.arange(0, d.size - window + 1, stride)
+    out = np.empty((starts.size, len(FEATURES)))
+    col = {k: i for i, k in enumerate(FEATURES)}
+
+    views = sliding_window_view(d, window)[::stride]
+    rows = max(1, BATCH_ELEMENTS // window)
+    for i in range(0, starts.size, rows):
+        block = views[i:i + rows]
+        stats = diagnostics_matrix(block)
+        out[i:i + rows, col['mean_ms']] = block.mean(axis=1)
+        out[i:i + rows, col['std_ms']] = block.std(axis=1)
+        for k in DIAGNOSTIC_KEYS:
+            out[i:i + rows, col[k]] = stats[k]
+
+    h = np.zeros_like(d) if holds is None else np.asarray(holds, dtype=float)
+    for k, v in {**_hold_features(d, h, window, starts), **_poll_features(d, window, starts)}.items():
+        out[:, col[k]] = v
+    return starts, out
+
+
+def _session_worker(args):
+    delays, holds, window, stride = args
+    return session_features(delays, holds, window, stride)
+
+
+def extract(sessions, window: int = WINDOW, stride: int = STRIDE, workers=None) -> dict:
+    """Feature table for sessions = [(name, kind, delays, holds)].
+
+    Sessions shorter than one window contribute no rows. workers as in
+    bootstrap_diagnostics(): None uses a pool only for big jobs.
+    """
+    sessions = list(sessions)
+    jobs = [(d, h, window, stride) for _, _, d, h in sessions]
+    if workers is None:
+        big = sum(len(d) for d, *_ in jobs) * window // stride >= MIN_PARALLEL_ELEMENTS
+        workers = (os.cpu_count() or 1) if big else 1
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            parts = list(pool.map(_session_worker, jobs))
+    else:
+        parts = [_session_worker(j) for j in jobs]
+
+    return {
+        'features': np.concatenate([f for _, f in parts]).astype(np.float32),
+        'feature_names': np.array(FEATURES),
+        'session': np.concatenate([np.full(s.size, i, dtype=np.int32)
+                                   for i, (s, _) in enumerate(parts)]),
+        'start': np.concatenate([s for s, _ in parts]).astype(np.int32),
+        'names': np.array([name for name, *_ in sessions]),
+        'kinds': np.array([kind for _, kind, *_ in sessions]),
+        'window': np.int32(window),
+        'stride': np.int32(stride),
+    }
+
+
+def save_npz(filepath: str, table: dict) -> None:
+    np.savez_compressed(filepath, **table)
+
+
+def recording_session(path: Path, kind: str = "human"):
+    """(name, kind, delays, holds) from one click_data/ CSV."""
+    from MimicBenchmarkTool import ClickSession
+    clicks = ClickSession.from_csv(str(path)).clicks
+    return (path.stem, kind, [c.delay_ms for c in clicks[1:]],
+            [c.hold_ms for c in clicks[:-1]])
+
+
+def engine_session(preset: str, presses: int, seed=None, enhanced_mode: bool = True):
+    """(name, kind, delays, holds) from simulate_events() for one preset."""
+    from mimic.engine import AdaptiveClickerEngine
+    table = AdaptiveClickerEngine(enhanced_mode, preset).simulate_events(presses, seed=seed)
+    return (f"engine_{preset}", "engine", table.intervals(), table.hold_ms[:-1])
+
+
+def main(argv=None):
+    from analysis.batch import find_recordings
+    from mimic.config import ClickEnginePresets
+
+    parser = argparse.ArgumentParser(
+        description="Extract a windowed feature matrix from recordings (and engine output).")
+    parser.add_argument("directory", help="folder of recordings, e.g. ../click_data")
+    parser.add_argument("--out", required=True, help=".npz path to write")
+    parser.add_argument("--window", type=int, default=WINDOW)
+    parser.add_argument("--stride", type=int, default=STRIDE)
+    parser.add_argument("--simulate", type=int, default=0, metavar="PRESSES",
+                        help="add a simulated session of this many presses per preset")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    if not Path(args.directory).is_dir():
+        parser.error(f"not a directory: {args.directory}")
+    if args.window < 4 or args.stride < 1:
+        parser.error("--window must be at least 4 and --stride at least 1")
+    sessions = [recording_session(p) for p in find_recordings(Path(args.directory))]
+    if args.simulate:
+        sessions += [engine_session(p, args.simulate, args.seed)
+                     for p in ClickEnginePresets.get_preset_list()]
+    if not sessions:
+        parser.error(f"no recordings under {args.directory}")
+
+    t0 = time.perf_counter()
+    table = extract(sessions, args.window, args.stride, args.workers)
+    elapsed = time.perf_counter() - t0
+    save_npz(args.out, table)
+    print(f"[FEATURES] {table['features'].shape[0]} windows x {len(FEATURES)} features "
+          f"from {len(sessions)} sessions in {elapsed:.2f} s -> {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
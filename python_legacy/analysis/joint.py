@@ -0,0 +1,252 @@
+"""Joint density of button hold and the interval that follows it.
+
+Part of Mimic. get_hold_stats() sums the hold/interval relationship up as
+one Pearson r, which hides its shape: on a double-clicking mouse the holds
+are two populations -- ~17 ms bounce presses (Config.DOUBLE_HOLD_MS)
+against ~46 ms motor presses (Config.HOLD_MEDIAN_MS) -- each followed by a
+very different interval. A single r across both means little.
+
+JointDensity counts (hold, next interval) pairs into a fixed grid of
+log-spaced bins on both axes, so adding a pair during capture is O(1) and
+a whole recording goes in with one bincount. From the grid:
+
+    kde()                    binned Gaussian KDE: the counts smoothed by
+                             one small kernel matrix per axis (K_h C K_d^T),
+                             bandwidth by Scott's rule in log-bin units.
+                             Cost depends on the grid, not the pair count.
+    hold_modes()             peaks of the smoothed hold marginal.
+    conditional_quantiles()  interval quantiles within each hold band,
+                             interpolated inside bins.
+    to_rgb()                 the KDE, log colour-mapped like mimic.heatmap,
+                             ready for one PhotoImage.
+
+    cd python_legacy
+    python -m analysis.joint ../click_data/ClickData_20260807_193042.csv --png joint.png
+"""
+
+import math
+import argparse
+
+import numpy as np
+
+
+HOLD_RANGE_MS = (5.0, 500.0)
+INTERVAL_RANGE_MS = (10.0, 2000.0)
+BINS_PER_DECADE = 32
+HOLD_BANDS_MS = (0.0, 25.0, 40.0, 60.0, 100.0, math.inf)    # 25 splits bounce from motor
+QUANTILES = (0.10, 0.50, 0.90)
+MIN_BAND_PAIRS = 5      # hold bands with fewer pairs get no quantiles
+MIN_MODE_SHARE = 0.05   # a hold mode must hold this much of the peak density
+
+
+class JointDensity:
+    """Counts of (hold, next interval), both on log-spaced bins.
+
+    counts[i, j]: hold bin i, interval bin j. Values outside the ranges are
+    clamped into the end bins; holds of 0 (not captured) are skipped.
+    version changes on every add.
+    """
+
+    def __init__(self, hold_range=HOLD_RANGE_MS, interval_range=INTERVAL_RANGE_MS,
+                 per_decade: int = BINS_PER_DECADE):
+        self.per_decade = per_decade
+        self.hold_log_lo = math.log10(hold_range[0])
+        self.interval_log_lo = math.log10(interval_range[0])
+        self.hold_bins = int(math.ceil(math.log10(hold_range[1] / hold_range[0]) * per_decade))
+        self.interval_bins = int(math.ceil(
+            math.log10(interval_range[1] / interval_range[0]) * per_decade))
+        self.counts = np.zeros((self.hold_bins, self.interval_bins), dtype=np.int64)
+        self.total = 0
+        self.version = 0
+
+    # ── filling ──────────────────────────────────────────────────────────
+
+    def _bin(self, x: float, log_lo: float, bins: int) -> int:
+        i = int((math.log10(x) - log_lo) * self.per_decade) if x > 0 else 0
+        return 0 if i < 0 else (bins - 1 if i >= bins else i)
+
+    def add(self, hold_ms: float, interval_ms: float) -> None:
+        if hold_ms <= 0:
+            return
+        i = self._bin(hold_ms, self.hold_log_lo, self.hold_bins)
+        j = self._bin(interval_ms, self.interval_log_lo, self.interval_bins)
+        self.counts[i, j] += 1
+        self.total += 1
+        self.version += 1
+
+    def extend(self, holds, intervals) -> None:
+        """Add many pairs at once."""
+        h = np.asarray(holds, dtype=float)
+        d = np.asarray(intervals, dtype=float)
+        keep = h > 0
+        h, d = h[keep], np.maximum(d[keep], 1e-9)
+        if not h.size:
+            return
+        i = np.clip(((np.log10(h) - self.hold_log_lo) * self.per_decade).astype(np.int64),
+                    0, self.hold_bins - 1)
+        j = np.clip(((np.log10(d) - self.interval_log_lo) * self.per_decade).astype(np.int64),
+                    0, self.interval_bins - 1)
+        self.counts += np.bincount(i * self.interval_bins + j,
+                                   minlength=self.counts.size).reshape(self.counts.shape)
+        self.total += int(h.size)
+        self.version += 1
+
+    def clear(self) -> None:
+        self.counts[:] = 0
+        self.total = 0
+        self.version += 1
+
+    # ── axes ─────────────────────────────────────────────────────────────
+
+    def hold_edges(self) -> np.ndarray:
+        return 10.0 ** (self.hold_log_lo + np.arange(self.hold_bins + 1) / self.per_decade)
+
+    def interval_edges(self) -> np.ndarray:
+        return 10.0 ** (self.interval_log_lo + np.arange(self.interval_bins + 1) / self.per_decade)
+
+    def hold_centres(self) -> np.ndarray:
+        return 10.0 ** (self.hold_log_lo + (np.arange(self.hold_bins) + 0.5) / self.per_decade)
+
+    # ── smoothing ────────────────────────────────────────────────────────
+
+    def bandwidth(self) -> tuple:
+        """Scott's rule, n^(-1/6) times each axis' spread, in bins (at least half a bin)."""
+        if self.total < 2:
+            return 1.0, 1.0
+        factor = self.total ** (-1.0 / 6.0)
+        out = []
+        for axis, bins in ((1, self.hold_bins), (0, self.interval_bins)):
+            w = self.counts.sum(axis=axis).astype(float)
+            x = np.arange(bins)
+            mean = (w @ x) / self.total
+            sd = math.sqrt(max((w @ (x - mean) ** 2) / self.total, 0.0))
+            out.append(max(0.5, factor * sd))
+        return tuple(out)
+
+    @staticmethod
+    def _kernel(bins: int, bw: float) -> np.ndarray:
+        """(bins x bins) Gaussian smoothing matrix, rows summing to 1."""
+        x = np.arange(bins)
+        k = np.exp(-0.5 * ((x[:, None] - x[None, :]) / bw) ** 2)
+        return k / k.sum(axis=1, keepdims=True)
+
+    def kde(self, bandwidth=None) -> np.ndarray:
+        """Smoothed density over the grid, summing to 1 (zeros if empty)."""
+        if not self.total:
+            return np.zeros(self.counts.shape)
+        bh, bd = bandwidth or self.bandwidth()
+        # Each kernel row sums to 1, so no count's mass leaks off the edges.
+        dens = self._kernel(self.hold_bins, bh).T @ self.counts @ self._kernel(self.interval_bins, bd)
+        return dens / dens.sum()
+
+    # ── summaries ────────────────────────────────────────────────────────
+
+    def hold_modes(self, density=None) -> list:
+        """Hold values (ms) at local maxima of the smoothed hold marginal."""
+        dens = self.kde() if density is None else density
+        m = dens.sum(axis=1)
+        if not m.any():
+            return []
+        inner = (m[1:-1] > m[:-2]) & (m[1:-1] >= m[2:]) & (m[1:-1] >= MIN_MODE_SHARE * m.max())
+        peaks = np.flatnonzero(inner) + 1
+        return [round(float(c), 1) for c in self.hold_centres()[peaks]]
+
+    def conditional_quantiles(self, qs=QUANTILES, bands=HOLD_BANDS_MS) -> list:
+        """Interval quantiles for the pairs in each hold band.
+
+        Bands are snapped to bin edges. Quantiles interpolate the cumulative
+        count linearly in log interval within a bin.
+        """
+        centres = self.hold_centres()
+        log_edges = np.log(self.interval_edges())
+        out = []
+        for lo, hi in zip(bands, bands[1:]):
+            rows = (centres >= lo) & (centres < hi)
+            col = self.counts[rows].sum(axis=0)
+            n = int(col.sum())
+            row = {'hold_lo_ms': lo, 'hold_hi_ms': hi if math.isfinite(hi) else None, 'pairs': n}
+            if n >= MIN_BAND_PAIRS:
+                cum = np.concatenate([[0.0], np.cumsum(col)]) / n
+                target = np.asarray(qs, dtype=float)
+                # Bin k - 1 is the one whose cumulative share first reaches the target.
+                k = np.clip(np.searchsorted(cum, target, side='left'), 1, col.size)
+                frac = (target - cum[k - 1]) / np.maximum(cum[k] - cum[k - 1], 1e-12)
+                vals = np.exp(log_edges[k - 1] + frac * (log_edges[k] - log_edges[k - 1]))
+                row.update({f"p{round(q * 100)}_ms": round(float(v), 1) for q, v in zip(qs, vals)})
+            out.append(row)
+        return out
+
+    def summary(self) -> dict:
+        return {'pairs': self.total, 'hold_modes_ms': self.hold_modes(),
+                'bandwidth_bins': [round(b, 2) for b in self.bandwidth()],
+                'conditional': self.conditional_quantiles()}
+
+    # ── output ───────────────────────────────────────────────────────────
+
+    def to_rgb(self, width: int, height: int) -> np.ndarray:
+        """(height, width, 3) uint8 image of the KDE: hold across, interval up.
+
+        Log-scaled against the peak, so the sparse bounce cluster stays
+        visible beside the motor band.
+        """
+        from mimic.heatmap import colormap_lut
+        lut = colormap_lut()
+        dens = self.kde()
+        peak = dens.max()
+        if peak > 0:
+            floor = peak * 1e-3
+            level = np.clip(np.log(np.maximum(dens, floor) / floor) / np.log(peak / floor), 0.0, 1.0)
+        else:
+            level = np.zeros(dens.shape)
+        rgb = lut[(level * (len(lut) - 1)).astype(np.intp)]
+        hi = np.arange(width) * self.hold_bins // width
+        ii = (self.interval_bins - 1) - (np.arange(height) * self.interval_bins // height)
+        return rgb[hi[None, :], ii[:, None]]
+
+    def export(self, filepath: str) -> None:
+        """Save the counts, the KDE and both axes as .npz."""
+        np.savez_compressed(filepath, counts=self.counts, kde=self.kde(),
+                            hold_edges=self.hold_edges(), interval_edges=self.interval_edges(),
+                            total=self.total)
+
+
+def from_pairs(pairs) -> JointDensity:
+    """JointDensity of [(hold_ms, next interval_ms)], as ClickSession._hold_pairs() gives."""
+    jd = JointDensity()
+    if pairs:
+        h, d = zip(*pairs)
+        jd.extend(h, d)
+    return jd
+
+
+def main(argv=None):
+    from MimicBenchmarkTool import ClickSession
+    from mimic.heatmap import save_png
+
+    parser = argparse.ArgumentParser(
+        description="Joint hold / next-interval density of one recording.")
+    parser.add_argument("recording", help="a click_data/ CSV with hold_ms")
+    parser.add_argument("--png", default=None, help="write the KDE heatmap here")
+    parser.add_argument("--npz", default=None, help="write counts and KDE here")
+    args = parser.parse_args(argv)
+
+    jd = ClickSession.from_csv(args.recording).joint_density()
+    if not jd.total:
+        parser.error("no holds recorded in this file")
+    s = jd.summary()
+    print(f"[JOINT] {s['pairs']} pairs, hold modes at {s['hold_modes_ms']} ms")
+    for row in s['conditional']:
+        qs = "  ".join(f"{k[:-3]} {v:7.1f}" for k, v in row.items() if k.endswith('_ms')
+                       and k.startswith('p'))
+        hi = f"-{row['hold_hi_ms']:.0f}" if row['hold_hi_ms'] is not None else "+"
+        print(f"  hold {row['hold_lo_ms']:>5.0f}{hi:<5} ms  "
+              f"n={row['pairs']:<6} {qs}")
+    if args.png:
+        save_png(args.png, jd.to_rgb(400, 300))
+    if args.npz:
+        jd.export(args.npz)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,306 @@
+"""USB polling-rate inference by a dense Rayleigh scan.
+
+Part of Mimic. A mouse can only raise an event on a polling boundary, so
+press-to-press intervals cluster near whole multiples of the polling period.
+For a candidate rate f the Rayleigh statistic
+
+    z(f) = |sum_j exp(2*pi*i * f * d_j)|^2 / n
+
+measures how tightly the intervals d_j wrap onto that grid. The old estimator
+scored four nominal rates; this scans thousands of candidates between 100 Hz
+and 10 kHz (periods 10 ms down to 0.1 ms), which finds 2/4/8 kHz devices and
+clocks that sit slightly off their nominal rate.
+
+Cost: a uniform frequency grid f = f0 + (k*C + j)*df factors the
+candidates x intervals phase matrix as exp(2*pi*i*(f0 + k*C*df)*d) times
+exp(2*pi*i*j*df*d). Both factors are small (C x block and block x K) and
+are built as successive powers of one phasor per interval, so the trig cost
+is three calls per interval rather than one per (candidate, interval) pair.
+The spectrum for a block of intervals is then one complex matrix product.
+Memory is bounded by the block size, not by n or the number of candidates.
+
+Harmonics: intervals that are whole multiples of 1/f are also whole
+multiples of 1/(2f), 1/(4f), ..., so an exactly quantised session scores as
+high at every harmonic as at f, and the grid peak can land on any of them.
+The peak is therefore walked down to the lowest sub-harmonic f/k that
+still scores within HARMONIC_TOLERANCE of it. python -m analysis.pollscan
+--check runs synthetic sessions at known rates through the scan.
+
+    cd python_legacy
+    python -m analysis.pollscan --check
+    python -m analysis.pollscan ../click_data/ClickData_20260807_193042.csv
+"""
+
+import math
+import argparse
+
+import numpy as np
+
+
+NOMINAL_RATES_HZ = (125, 250, 500, 1000, 2000, 4000, 8000)
+
+F_MIN_HZ = 100.0        # 10 ms period
+F_MAX_HZ = 10000.0      # 0.1 ms period
+N_CANDIDATES = 8192     # ~1.2 Hz spacing, inside the ~3 Hz peak width of
+                        # a session whose intervals spread by ~50 ms
+INTERVAL_BLOCK = 8192   # intervals per matrix product
+SUB_GRID = 64           # j in the factorization above
+
+CONFIDENCE_LEVEL = 0.99
+NOMINAL_TOLERANCE = 0.02    # within 2% of a standard rate -> call it that rate
+HARMONIC_TOLERANCE = 0.8    # f/k replaces the peak if its z is at least this share
+
+
+def _phasor(cycles: np.ndarray) -> np.ndarray:
+    # Reduce to [0, 1) before scaling by 2*pi; at 10 kHz x 450 ms the raw
+    # argument is thousands of cycles and the fractional part is what counts.
+    # cos/sin into a preallocated array is ~5x faster than np.exp(1j * x).
+    a = 2.0 * np.pi * np.mod(cycles, 1.0)
+    out = np.empty(a.shape, dtype=complex)
+    np.cos(a, out=out.real)
+    np.sin(a, out=out.imag)
+    return out
+
+
+def _powers(base: np.ndarray, count: int, out: np.ndarray) -> np.ndarray:
+    """out[j] = base ** j by repeated multiplication -- no trig per row."""
+    out[0] = 1.0
+    for j in range(1, count):
+        np.multiply(out[j - 1], base, out=out[j])
+    return out
+
+
+def _grid_sums(d_s, f0, df, m, block=INTERVAL_BLOCK) -> np.ndarray:
+    """sum_j exp(2*pi*i*f*d_j) for f = f0 + i*df, i < m. d_s in seconds."""
+    c = min(SUB_GRID, m)
+    k = -(-m // c)
+    acc = np.zeros((c, k), dtype=complex)
+    w = np.empty((c, min(block, d_s.size)), dtype=complex)
+    b = np.empty((k, min(block, d_s.size)), dtype=complex)
+    for i in range(0, d_s.size, block):
+        chunk = d_s[i:i + block]
+        nb = chunk.size
+        _powers(_phasor(df * chunk), c, w[:, :nb])            # j * df
+        _powers(_phasor(c * df * chunk), k, b[:, :nb])        # k * C * df
+        b[:, :nb] *= _phasor(f0 * chunk)                      # + f0
+        acc += w[:, :nb] @ b[:, :nb].T
+    # acc[j, k] is the sum for candidate k*C + j.
+    return acc.T.reshape(-1)[:m]
+
+
+def rayleigh_scores(delays_ms, freqs_hz) -> np.ndarray:
+    """Exact Rayleigh z at arbitrary frequencies. For short candidate lists."""
+    d = np.asarray(delays_ms, dtype=float)
+    f = np.asarray(freqs_hz, dtype=float)
+    out = np.empty(f.size)
+    step = max(1, (1 << 22) // max(1, d.size))     # bound the f x n matrix
+    for i in range(0, f.size, step):
+        s = _phasor(np.outer(f[i:i + step] / 1000.0, d)).sum(axis=1)
+        out[i:i + step] = (s.real ** 2 + s.imag ** 2) / max(1, d.size)
+    return out
+
+
+def _grid_scores(d_ms, f0, df, m) -> np.ndarray:
+    s = _grid_sums(np.asarray(d_ms, dtype=float) / 1000.0, f0, df, m)
+    return (s.real ** 2 + s.imag ** 2) / max(1, len(d_ms))
+
+
+def rayleigh_spectrum(delays_ms, f_min=F_MIN_HZ, f_max=F_MAX_HZ,
+                      n_candidates=N_CANDIDATES):
+    """Rayleigh z over a uniform grid of n_candidates rates in [f_min, f_max).
+
+    Returns (freqs_hz, scores).
+    """
+    m = int(n_candidates)
+    df = (f_max - f_min) / m
+    freqs = f_min + df * np.arange(m)
+    return freqs, _grid_scores(delays_ms, f_min, df, m)
+
+
+def rayleigh_p_value(z: float, n: int) -> float:
+    """Single-test p-value of a Rayleigh z (Zar's second-order expansion)."""
+    if n <= 0:
+        return 1.0
+    p = math.exp(-z) * (1.0 + (2.0 * z - z * z) / (4.0 * n)
+                        - (24.0 * z - 132.0 * z ** 2 + 76.0 * z ** 3 - 9.0 * z ** 4)
+                        / (288.0 * n * n))
+    return min(1.0, max(0.0, p))
+
+
+def _refine_peak(d_ms, f_peak, df):
+    """Re-score a fine grid across the winning coarse cell."""
+    fine = np.linspace(f_peak - df, f_peak + df, 65)
+    z = _grid_scores(d_ms, fine[0], fine[1] - fine[0], fine.size)
+    i = int(np.argmax(z))
+    return float(fine[i]), float(z[i])
+
+
+def _fundamental(d_ms, f_peak, z_peak, f_min=F_MIN_HZ) -> int:
+    """Largest k such that f_peak / k still scores like the peak (1 if none).
+
+    Off the true rate f/k wraps odd multiples of the period onto half
+    cycles and z collapses, so only the fundamental and its harmonics pass.
+    """
+    ks = np.arange(2, int(f_peak // f_min) + 1)
+    if not ks.size:
+        return 1
+    z = rayleigh_scores(d_ms, f_peak / ks)
+    ok = np.flatnonzero(z >= HARMONIC_TOLERANCE * z_peak)
+    return int(ks[ok[-1]]) if ok.size else 1
+
+
+def _drift_correct(d_ms, f_peak, df, segments=4):
+    """Track the peak across the session and fit a linear clock drift.
+
+    A constant offset from nominal is already handled by the dense grid; a
+    clock that drifts during the session smears the peak instead. Each
+    segment's peak is located independently near the global one, and a
+    z-weighted line through them (frequency against elapsed time) gives the
+    drift. The intervals are then re-scored against that drifting grid.
+    """
+    n = d_ms.size
+    if n < segments * 30:
+        return None
+    t = np.cumsum(d_ms) / 1000.0                                  # seconds
+    bounds = np.linspace(0, n, segments + 1).astype(int)
+    mids, peaks, weights = [], [], []
+    for a, b in zip(bounds[:-1], bounds[1:]):
+        fine = np.linspace(f_peak - 2 * df, f_peak + 2 * df, 81)
+        z = _grid_scores(d_ms[a:b], fine[0], fine[1] - fine[0], fine.size)
+        i = int(np.argmax(z))
+        mids.append(float(t[a:b].mean()))
+        peaks.append(float(fine[i]))
+        weights.append(float(z[i]))
+
+    w = np.asarray(weights)
+    if w.sum() <= 0:
+        return None
+    slope, intercept = np.polyfit(mids, peaks, 1, w=np.sqrt(w))
+    f_t = intercept + slope * t                                   # per interval
+    s = _phasor(f_t * d_ms / 1000.0).sum()
+    return {
+        'poll_drift_hz_per_min': round(float(slope) * 60.0, 4),
+        'poll_corrected_hz': round(float(intercept + slope * t.mean()), 3),
+        'poll_corrected_score': round(float(abs(s) ** 2 / n), 1),
+    }
+
+
+def scan_poll_rate(delays_ms, with_spectrum=False, **grid) -> dict:
+    """Dense polling-rate estimate for one session's intervals.
+
+    The Rayleigh peak over the whole grid is moved down to its fundamental
+    (see _fundamental), refined on a fine local grid, then judged against
+    the number of effectively independent candidates (grid span times
+    interval span), since scanning thousands of rates turns up a large z
+    somewhere by chance alone. The rate is reported as the nearest standard
+    USB rate when the peak sits within 2% of one. Below CONFIDENCE_LEVEL the
+    peak is chance, so the rate, peak, offset and drift are all None or
+    absent; only the confidence and scores are kept.
+    """
+    d = np.asarray(delays_ms, dtype=float)
+    n = d.size
+    freqs, scores = rayleigh_spectrum(d, **grid)
+    df = float(freqs[1] - freqs[0]) if freqs.size > 1 else 1.0
+
+    k = int(np.argmax(scores))
+    # Harmonic h of the coarse cell is off by at most df / 2, so f / h is
+    # off by df / (2h): refine over that narrower cell.
+    h = _fundamental(d, float(freqs[k]), float(scores[k]),
+                     grid.get('f_min', F_MIN_HZ)) if n else 1
+    peak_hz, peak_z = _refine_peak(d, float(freqs[k]) / h, df / h)
+
+    span_s = (float(d.max() - d.min()) / 1000.0) if n else 0.0
+    trials = max(1.0, min(float(freqs.size), (freqs[-1] - freqs[0]) * span_s))
+    p_single = rayleigh_p_value(peak_z, n)
+    p_global = min(1.0, -math.expm1(trials * math.log1p(-min(p_single, 1.0 - 1e-16))))
+    confidence = 1.0 - p_global
+
+    nominal = min(NOMINAL_RATES_HZ, key=lambda r: abs(r - peak_hz))
+    rate = nominal if abs(nominal - peak_hz) <= NOMINAL_TOLERANCE * nominal else round(peak_hz)
+
+    accepted = confidence >= CONFIDENCE_LEVEL
+    out = {
+        'poll_rate_hz': rate if accepted else None,
+        'poll_confidence': round(confidence, 4),
+        'poll_peak_hz': round(peak_hz, 3) if accepted else None,
+        'poll_peak_score': round(peak_z, 1),
+        'poll_offset_ppm': round((peak_hz - nominal) / nominal * 1e6, 1) if accepted else None,
+        'poll_scores': {
+            r: round(float(z), 1)
+            for r, z in zip(NOMINAL_RATES_HZ, rayleigh_scores(d, NOMINAL_RATES_HZ))
+        },
+    }
+    drift = _drift_correct(d, peak_hz, df) if accepted else None
+    if drift:
+        out.update(drift)
+    if with_spectrum:
+        out['poll_spectrum'] = {'freqs_hz': freqs, 'periods_ms': 1000.0 / freqs,
+                                'scores': scores}
+    return out
+
+
+CHECK_CASES = (
+    # (true rate Hz, timing jitter ms, expected poll_rate_hz)
+    (125.0, 0.02, 125),
+    (250.0, 0.02, 250),
+    (1000.0, 0.0, 1000),
+    (997.0, 0.0, 1000),
+    (997.0, 0.02, 1000),
+    (1003.5, 0.0, 1000),
+    (1003.5, 0.02, 1000),
+    (500.0, 0.02, 500),
+    (2000.0, 0.02, 2000),
+    (8000.0, 0.0, 8000),
+)
+
+
+def synthetic_session(rate_hz, jitter_ms, n=600, seed=0) -> np.ndarray:
+    """Human-like intervals (100 +- 30 ms) snapped to a 1/rate grid, plus jitter."""
+    rng = np.random.default_rng(seed)
+    period = 1000.0 / rate_hz
+    x = np.maximum(rng.normal(100.0, 30.0, n), 30.0)
+    return np.round(x / period) * period + rng.normal(0.0, jitter_ms, n) * (jitter_ms > 0)
+
+
+def check(seeds=(0, 1, 2), sizes=(600, 5000)) -> int:
+    """Run CHECK_CASES through scan_poll_rate. Returns the number of failures."""
+    failures = 0
+    for rate, jitter, expected in CHECK_CASES:
+        for n in sizes:
+            for seed in seeds:
+                out = scan_poll_rate(synthetic_session(rate, jitter, n, seed))
+                ok = (out['poll_rate_hz'] == expected
+                      and abs(out['poll_peak_hz'] - rate) <= 1e-3 * rate)
+                failures += not ok
+                if not ok:
+                    print(f"[POLL] FAIL {rate:g} Hz, jitter {jitter:g} ms, n={n}, seed {seed}: "
+                          f"rate {out['poll_rate_hz']}, peak {out['poll_peak_hz']} Hz")
+    total = len(CHECK_CASES) * len(sizes) * len(seeds)
+    print(f"[POLL] {total - failures}/{total} synthetic sessions at the right rate")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Dense USB polling-rate scan.")
+    parser.add_argument("recording", nargs="?", help="a click_data/ CSV")
+    parser.add_argument("--check", action="store_true",
+                        help="scan synthetic sessions at known rates instead")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        return 1 if check() else 0
+    if not args.recording:
+        parser.error("give a recording or --check")
+    from MimicBenchmarkTool import ClickSession
+    session = ClickSession.from_csv(args.recording)
+    out = scan_poll_rate([c.delay_ms for c in session.clicks[1:]])
+    if out['poll_rate_hz'] is None:
+        print(f"[POLL] no rate (z {out['poll_peak_score']}, confidence {out['poll_confidence']})")
+    else:
+        print(f"[POLL] rate {out['poll_rate_hz']} Hz (peak {out['poll_peak_hz']} Hz, "
+              f"z {out['poll_peak_score']}, confidence {out['poll_confidence']})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,55 @@
+"""Write a simulated hold as a click recording.
+
+Part of Mimic. Runs mimic.simulator.simulate_events() for one preset and
+writes the presses in the click_data/ CSV schema, so a simulated session
+can go through the same tooling as a recorded one (analysis.batch,
+ClickSession.from_csv(), replay).
+
+    cd python_legacy
+    python -m analysis.simulate --presses 100000 --out sim_balanced.csv
+    python -m analysis.simulate --preset Aggressive --standard --seed 7 --out sim.csv
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from mimic.config import ClickEnginePresets
+from mimic.engine import AdaptiveClickerEngine
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Simulate the presses click() would send and save them as a recording.")
+    parser.add_argument("--presses", type=int, default=10000,
+                        help="intentional presses to simulate (bounces come on top)")
+    parser.add_argument("--preset", default="Balanced",
+                        choices=ClickEnginePresets.get_preset_list())
+    parser.add_argument("--standard", action="store_true",
+                        help="simulate with enhanced mode off")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--out", required=True, help="CSV path to write")
+    args = parser.parse_args(argv)
+
+    if args.presses <= 0:
+        parser.error("--presses must be positive")
+    engine = AdaptiveClickerEngine(enhanced_mode=not args.standard, preset_name=args.preset)
+
+    t0 = time.perf_counter()
+    table = engine.simulate_events(args.presses, seed=args.seed)
+    elapsed = time.perf_counter() - t0
+    rows = table.to_csv(args.out, start_time=time.time())
+
+    intervals = table.intervals()
+    print(f"preset:         {args.preset} ({'standard' if args.standard else 'enhanced'})")
+    print(f"events:         {rows} ({int(np.count_nonzero(table.bounce))} bounces, "
+          f"{np.mean(table.bounce) * 100:.2f}%)")
+    print(f"mean interval:  {float(np.mean(intervals)):.1f} ms")
+    print(f"simulated in:   {elapsed:.2f} s")
+    print(f"wrote:          {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,180 @@
+"""Fit diagnostics over a sliding window, as a timeline across a session.
+
+Part of Mimic. fit_diagnostics() gives one number per statistic for the
+whole session, which averages drift away: a session whose CPS falls from 14
+to 7 over a minute, or whose lag-1 autocorrelation appears halfway through,
+reports a single middling value. diagnostics_timeline() reports every
+diagnostic for every window of a fixed number of intervals, stepping by a
+configurable stride, as arrays for plotting and export.
+
+The moment statistics come from running sums instead of re-reading each
+window. With c = x - mean(x), one cumulative sum of each of c, c^2, c^3, c^4
+and of the lagged products c[i] * c[i + k] (k = 1..3) gives every window's
+power sums as a difference of two entries, and the window's central
+moments and autocorrelations follow algebraically -- exactly
+fit_diagnostics()'s definitions, with the window's own mean. That is O(n)
+for the whole session whatever the window and stride.
+
+The median (for mean_over_median and the runs test) is an order statistic
+and has no running sum, so those two come from a strided view of the
+windows, a block at a time, through bootstrap's runs test: O(window) per
+reported window. Per million intervals the running sums take ~0.1 s at any
+stride; the medians add ~0.3 s at the default stride of 16 and grow as the
+stride shrinks.
+
+    cd python_legacy
+    python -m analysis.timeline ../click_data/ClickData_20260807_193042.csv --out timeline.csv
+    python -m analysis.timeline --simulate 1000000 --window 512 --stride 64 --out t.npz
+"""
+
+import csv
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from analysis.bootstrap import BATCH_ELEMENTS, DIAGNOSTIC_KEYS, _runs_z
+
+
+WINDOW = 128
+STRIDE = 16
+MAX_LAG = 3
+TIMELINE_KEYS = ('end_s', 'mean_ms', 'std_ms', 'cps') + DIAGNOSTIC_KEYS
+
+
+def _sums(a: np.ndarray) -> np.ndarray:
+    """Prefix sums with a leading 0: window [s, e) totals cs[e] - cs[s]."""
+    cs = np.zeros(a.shape[0] + 1)
+    np.cumsum(a, out=cs[1:])
+    return cs
+
+
+def diagnostics_timeline(delays, window: int = WINDOW, stride: int = STRIDE) -> dict:
+    """Every fit_diagnostics() statistic per window, plus mean, std and CPS.
+
+    Returns key -> array, one entry per window: start (first interval),
+    end_s (seconds from the first interval's start to the window's end),
+    then TIMELINE_KEYS. Empty arrays if the session is shorter than one
+    window.
+    """
+    x = np.asarray(delays, dtype=float)
+    n = x.size
+    if window < MAX_LAG + 2:
+        raise ValueError(f"window must be at least {MAX_LAG + 2} intervals")
+    if n < window:
+        return {'start': np.empty(0, dtype=np.int64), **{k: np.empty(0) for k in TIMELINE_KEYS}}
+    s = np.arange(0, n - window + 1, stride)
+    e = s + window
+    w = float(window)
+
+    # Centre on the session mean so the running sums stay well conditioned.
+    g = x.mean()
+    c = x - g
+    c2 = c * c
+    cs1, cs2, cs3, cs4 = _sums(c), _sums(c2), _sums(c2 * c), _sums(c2 * c2)
+    s1, s2, s3, s4 = cs1[e] - cs1[s], cs2[e] - cs2[s], cs3[e] - cs3[s], cs4[e] - cs4[s]
+
+    mu = s1 / w                                 # window mean, relative to g
+    ss = s2 - w * mu * mu                       # sum of squares about the window mean
+    m3 = s3 - 3 * mu * s2 + 2 * w * mu ** 3
+    m4 = s4 - 4 * mu * s3 + 6 * mu * mu * s2 - 3 * w * mu ** 4
+    sd = np.sqrt(np.maximum(ss, 0.0) / w)
+    ok = sd > 0
+    safe_ss = np.where(ok, ss, 1.0)
+    safe_sd = np.where(ok, sd, 1.0)
+    mean = mu + g
+
+    out = {
+        'start': s,
+        'end_s': _sums(x)[e] / 1000.0,
+        'mean_ms': mean,
+        'std_ms': sd,
+        'cps': np.where(mean > 0, 1000.0 / np.where(mean > 0, mean, 1.0), 0.0),
+    }
+    for k in range(1, MAX_LAG + 1):
+        # sum over i in [s, e - k) of (c_i - mu)(c_{i+k} - mu).
+        lagged = _sums(c[:-k] * c[k:])
+        p = lagged[e - k] - lagged[s]
+        head = cs1[e - k] - cs1[s]
+        tail = cs1[e] - cs1[s + k]
+        num = p - mu * (head + tail) + (w - k) * mu * mu
+        out[f'acf_lag{k}'] = np.where(ok, num / safe_ss, 0.0)
+    out['skew'] = np.where(ok, m3 / w / safe_sd ** 3, 0.0)
+    out['kurtosis'] = np.where(ok, m4 / w / safe_sd ** 4 - 3.0, 0.0)
+    out['cv'] = np.where(mean != 0, sd / np.where(mean != 0, mean, 1.0), 0.0)
+
+    med = np.empty(s.size)
+    runs = np.empty(s.size)
+    views = sliding_window_view(x, window)[::stride]
+    rows = max(1, BATCH_ELEMENTS // window)
+    for i in range(0, s.size, rows):
+        block = views[i:i + rows]
+        med[i:i + rows] = np.median(block, axis=1)
+        runs[i:i + rows] = _runs_z(block, med[i:i + rows])
+    out['mean_over_median'] = np.where(med != 0, mean / np.where(med != 0, med, 1.0), 0.0)
+    out['runs_z'] = runs
+    return out
+
+
+def save_timeline(filepath: str, timeline: dict) -> None:
+    """.npz (arrays as they are) or .csv (one row per window), by extension."""
+    if str(filepath).lower().endswith('.npz'):
+        np.savez_compressed(filepath, **timeline)
+        return
+    keys = ('start',) + TIMELINE_KEYS
+    with open(filepath, 'w', newline='', encoding='utf-8') as fh:
+        w = csv.writer(fh)
+        w.writerow(keys)
+        for row in zip(*(timeline[k].tolist() for k in keys)):
+            w.writerow([row[0]] + [round(v, 4) for v in row[1:]])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Fit diagnostics over a sliding window across a session.")
+    parser.add_argument("recording", nargs="?", help="a click_data/ CSV")
+    parser.add_argument("--simulate", type=int, default=0, metavar="PRESSES",
+                        help="use this many presses of engine output instead of a recording")
+    parser.add_argument("--preset", default=None, help="engine preset for --simulate")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--window", type=int, default=WINDOW)
+    parser.add_argument("--stride", type=int, default=STRIDE)
+    parser.add_argument("--out", default=None, help=".csv or .npz to write")
+    args = parser.parse_args(argv)
+
+    if bool(args.recording) == bool(args.simulate):
+        parser.error("give either a recording or --simulate")
+    if args.window < MAX_LAG + 2 or args.stride < 1:
+        parser.error(f"--window must be at least {MAX_LAG + 2} and --stride at least 1")
+    if args.recording:
+        from MimicBenchmarkTool import ClickSession
+        session = ClickSession.from_csv(args.recording)
+        # Chatter folded away, as get_stats() does before fit_diagnostics().
+        delays = session.detect_chatter([c.delay_ms for c in session.clicks[1:]])['corrected_delays']
+        name = Path(args.recording).name
+    else:
+        from mimic.engine import AdaptiveClickerEngine
+        engine = AdaptiveClickerEngine(True, args.preset)
+        delays = engine.simulate_events(args.simulate, seed=args.seed).intervals()
+        name = f"engine {args.preset or 'default'}"
+
+    t0 = time.perf_counter()
+    tl = diagnostics_timeline(delays, args.window, args.stride)
+    elapsed = time.perf_counter() - t0
+    count = tl['start'].size
+    print(f"[TIMELINE] {name}: {len(delays)} intervals, {count} windows of {args.window} "
+          f"in {elapsed * 1000:.1f} ms")
+    if count:
+        for k in ('cps', 'std_ms', 'acf_lag1', 'runs_z'):
+            print(f"  {k:<10} first {tl[k][0]:8.3f}   last {tl[k][-1]:8.3f}   "
+                  f"range {tl[k].min():8.3f} .. {tl[k].max():8.3f}")
+    if args.out:
+        save_timeline(args.out, tl)
+        print(f"[TIMELINE] -> {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,5 @@
+"""Benchmarks for the live parts of Mimic.
+
+Part of Mimic. Each module runs standalone (python -m benchmarks.<name>)
+and prints its own table; none of them are needed at runtime.
+"""
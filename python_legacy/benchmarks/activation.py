@@ -0,0 +1,140 @@
+"""Press-to-first-click latency of the click loop.
+
+Part of Mimic. Replays button presses through a ReplaySource into a
+ClickLoop, exactly as the pynput listener drives it in the GUI, and times
+from each press callback to the engine's first click() for that press.
+"event" is the current ClickLoop, which blocks on an Event; "poll" is the
+loop it replaced, which slept 10ms between looks at the button. Also
+counts how often each loop wakes while nothing is happening.
+
+The engine is a stand-in: it draws real delays from AdaptiveClickerEngine
+and sleeps them, but sends no input, so this runs on any OS.
+
+    cd python_legacy
+    python -m benchmarks.activation
+    python -m benchmarks.activation --presses 300 --idle 5
+"""
+
+import io
+import time
+import random
+import argparse
+import contextlib
+
+from mimic.clickloop import ClickLoop
+from mimic.engine import AdaptiveClickerEngine
+from mimic.inputsource import ReplaySource
+
+
+class PollingClickLoop(ClickLoop):
+    """The pre-Event loop: re-reads the button every 10ms while idle."""
+
+    def run(self):
+        while self.running:
+            engine = self.get_engine()
+            if engine and self.held:
+                if not self.clicking:
+                    self.clicking = True
+                engine.click()
+                continue
+            if self.clicking:
+                self.clicking = False
+                if engine:
+                    engine.stop_clicking()
+            time.sleep(0.01)
+            self.idle_wakeups += 1
+
+
+class TimingEngine:
+    """Records when the first click() after each press happens."""
+
+    def __init__(self):
+        self.model = AdaptiveClickerEngine()
+        self.pressed_at = None
+        self.latencies = []
+
+    def click(self):
+        now = time.perf_counter()
+        if self.pressed_at is not None:
+            self.latencies.append((now - self.pressed_at) * 1000)
+            self.pressed_at = None
+        AdaptiveClickerEngine.precise_sleep(self.model.calculate_delay() / 1000.0)
+
+    def stop_clicking(self):
+        pass
+
+
+def _presses(n, seed=0):
+    """Short holds separated by idle gaps, as between fights.
+
+    Gaps are longer than any engine interval, so the loop has gone idle
+    before each press and the press measures activation, not the tail of
+    the previous click's sleep.
+    """
+    rng = random.Random(seed)
+    presses, t = [], 0.0
+    for _ in range(n):
+        hold = rng.uniform(0.10, 0.25)
+        presses.append((t, hold, 'left'))
+        t += hold + rng.uniform(0.30, 0.50)
+    return presses
+
+
+def run(loop_cls, presses, idle_s):
+    engine = TimingEngine()
+    loop = loop_cls(lambda: engine)
+
+    def on_press(t, button):
+        # A press that lands while the loop is still finishing the previous
+        # hold's last click is not an activation; don't time it.
+        engine.pressed_at = None if loop.clicking else time.perf_counter()
+        loop.set_held(True)
+
+    def on_release(t, button):
+        loop.set_held(False)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        loop.start()
+        source = ReplaySource(presses, speed=1.0)
+        source.start(on_press, on_release)
+        source.join()
+        time.sleep(0.5)     # let the last press finish clicking
+
+        before = loop.idle_wakeups
+        time.sleep(idle_s)
+        idle_wakeups = loop.idle_wakeups - before
+        loop.stop(timeout=1.0)
+
+    lat = sorted(engine.latencies)
+    pct = lambda q: lat[min(len(lat) - 1, int(q * len(lat)))] if lat else float('nan')
+    return {
+        'presses': len(lat),
+        'p50': pct(0.50),
+        'p90': pct(0.90),
+        'p99': pct(0.99),
+        'max': lat[-1] if lat else float('nan'),
+        'idle_wakeups_per_s': idle_wakeups / idle_s,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark press-to-first-click latency.")
+    parser.add_argument("--presses", type=int, default=60,
+                        help="button presses to replay per loop (default 60, ~40s each)")
+    parser.add_argument("--idle", type=float, default=2.0,
+                        help="seconds of no input over which to count idle wakeups")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    presses = _presses(args.presses, args.seed)
+    print(f"{'loop':<6} {'timed':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} "
+          f"{'max ms':>8} {'idle wakeups/s':>15}")
+    for name, cls in (("poll", PollingClickLoop), ("event", ClickLoop)):
+        r = run(cls, presses, args.idle)
+        print(f"{name:<6} {r['presses']:>8} {r['p50']:>8.3f} {r['p90']:>8.3f} {r['p99']:>8.3f} "
+              f"{r['max']:>8.3f} {r['idle_wakeups_per_s']:>15.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
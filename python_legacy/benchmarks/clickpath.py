@@ -0,0 +1,74 @@
+"""Cost of the click-path instrumentation.
+
+Part of Mimic. Makes the same profiler calls AdaptiveClickerEngine.click()
+makes for one click -- begin, a lap per compute stage and mouse_event, a
+slept per sleep, end_click -- around no work at all, so the time measured is
+the instrumentation alone. Reported per click and as a share of the mean
+interval the engine draws (the click budget); it has to stay well under 1%.
+
+    cd python_legacy
+    python -m benchmarks.clickpath
+    python -m benchmarks.clickpath --clicks 200000 --no-trace
+"""
+
+import time
+import argparse
+
+from mimic.config import Config
+from mimic.engine import AdaptiveClickerEngine
+from mimic.latency import ClickProfiler
+
+COMPUTE_STAGES = ("check_cps", "calculate_delay", "draw_hold", "mouse_down",
+                  "mouse_up", "get_current_cps", "log_cps")
+SLEEP_STAGES = ("hold_sleep", "period_sleep")
+
+
+def instrument_only(prof, clicks):
+    """Seconds spent on profiler calls for `clicks` non-double clicks."""
+    start = time.perf_counter()
+    for _ in range(clicks):
+        t = prof.begin()
+        t = prof.lap("check_cps", t)
+        period_start = t
+        for stage in COMPUTE_STAGES[1:]:
+            t = prof.lap(stage, t)
+        for stage in SLEEP_STAGES:
+            t = prof.slept(stage, t, 0.0)
+        prof.end_click(period_start, 0.0, t)
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark click-path instrumentation overhead.")
+    parser.add_argument("--clicks", type=int, default=50000)
+    parser.add_argument("--no-trace", action="store_true", help="profile without keeping trace spans")
+    args = parser.parse_args(argv)
+
+    engine = AdaptiveClickerEngine()
+    budget_ms = sum(engine.calculate_delay() for _ in range(5000)) / 5000
+
+    trace = 0 if args.no_trace else Config.LATENCY_TRACE_CLICKS
+    prof = ClickProfiler(Config.LATENCY_DEADLINE_SLACK_MS, trace)
+    instrument_only(prof, 1000)     # warm up, create the stage histograms
+    prof.clear()
+    per_click_us = instrument_only(prof, args.clicks) / args.clicks * 1e6
+
+    t0 = time.perf_counter()
+    prof.snapshot()
+    snapshot_ms = (time.perf_counter() - t0) * 1000
+    t0 = time.perf_counter()
+    prof.summary_rows()
+    rows_ms = (time.perf_counter() - t0) * 1000
+
+    print(f"tracing:            {'off' if not trace else f'last {trace} clicks'}")
+    print(f"per click:          {per_click_us:.2f} us "
+          f"({len(COMPUTE_STAGES)} laps, {len(SLEEP_STAGES)} sleeps)")
+    print(f"mean click budget:  {budget_ms:.1f} ms")
+    print(f"overhead:           {per_click_us / 1000 / budget_ms * 100:.4f}% of the budget")
+    print(f"summary_rows():     {rows_ms:.2f} ms   (Analytics refresh)")
+    print(f"snapshot():         {snapshot_ms:.2f} ms   (JSON dump)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,124 @@
+"""Throughput and scoring latency of the streaming detector.
+
+Part of Mimic. Fits a DetectorProfile to the click_data/ recordings, then
+opens thousands of concurrent streams into one DetectorService, each an
+asyncio task replaying either a recording or engine output (simulate_events
+for each preset) from a random offset, wrapping at the end. Reports events
+per second, the p50/p99 of window update plus scoring, the p99 from enqueue
+to score, and the mean score by source.
+
+--speed 0 (default) replays as fast as the service takes events, so the
+enqueue-to-score figure is mostly time queued behind the backlog. --speed N
+paces each stream at N times its recorded rate, which shows the latency at
+a sustained load. Press times come from the recording either way, so event
+loop jitter does not reach the features.
+
+    cd python_legacy
+    python -m benchmarks.detector
+    python -m benchmarks.detector --streams 5000 --events 300 --speed 10
+"""
+
+import asyncio
+import argparse
+import random
+import time
+from pathlib import Path
+
+from analysis.batch import find_recordings
+from analysis.detector import DetectorProfile, DetectorService, MIN_INTERVALS
+from mimic.config import ClickEnginePresets
+from mimic.engine import AdaptiveClickerEngine
+from MimicBenchmarkTool import ClickSession
+
+DEFAULT_DATA = Path(__file__).resolve().parents[2] / "click_data"
+ENGINE_PRESSES = 20000
+
+
+def load_sources(data_dir: Path, seed: int) -> list:
+    """[(kind, name, delays_ms)] for every recording and every preset."""
+    sources = []
+    for path in find_recordings(data_dir):
+        delays = [c.delay_ms for c in ClickSession.from_csv(str(path)).clicks[1:]]
+        if len(delays) > MIN_INTERVALS:
+            sources.append(("human", path.stem, delays))
+    for preset in ClickEnginePresets.get_preset_list():
+        engine = AdaptiveClickerEngine(preset_name=preset)
+        sources.append(("engine", preset,
+                        engine.simulate_events(ENGINE_PRESSES, seed=seed).intervals().tolist()))
+    return sources
+
+
+async def replay(service, stream_id, delays, offset, events, speed):
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    t = 0.0
+    for i in range(events):
+        t += delays[(offset + i) % len(delays)] / 1000.0
+        if speed:
+            await asyncio.sleep(max(0.0, start + t / speed - loop.time()))
+        await service.submit(stream_id, t)
+        if not speed:
+            await asyncio.sleep(0)      # let the other streams interleave
+
+
+async def run_load(profile, sources, streams, events, speed, queue, seed):
+    service = DetectorService(profile, maxsize=queue)
+    rng = random.Random(seed)
+    kinds = {}
+    producers = []
+    for sid in range(streams):
+        kind, _, delays = sources[sid % len(sources)]
+        kinds[sid] = kind
+        producers.append(replay(service, sid, delays, rng.randrange(len(delays)), events, speed))
+
+    consumer = asyncio.ensure_future(service.run())
+    t0 = time.perf_counter()
+    await asyncio.gather(*producers)
+    await service.stop()
+    await consumer
+    return service, kinds, time.perf_counter() - t0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the streaming detector.")
+    parser.add_argument("--data", default=str(DEFAULT_DATA), help="recordings to fit and replay")
+    parser.add_argument("--streams", type=int, default=2000)
+    parser.add_argument("--events", type=int, default=200, help="presses per stream")
+    parser.add_argument("--speed", type=float, default=0.0,
+                        help="replay at this multiple of recorded rate (0: flat out)")
+    parser.add_argument("--queue", type=int, default=4096, help="ingestion queue bound")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    sources = load_sources(Path(args.data), args.seed)
+    human = [d for kind, _, d in sources if kind == "human"]
+    if not human:
+        parser.error(f"no usable recordings under {args.data}")
+    profile = DetectorProfile.fit(human)
+
+    service, kinds, elapsed = asyncio.run(run_load(
+        profile, sources, args.streams, args.events, args.speed, args.queue, args.seed))
+
+    by_kind = {}
+    for sid, score in service.scores.items():
+        by_kind.setdefault(kinds[sid], []).append(score)
+    c50, c99 = service.compute.quantiles((0.50, 0.99))
+    l50, l99 = service.latency.quantiles((0.50, 0.99))
+
+    print(f"profile:            {profile.windows} windows from {len(human)} recordings")
+    print(f"streams:            {args.streams} ({len(sources)} sources, "
+          f"{'flat out' if not args.speed else f'{args.speed:g}x recorded rate'})")
+    print(f"events:             {service.events} in {elapsed:.2f} s "
+          f"= {service.events / elapsed:,.0f} events/s")
+    print(f"scored:             {service.scored}")
+    print(f"update+score:       p50 {c50 / 1e3:.1f} us   p99 {c99 / 1e3:.1f} us")
+    print(f"enqueue to score:   p50 {l50 / 1e3:.1f} us   p99 {l99 / 1e3:.1f} us")
+    for kind, scores in sorted(by_kind.items()):
+        note = "  (in-sample: the profile is fitted to these)" if kind == "human" else ""
+        print(f"mean score {kind + ':':8} {sum(scores) / len(scores):.2f} "
+              f"over {len(scores)} streams{note}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
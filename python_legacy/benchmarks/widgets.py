@@ -0,0 +1,136 @@
+"""Refresh cost of the Graphs page widgets.
+
+Part of Mimic. Drives CPSLineGraph and HistogramCanvas with the data the
+engine produces at ~10 CPS, one draw per 500 ms GUI tick, and counts every
+Tcl call each refresh makes and how long it takes (including the idle-task
+repaint). The graph draws a CPSTimeline at the --zoom span, as the Graphs
+page does. "full" invalidates before every draw, which is what the old
+delete("all") rendering did; "retained" re-bins the raw delays into
+retained-mode items; "engine" draws the engine's incremental histogram
+counts, which is what the GUI does.
+
+Needs a display (Tk). On a headless Linux box run it under xvfb-run.
+
+    cd python_legacy
+    python -m benchmarks.widgets
+    python -m benchmarks.widgets --ticks 2000 --zoom All
+"""
+
+import time
+import random
+import argparse
+import statistics
+from collections import deque
+
+import tkinter as tk
+
+from mimic.config import Config
+from mimic.histogram import DelayHistograms
+from mimic.timeline import CPSTimeline
+from mimic.widgets import CPSLineGraph, HistogramCanvas
+
+
+class CountingTk:
+    """Wraps a widget's Tcl interpreter and counts the calls made through it."""
+
+    def __init__(self, tkapp):
+        self._tkapp = tkapp
+        self.calls = 0
+
+    def call(self, *args):
+        self.calls += 1
+        return self._tkapp.call(*args)
+
+    def __getattr__(self, name):
+        return getattr(self._tkapp, name)
+
+
+def _feed(ticks, seed=0, idle_every=4):
+    """Engine-shaped data, one snapshot per tick.
+
+    Every idle_every-th tick adds nothing, as when the mouse is released
+    between fights; the graph should cost nothing then.
+    """
+    rng = random.Random(seed)
+    timeline = CPSTimeline(Config.CPS_TIMELINE_LEVELS, Config.CPS_TIMELINE_CAPACITY)
+    all_delays = deque(maxlen=3000)
+    hists = DelayHistograms(0, Config.HIST_MAX_MS, Config.HIST_BIN_MS, Config.HIST_LOG_MIN_MS,
+                            Config.HIST_LOG_MAX_MS, Config.HIST_LOG_BINS_PER_DECADE)
+    t = time.time() - ticks * 0.5
+    for tick in range(ticks):
+        t += 0.5
+        if idle_every and tick % idle_every == idle_every - 1:
+            yield t, timeline, all_delays, hists
+            continue
+        for k in range(5):
+            d = rng.lognormvariate(4.6, 0.3)
+            full = len(all_delays) == all_delays.maxlen
+            hists.add(d, all_delays[0] if full else None)
+            all_delays.append(d)
+            timeline.add(t - 0.4 + k * 0.1, rng.uniform(8, 13))
+        yield t, timeline, all_delays, hists
+
+
+def run(root, mode, ticks, zoom):
+    graph = CPSLineGraph(root, width=560, height=200)
+    graph.set_zoom(zoom)
+    hist = HistogramCanvas(root, width=560, height=240)
+    graph.pack()
+    hist.pack()
+    counters = [CountingTk(graph.canvas.tk), CountingTk(hist.canvas.tk)]
+    graph.canvas.tk, hist.canvas.tk = counters
+
+    calls, times = [], []
+    for now, timeline, delays, hists in _feed(ticks):
+        before = sum(c.calls for c in counters)
+        t0 = time.perf_counter()
+        if mode == "full":
+            graph.invalidate()
+            hist.invalidate()
+        # Mirrors update_display(): nothing is drawn before two samples.
+        if timeline.count >= 2:
+            graph.draw_timeline(timeline, now)
+        if mode == "engine":
+            if hists.window.total >= 5:
+                hist.draw_counts(hists.window, hists.window_mean(), False)
+        elif len(delays) >= 5:
+            mean = sum(delays) / len(delays)
+            hist.draw_histogram(delays, mean, statistics.pstdev(delays), False)
+        root.update_idletasks()
+        times.append((time.perf_counter() - t0) * 1000)
+        calls.append(sum(c.calls for c in counters) - before)
+
+    graph.canvas.destroy()
+    hist.canvas.destroy()
+    times.sort()
+    return {
+        'mode': mode,
+        'calls_per_refresh': sum(calls) / len(calls),
+        'ms_mean': statistics.mean(times),
+        'ms_p95': times[int(len(times) * 0.95)],
+        'idle_refreshes': sum(1 for c in calls if c == 0),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Graphs page refreshes.")
+    parser.add_argument("--ticks", type=int, default=600,
+                        help="500ms GUI ticks to simulate (default 600 = 5 minutes)")
+    parser.add_argument("--zoom", default="30s", choices=[z for z, _ in CPSLineGraph.ZOOM_LEVELS],
+                        help="graph span to draw (default 30s)")
+    args = parser.parse_args(argv)
+    zoom = dict(CPSLineGraph.ZOOM_LEVELS)[args.zoom]
+
+    root = tk.Tk()
+    root.withdraw()
+    print(f"{'mode':<10} {'Tk calls/refresh':>17} {'mean ms':>9} {'p95 ms':>8} {'free refreshes':>15}")
+    for mode in ("full", "retained", "engine"):
+        r = run(root, mode, args.ticks, zoom)
+        print(f"{r['mode']:<10} {r['calls_per_refresh']:>17.1f} {r['ms_mean']:>9.3f} "
+              f"{r['ms_p95']:>8.3f} {r['idle_refreshes']:>8}/{args.ticks}")
+    root.destroy()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
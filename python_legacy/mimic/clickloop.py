@@ -0,0 +1,72 @@
+"""The thread that turns a held physical button into synthetic clicks.
+
+Part of Mimic. The loop used to poll the button state with a 10ms sleep, so
+the first synthetic click lagged the physical press by up to 10ms plus
+scheduler slop, and the thread woke 100 times a second for the whole
+session even with the clicker off. It now blocks on an Event that the mouse
+listener sets on every button change (and the GUI sets on activate,
+deactivate and close), so it wakes exactly when something changed and not
+otherwise.
+"""
+
+import threading
+
+
+class ClickLoop:
+    """Calls engine.click() back to back while the button is held.
+
+    get_engine() returns the active engine, or None while the clicker is
+    off. idle_wakeups counts how often the blocked loop woke up; with
+    nothing happening it stays put.
+    """
+
+    def __init__(self, get_engine):
+        self.get_engine = get_engine
+        self.held = False
+        self.clicking = False
+        self.running = False
+        self.idle_wakeups = 0
+        self.wakeup = threading.Event()
+        self._thread = None
+
+    def set_held(self, held):
+        """Physical button state, from the mouse listener thread"""
+        self.held = held
+        self.wakeup.set()
+
+    def poke(self):
+        """Re-check state now (clicker toggled)"""
+        self.wakeup.set()
+
+    def start(self):
+        self.running = True
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self.running = False
+        self.wakeup.set()
+        if self._thread and timeout is not None:
+            self._thread.join(timeout)
+
+    def run(self):
+        while self.running:
+            # Clear before reading state: a press landing after the check
+            # sets the event again, so the wait below cannot miss it.
+            self.wakeup.clear()
+            engine = self.get_engine()
+            if engine and self.held:
+                if not self.clicking:
+                    self.clicking = True
+                    print("[MIMIC] Started auto-clicking")
+                engine.click()
+                continue
+
+            if self.clicking:
+                self.clicking = False
+                if engine:
+                    engine.stop_clicking()
+                print("[MIMIC] Stopped auto-clicking")
+            self.wakeup.wait()
+            self.idle_wakeups += 1
@@ -45,6 +45,45 @@ class Config:
     POLL_RATE_HZ = 1000
     POLL_JITTER_MS = 0.19    # measured spread around the grid in click_data/
 
+    # Engine-side delay histograms (mimic.histogram). Linear bins cover the
+    # clamp range with room to spare; log bins keep detail in the pause tail.
+    HIST_MAX_MS = 500
+    HIST_BIN_MS = 2
+    HIST_LOG_MIN_MS = 10
+    HIST_LOG_MAX_MS = 1000
+    HIST_LOG_BINS_PER_DECADE = 24
+
+    # Delay-vs-click heatmap (mimic.heatmap). Delays above the top row are
+    # drawn in it; columns merge pairwise as the session grows.
+    HEATMAP_MAX_MS = 300
+    HEATMAP_ROWS = 120
+    HEATMAP_COLS = 256
+
+    # Whole-session CPS timeline (mimic.timeline): bucket widths in seconds
+    # above the per-click level, and entries kept per level. 4096 one-minute
+    # buckets is ~68 hours; memory is fixed whatever the session length.
+    CPS_TIMELINE_LEVELS = (1, 10, 60)
+    CPS_TIMELINE_CAPACITY = 4096
+
+    # Click-path instrumentation (mimic.latency). A click ending more than
+    # LATENCY_DEADLINE_SLACK_MS after its drawn period counts as a deadline
+    # miss; the last LATENCY_TRACE_CLICKS clicks keep their stage spans for
+    # Chrome-trace export (0 turns tracing off).
+    LATENCY_DEADLINE_SLACK_MS = 1.0
+    LATENCY_TRACE_CLICKS = 2000
+
+    # Localhost metrics endpoint (mimic.metrics): Prometheus text at
+    # /metrics and JSON at /metrics.json. Off by default; loopback only.
+    METRICS_SERVER_ENABLED = False
+    METRICS_HOST = "127.0.0.1"
+    METRICS_PORT = 9464
+
+    # GUI refresh (mimic.scheduler): ticks run every REFRESH_FAST_MS while
+    # clicks are landing and back off to REFRESH_IDLE_MS while armed but idle.
+    # With nothing armed or recording, the scheduler stops until woken.
+    REFRESH_FAST_MS = 200
+    REFRESH_IDLE_MS = 1000
+
     # Drift is an Ornstein-Uhlenbeck process: DRIFT_REVERSION is the per-click
     # retention (closer to 1.0 = slower wander), DRIFT_SIGMA its steady-state
     # amplitude as a fraction of the base interval.
@@ -138,9 +177,14 @@ class Config:
     
     @staticmethod
     def get_sessions_file():
-        """Get path to sessions database"""
+        """Get path to the legacy JSON session history (imported once)"""
         return os.path.join(Config.get_training_data_path(), "sessions.json")
 
+    @staticmethod
+    def get_sessions_db():
+        """Get path to the SQLite session store (supersedes sessions.json)"""
+        return os.path.join(Config.get_training_data_path(), "sessions.db")
+
 
 class RiskAssessor:
     """Comprehensive risk assessment with realistic thresholds"""
@@ -4,6 +4,7 @@ Part of Mimic. Split out of the original single-file Mimic.py.
 """
 
 import csv
+import os
 import time
 import math
 import random
@@ -12,10 +13,22 @@ from dataclasses import dataclass, field
 from collections import deque
 
 import numpy as np
-import win32api
-import win32con
+
+try:
+    import win32api
+    import win32con
+    WIN32_AVAILABLE = True
+except ImportError:
+    # Off Windows the engine still computes delays (replay, analysis,
+    # benchmarks); it just cannot send a click, so click() refuses to run.
+    WIN32_AVAILABLE = False
 
 from .config import Config, ClickEnginePresets
+from .heatmap import DelayHeatmap, save_png
+from .histogram import DelayHistograms
+from .latency import ClickProfiler
+from .sketch import DistributionSketch
+from .timeline import CPSTimeline
 
 
 # * Still need to figure out why the analysis returns seemingly wrong CPS
@@ -83,6 +96,30 @@ TRANSITION_MATRIX: np.ndarray = np.array([
 ], dtype=float)
 
 
+# Constants of click() and calculate_delay(), named so mimic.simulator makes
+# exactly the same decisions offline.
+CPS_WINDOW_S = 5.0            # check_cps(): presses older than this are forgotten
+BURST_CLICKS = 16             # this many presses in the last second ...
+BURST_BACKOFF_S = 0.08        # ... waits this long before the next
+SUSTAINED_BACKOFF_S = 0.05    # wait when the window averages over SUSTAINED_CPS_CAP
+IDLE_RECOVERY_S = 0.35        # a gap longer than this lets fatigue recover
+IDLE_RECOVERY_TAU_S = 2.5
+FATIGUE_LAMBDA = 12.0         # clicks to ~63% of the full slowdown
+FATIGUE_MAX_SLOWDOWN = 0.22
+RHYTHM_STEP = (1.1, 2.6)      # phase advance per click, radians
+RHYTHM_AMOUNT_ENHANCED = 0.055
+RHYTHM_AMOUNT_STANDARD = 0.038
+PAUSE_RATE = 0.018
+PAUSE_STD_MS = 95.0
+
+
+def _require_win32() -> None:
+    """Raise unless pywin32 loaded, i.e. the engine can actually send clicks"""
+    if not WIN32_AVAILABLE:
+        raise RuntimeError("pywin32 is not available: the engine cannot send clicks off Windows "
+                           "(install with: pip install pywin32)")
+
+
 # ═════════════════════════════════════════════════════════════════════════════
 # OPTIMIZED BATCH RNG POOL
 # ═════════════════════════════════════════════════════════════════════════════
@@ -133,6 +170,18 @@ class AdaptiveClickerEngine:
         # 3000 delays is ~5 minutes of clicking -- plenty for a histogram.
         self.all_delays = deque(maxlen=3000)
 
+        # Binned as each delay is emitted, for the whole session and for the
+        # window all_delays retains, so drawing or exporting a histogram no
+        # longer re-bins the buffer.
+        self.histograms = DelayHistograms(
+            0, Config.HIST_MAX_MS, Config.HIST_BIN_MS,
+            Config.HIST_LOG_MIN_MS, Config.HIST_LOG_MAX_MS, Config.HIST_LOG_BINS_PER_DECADE)
+        self.heatmap = DelayHeatmap(0, Config.HEATMAP_MAX_MS, Config.HEATMAP_ROWS, Config.HEATMAP_COLS)
+        # Whole-session quantile/moment sketches, saved with the session
+        # history so sessions can be aggregated later (mimic.sketch).
+        self.delay_sketch = DistributionSketch()
+        self.hold_sketch = DistributionSketch()
+
         # Running moments so variance/std are O(1) per refresh instead of O(n).
         # These cover the whole session, not just the retained window.
         self._n = 0
@@ -166,6 +215,10 @@ class AdaptiveClickerEngine:
         # UI Graph tracking pipelines
         self.cps_history = deque(maxlen=60)
         self.cps_timestamps = deque(maxlen=60)
+        # Whole-session CPS at several resolutions (mimic.timeline)
+        self.cps_timeline = CPSTimeline(Config.CPS_TIMELINE_LEVELS, Config.CPS_TIMELINE_CAPACITY)
+        # Per-stage timing of click() and deadline misses (mimic.latency)
+        self.profiler = ClickProfiler(Config.LATENCY_DEADLINE_SLACK_MS, Config.LATENCY_TRACE_CLICKS)
 
         # Crossfade settings (20 clicks is the optimal blending target)
         self.blend_steps = 20
@@ -227,7 +280,9 @@ class AdaptiveClickerEngine:
         sequence, so it is the merged stream that has to look human.
 
         Advances no wall-clock time and drives no mouse -- for validation and
-        for the differential analysis page.
+        for the differential analysis page. It draws the double independently
+        of the hold and emits no holds; simulate_events() follows click()
+        exactly and should be preferred for new validation work.
         """
         out = []
         for _ in range(n):
@@ -242,6 +297,16 @@ class AdaptiveClickerEngine:
             out.append(d)
         return out
 
+    def simulate_events(self, n: int, seed=None):
+        """Every press click() would make over n intentional presses, offline.
+
+        Returns a mimic.simulator.EventTable (press times, holds, bounce
+        flags, states). Starts from this engine's current model state as one
+        continuous hold and leaves the engine untouched.
+        """
+        from .simulator import simulate_events
+        return simulate_events(self, n, seed)
+
     def export_to_csv(self, filepath: str) -> int:
         """Write the retained delay buffer as CSV. Returns rows written.
 
@@ -259,6 +324,55 @@ class AdaptiveClickerEngine:
                 w.writerow([i, round(t, 3), round(d, 3), "left", "single-click"])
         return len(delays)
 
+    def export_histogram_csv(self, filepath: str) -> int:
+        """Write the engine's delay histograms as CSV. Returns rows written.
+
+        One row per bin for each of the four histograms (session / window,
+        linear / log); bin_lo or bin_hi is blank on the open-ended
+        underflow and overflow bins.
+        """
+        h = self.histograms
+        rows = 0
+        with open(filepath, "w", newline="", encoding="utf-8") as fh:
+            w = csv.writer(fh)
+            w.writerow(["scope", "layout", "bin_lo_ms", "bin_hi_ms", "count"])
+            for scope, layout, hist in (("session", "linear", h.session),
+                                        ("session", "log", h.session_log),
+                                        ("window", "linear", h.window),
+                                        ("window", "log", h.window_log)):
+                for lo, hi, count in hist.to_rows():
+                    w.writerow([scope, layout,
+                                "" if lo is None else round(lo, 3),
+                                "" if hi is None else round(hi, 3), count])
+                    rows += 1
+        return rows
+
+    def export_heatmap(self, filepath: str) -> str:
+        """Write the delay heatmap's counts as .npz and a rendered PNG beside it.
+
+        Returns the PNG path. The image is 4 pixels per grid cell.
+        """
+        hm = self.heatmap
+        hm.export(filepath)
+        png_path = os.path.splitext(filepath)[0] + ".png"
+        save_png(png_path, hm.to_rgb(hm.cols * 4, hm.rows * 4))
+        return png_path
+
+    def export_latency(self, filepath: str, first: int = None, last: int = None) -> str:
+        """Write the click-path latency histograms as JSON and a Chrome trace beside it.
+
+        The trace covers retained clicks first..last (profiler numbering,
+        default all retained). Returns the trace path.
+        """
+        self.profiler.export_json(filepath)
+        trace_path = os.path.splitext(filepath)[0] + "_trace.json"
+        self.profiler.export_chrome_trace(trace_path, first, last)
+        return trace_path
+
+    def session_sketches(self) -> dict:
+        """Copies of the delay and hold sketches, safe to save off the click thread."""
+        return {"delays": self.delay_sketch.copy(), "holds": self.hold_sketch.copy()}
+
     def reset_state(self, initial_state: str = "normal") -> None:
         """Wipes and sets up current mathematical parameters cleanly"""
         if initial_state in STATE_INDEX:
@@ -306,6 +420,7 @@ class AdaptiveClickerEngine:
 
     def start_clicking(self):
         """Session re-randomization for tracking diversity"""
+        _require_win32()
         if not self.is_actively_clicking:
             self.is_actively_clicking = True
             self.user_baseline = random.uniform(0.88, 1.12)
@@ -365,18 +480,18 @@ class AdaptiveClickerEngine:
     def check_cps(self) -> float:
         """Protects sustained network safety windows"""
         current_time = time.time()
-        while self.recent_click_times and current_time - self.recent_click_times[0] > 5.0:
+        while self.recent_click_times and current_time - self.recent_click_times[0] > CPS_WINDOW_S:
             self.recent_click_times.popleft()
 
         if len(self.recent_click_times) >= 2:
             recent_1s = [t for t in self.recent_click_times if current_time - t <= 1.0]
-            if len(recent_1s) >= 16:
-                return 0.08
+            if len(recent_1s) >= BURST_CLICKS:
+                return BURST_BACKOFF_S
 
             time_span = current_time - self.recent_click_times[0]
             avg_cps = len(self.recent_click_times) / time_span if time_span > 0 else 0
             if avg_cps > Config.SUSTAINED_CPS_CAP:
-                return 0.05
+                return SUSTAINED_BACKOFF_S
         return 0.0
 
     def calculate_delay(self) -> float:
@@ -396,9 +511,7 @@ class AdaptiveClickerEngine:
         # 2. Continuous Exponential Fatigue Decay.
         # consecutive_clicks now decays while idle (see click()), so this
         # recovers during pauses instead of staying pinned at 1.22 all session.
-        lambda_rate = 12.0
-        max_fatigue_slowdown = 0.22
-        fatigue_multiplier = 1.0 + (max_fatigue_slowdown * (1.0 - math.exp(-self.consecutive_clicks / lambda_rate)))
+        fatigue_multiplier = 1.0 + (FATIGUE_MAX_SLOWDOWN * (1.0 - math.exp(-self.consecutive_clicks / FATIGUE_LAMBDA)))
         base *= fatigue_multiplier
 
         # 3. User baseline multiplier and mean-reverting drift.
@@ -419,15 +532,15 @@ class AdaptiveClickerEngine:
         # the output's lag-1 autocorrelation (realized acf1 hit +0.95 against a
         # human +0.10). Stepping most of the way around the circle each click
         # keeps the rhythm texture without the memory.
-        self.rhythm_phase = (self.rhythm_phase + random.uniform(1.1, 2.6)) % (2 * math.pi)
-        rhythm_amount = 0.055 if self.enhanced_mode else 0.038
+        self.rhythm_phase = (self.rhythm_phase + random.uniform(*RHYTHM_STEP)) % (2 * math.pi)
+        rhythm_amount = RHYTHM_AMOUNT_ENHANCED if self.enhanced_mode else RHYTHM_AMOUNT_STANDARD
         base *= (1.0 + math.sin(self.rhythm_phase) * rhythm_amount)
 
         # 5. Occasional long pause. Real sessions put 1.85% of clicks past
         # 250ms and reach 475ms; the old engine emitted exactly zero of these,
         # so its distribution had no right tail at all.
-        if self._uniforms.next() < 0.018:
-            base += abs(random.gauss(0, 95.0))
+        if self._uniforms.next() < PAUSE_RATE:
+            base += abs(random.gauss(0, PAUSE_STD_MS))
             self.pause_count += 1
 
         if self._sigma > 0 and abs(self._u) > 2.5:
@@ -463,7 +576,12 @@ class AdaptiveClickerEngine:
             final = min(hi, max(lo, final))
 
         self.click_history.append(final)
+        full = len(self.all_delays) == self.all_delays.maxlen
+        evicted = self.all_delays[0] if full else None
         self.all_delays.append(final)
+        self.histograms.add(final, evicted)
+        self.heatmap.add(final)
+        self.delay_sketch.add(final)
 
         # Welford update -- keeps whole-session variance available in O(1)
         self._n += 1
@@ -475,12 +593,20 @@ class AdaptiveClickerEngine:
 
     def click(self):
         """Executes click events with sub-millisecond precision clocks"""
+        _require_win32()
         if self.combat_start is None:
             self.combat_start = datetime.now()
 
+        # Each stage is timed into self.profiler; t is the end of the last one.
+        prof = self.profiler
+        t = prof.begin()
+
         safety = self.check_cps()
+        t = prof.lap("check_cps", t)
         if safety > 0:
             self.precise_sleep(safety)
+            t = prof.slept("safety_sleep", t, safety)
+        period_start = t
 
         now = time.time()
 
@@ -489,14 +615,15 @@ class AdaptiveClickerEngine:
         # the fatigue multiplier saturated at 1.22 and stayed there all session.
         if self.last_click_wall is not None:
             idle = now - self.last_click_wall
-            if idle > 0.35:
-                self.consecutive_clicks = int(self.consecutive_clicks * math.exp(-idle / 2.5))
+            if idle > IDLE_RECOVERY_S:
+                self.consecutive_clicks = int(self.consecutive_clicks * math.exp(-idle / IDLE_RECOVERY_TAU_S))
         self.last_click_wall = now
 
         # Pull interval directly from the crossfaded math matrix.
         # This is the FULL press-to-press period, matching how
         # MimicBenchmarkTool records training data (on `pressed` only).
         delay_ms = self.calculate_delay()
+        t = prof.lap("calculate_delay", t)
 
         # Decide the double BEFORE the hold, because the two are not
         # independent: a press that the switch doubles holds ~17ms, while a
@@ -510,10 +637,15 @@ class AdaptiveClickerEngine:
         )
 
         pressure_ms = self._draw_hold(delay_ms, will_double)
+        self.hold_sketch.add(pressure_ms)
+        t = prof.lap("draw_hold", t)
 
         win32api.mouse_event(win32con.MOUSEEVENTF_LEFTDOWN, 0, 0, 0, 0)
+        t = prof.lap("mouse_down", t)
         self.precise_sleep(pressure_ms / 1000.0)
+        t = prof.slept("hold_sleep", t, pressure_ms / 1000.0)
         win32api.mouse_event(win32con.MOUSEEVENTF_LEFTUP, 0, 0, 0, 0)
+        t = prof.lap("mouse_up", t)
 
         self.recent_click_times.append(now)
         self.total_clicks += 1
@@ -521,8 +653,12 @@ class AdaptiveClickerEngine:
 
         # Log results for graph callbacks
         current_cps = self.get_current_cps()
+        t = prof.lap("get_current_cps", t)
+        logged_at = time.time()
         self.cps_history.append(current_cps)
-        self.cps_timestamps.append(time.time())
+        self.cps_timestamps.append(logged_at)
+        self.cps_timeline.add(logged_at, current_cps)
+        t = prof.lap("log_cps", t)
 
         # Optional hardware-double emulation. A double-clicking mouse fires a
         # second actuation a few ms after the real press; the game counts it as
@@ -538,11 +674,17 @@ class AdaptiveClickerEngine:
             # 17ms one.
             budget = delay_ms - gap - Config.DOUBLE_MIN_REMAINDER_MS
             bounce_hold = min(self._draw_hold(delay_ms, False), max(1.0, budget))
+            self.hold_sketch.add(bounce_hold)
+            t = prof.lap("draw_hold", t)
 
             self.precise_sleep((gap - pressure_ms) / 1000.0)
+            t = prof.slept("gap_sleep", t, (gap - pressure_ms) / 1000.0)
             win32api.mouse_event(win32con.MOUSEEVENTF_LEFTDOWN, 0, 0, 0, 0)
+            t = prof.lap("mouse_down", t)
             self.precise_sleep(bounce_hold / 1000.0)
+            t = prof.slept("bounce_sleep", t, bounce_hold / 1000.0)
             win32api.mouse_event(win32con.MOUSEEVENTF_LEFTUP, 0, 0, 0, 0)
+            t = prof.lap("mouse_up", t)
             consumed = gap + bounce_hold
             self.total_clicks += 1
             self.double_count += 1
@@ -550,7 +692,10 @@ class AdaptiveClickerEngine:
         # The hold is PART of the interval, not additional to it. Sleeping the
         # full delay here on top of pressure_ms was inflating every period by
         # ~26ms, which is why in-game CPS mods always read lower than Mimic did.
-        self.precise_sleep(max(0.0, delay_ms - consumed) / 1000.0)
+        rest = max(0.0, delay_ms - consumed) / 1000.0
+        self.precise_sleep(rest)
+        t = prof.slept("period_sleep", t, rest)
+        prof.end_click(period_start, delay_ms, t)
 
     def _draw_hold(self, delay_ms: float, will_double: bool) -> float:
         """Button hold duration for one press, in ms.
@@ -613,8 +758,8 @@ class AdaptiveClickerEngine:
         return (len(self.recent_click_times) - 1) / span if span > 0 else 0.0
 
     # ── statistics ────────────────────────────────────────────────────────
-    # Restored: the v4.0 rewrite dropped these, but update_display() calls
-    # them every 500ms. Now O(1) via Welford instead of O(n) over all_delays.
+    # Restored: the v4.0 rewrite dropped these, but the dashboard refresh
+    # calls them on every tick that follows a click. Now O(1) via Welford instead of O(n) over all_delays.
 
     def calculate_variance(self) -> float:
         """Variance over the recent window (short-term consistency)."""
@@ -670,4 +815,8 @@ class AdaptiveClickerEngine:
             "pause_count": self.pause_count,
             "outlier_count": self.outlier_count,
             "enhanced_mode": self.enhanced_mode,
+            # Whole-session percentiles, read off the histogram in O(bins).
+            "p50_delay": self.histograms.session.quantile(0.50),
+            "p90_delay": self.histograms.session.quantile(0.90),
+            "p99_delay": self.histograms.session.quantile(0.99),
         }
@@ -0,0 +1,129 @@
+"""Background writer for exports.
+
+Part of Mimic. Exports used to run on whichever thread asked for them -- the
+Tk loop for buttons, the keyboard thread for F-key hotkeys -- and building a
+report, creating folders, writing CSVs row by row and recording the session
+all happened there, freezing the window on a long session and competing
+with the click thread.
+
+Now the caller snapshots what it needs (cheap), and the file work runs as a
+job on one writer thread, in submission order. Each job is a list of steps;
+a cancelled job stops before its next step. Results, errors and
+cancellations are handed back to the Tk thread with root.after, so
+callbacks may touch widgets and show message boxes.
+"""
+
+import queue
+import threading
+
+
+class ExportCancelled(Exception):
+    """Raised inside a job when it has been cancelled."""
+
+
+class ExportJob:
+    """One queued export. steps: list of (label, fn); each fn() -> result."""
+
+    def __init__(self, name, steps, on_done=None, on_error=None):
+        self.name = name
+        self.steps = list(steps)
+        self.on_done = on_done
+        self.on_error = on_error
+        self.results = []
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def check(self):
+        """Raise ExportCancelled if the job was cancelled. Long steps may call this."""
+        if self._cancel.is_set():
+            raise ExportCancelled(self.name)
+
+
+class ExportWriter:
+    """Single background thread draining a queue of ExportJobs.
+
+    on_busy(name or None) is called on the Tk thread when a job starts and
+    when the queue runs dry, for a status indicator.
+    """
+
+    def __init__(self, root, on_busy=None):
+        self.root = root
+        self.on_busy = on_busy
+        self.jobs = queue.Queue()
+        self.current = None
+        self._pending = []
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, name, steps, on_done=None, on_error=None):
+        """Queue a job. on_done(results) / on_error(exc) run on the Tk thread.
+
+        Safe to call from any thread. Returns the job, which can be cancelled.
+        """
+        job = ExportJob(name, steps, on_done, on_error)
+        with self._lock:
+            self._pending.append(job)
+        self.jobs.put(job)
+        return job
+
+    def cancel_all(self):
+        """Cancel the running job and everything queued behind it."""
+        with self._lock:
+            for job in self._pending:
+                job.cancel()
+            return bool(self._pending)
+
+    @property
+    def busy(self):
+        with self._lock:
+            return bool(self._pending)
+
+    def stop(self):
+        self.cancel_all()
+        self.jobs.put(None)
+
+    def _post(self, fn, *args):
+        try:
+            self.root.after(0, fn, *args)
+        except Exception:
+            pass    # Tk already gone (shutdown); nothing left to tell
+
+    def _run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            self.current = job
+            if self.on_busy:
+                self._post(self.on_busy, job.name)
+            step = None
+            try:
+                for step, fn in job.steps:
+                    job.check()
+                    job.results.append(fn())
+                job.check()
+            except ExportCancelled as e:
+                print(f"[EXPORT] Cancelled: {job.name}")
+                if job.on_error:
+                    self._post(job.on_error, e)
+            except Exception as e:
+                print(f"[ERROR] Export failed ({job.name}, {step}): {e}")
+                if job.on_error:
+                    self._post(job.on_error, e)
+            else:
+                if job.on_done:
+                    self._post(job.on_done, job.results)
+            finally:
+                self.current = None
+                with self._lock:
+                    self._pending.remove(job)
+                    idle = not self._pending
+                if idle and self.on_busy:
+                    self._post(self.on_busy, None)
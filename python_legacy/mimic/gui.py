@@ -9,7 +9,6 @@ import json
 import math
 import time
 import random
-import threading
 import statistics
 from datetime import datetime
 from collections import deque
@@ -17,16 +16,15 @@ from collections import deque
 import keyboard
 import tkinter as tk
 from tkinter import ttk, messagebox
-import win32api
-import win32con
 from pynput import mouse
 
-from MimicBenchmarkTool import ClickTrackerGUI, PYNPUT_AVAILABLE, TKINTER_AVAILABLE
-
 from .config import Config, RiskAssessor, RiskVisualization, ClickEnginePresets, PresetManager
-from .engine import AdaptiveClickerEngine, STATES, STATE_NAMES
+from .engine import AdaptiveClickerEngine, STATES, STATE_NAMES, WIN32_AVAILABLE
 from .session import SessionManager, HumanClickTracker
-from .widgets import CPSLineGraph, HistogramCanvas
+from .widgets import CPSLineGraph, HistogramCanvas, HeatmapCanvas
+from .scheduler import RefreshScheduler
+from .clickloop import ClickLoop
+from .exporter import ExportWriter, ExportCancelled
 
 
 
@@ -38,6 +36,7 @@ class MinecraftAutoClickerGUI:
     """Mimic - Statistical Ghost Clicker GUI"""
     
     def __init__(self):
+        self.startup_t0 = time.perf_counter()
         self.root = tk.Tk()
         self.root.title("Mimic v3.7")
         self.root.geometry("650x750")
@@ -67,28 +66,41 @@ class MinecraftAutoClickerGUI:
         
         # State
         self.active = False
-        self.clicking = False
         self.enhanced_mode = True
         self.engine = None
         self.current_preset = "Balanced"
         self.current_page = 0
         self.pages = []
         
-        self.physical_left_held = False  # Track physical button state
+        # Holds the physical button state; woken by on_physical_click
+        self.click_loop = ClickLoop(lambda: self.engine if self.active else None)
         self.mouse_listener = mouse.Listener(on_click=self.on_physical_click)
         self.mouse_listener.start()
     
         # Session management
         self.session_manager = SessionManager()
         self.human_tracker = HumanClickTracker(self.session_manager)
+        # All file exports run on this thread, never on Tk's or a hotkey's
+        self.exporter = ExportWriter(self.root, on_busy=self.on_export_busy)
+        self.metrics_server = None
         
         # Setup
         self.setup_ui()
         self.setup_hotkeys()
         self.start_threads()
-        self.update_display()
+        self.setup_refresh()
         
         self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        # Idle callbacks run in order, so this lands after the first layout
+        # and map that setup_ui() queued.
+        self.root.after_idle(self.report_first_frame)
+    
+    def report_first_frame(self):
+        """Print time from construction to the first drawn frame"""
+        self.root.update_idletasks()
+        elapsed_ms = (time.perf_counter() - self.startup_t0) * 1000
+        built = sum(1 for page in self.pages if page is not None)
+        print(f"[STARTUP] First frame in {elapsed_ms:.0f} ms ({built}/{len(self.pages)} pages built)")
         
     def on_physical_click(self, x, y, button, pressed, injected=False):
         """Listener for PHYSICAL mouse events only"""
@@ -98,7 +110,7 @@ class MinecraftAutoClickerGUI:
         
         # Only track PHYSICAL left button clicks
         if button == mouse.Button.left:
-            self.physical_left_held = pressed
+            self.click_loop.set_held(pressed)
             # Uncomment for debugging:
             # if self.active:
             #     print(f"[PHYSICAL] Left: {'DOWN' if pressed else 'UP'}")
@@ -147,6 +159,8 @@ class MinecraftAutoClickerGUI:
             fg="#666666"
         )
         self.path_indicator.pack(pady=(0, 5))
+        self.path_indicator_text = self.path_indicator.cget("text")
+        self.path_indicator.bind("<Button-1>", self.cancel_exports)
         
         self.status_indicator = tk.Label(
             header_frame,
@@ -184,14 +198,18 @@ class MinecraftAutoClickerGUI:
         self.content_frame = tk.Frame(self.root, bg=self.bgcolor)
         self.content_frame.pack(fill=tk.BOTH, expand=True, padx=25)
         
-        # Create all pages
-        self.create_page_dashboard()
-        self.create_page_settings()
-        self.create_page_analytics()
-        self.create_page_graphs()
-        self.create_page_training()
-        self.create_page_history()
-        self.create_page_differential()
+        # Pages are built on first visit (build_page); only the dashboard is
+        # needed to show the first frame.
+        self.page_builders = [
+            self.create_page_dashboard,
+            self.create_page_settings,
+            self.create_page_analytics,
+            self.create_page_graphs,
+            self.create_page_training,
+            self.create_page_history,
+            self.create_page_differential,
+        ]
+        self.pages = [None] * len(self.page_builders)
         
         # ═══ NAVIGATION FOOTER ═══
         nav_frame = tk.Frame(self.root, bg=self.bgcolor)
@@ -237,10 +255,8 @@ class MinecraftAutoClickerGUI:
         # Show first page
         self.switch_page(0)
     
-    def create_page_dashboard(self):
+    def create_page_dashboard(self, page):
         """Enhanced dashboard with visual risk indicators"""
-        page = tk.Frame(self.content_frame, bg=self.bgcolor)
-        self.pages.append(page)
         
         # Status panel
         status_panel = tk.Frame(page, bg=self.panel_color, relief=tk.RIDGE, bd=2)
@@ -561,10 +577,8 @@ class MinecraftAutoClickerGUI:
         
         setattr(self, var_name, value_label)
     
-    def create_page_settings(self):
+    def create_page_settings(self, page):
         """Settings page"""
-        page = tk.Frame(self.content_frame, bg=self.bgcolor)
-        self.pages.append(page)
         
         # Create scrollable canvas
         canvas = tk.Canvas(page, bg=self.bgcolor, highlightthickness=0, height=510)
@@ -710,7 +724,7 @@ Folder Structure:
     ├── jitter/         ← Training data (F8)
     ├── normal/         ← Training data (F8)
     ├── mixed/          ← Training data (F8)
-    └── sessions.json   ← History database"""
+    └── sessions.db     ← History database"""
         
         tk.Label(
             export_panel,
@@ -776,10 +790,8 @@ Folder Structure:
         
         canvas.pack(side="left", fill="both", expand=True)
         scrollbar.pack(side="right", fill="y")
-    def create_page_analytics(self):
+    def create_page_analytics(self, page):
         """Analytics page"""
-        page = tk.Frame(self.content_frame, bg=self.bgcolor)
-        self.pages.append(page)
         
         # Current session metrics
         current_panel = tk.Frame(page, bg=self.panel_color, relief=tk.RIDGE, bd=2)
@@ -804,6 +816,38 @@ Folder Structure:
         
         tk.Label(current_panel, text="", bg=self.panel_color, height=1).pack()
         
+        # Click-path latency per engine stage (mimic.latency)
+        latency_panel = tk.Frame(page, bg=self.panel_color, relief=tk.RIDGE, bd=2)
+        latency_panel.pack(fill=tk.X, pady=(0, 8))
+        
+        tk.Label(
+            latency_panel,
+            text="⏱ Click Path Latency",
+            font=("Arial", 11, "bold"),
+            bg=self.panel_color,
+            fg=self.fg_color
+        ).pack(pady=(10, 4))
+        
+        self.deadline_label = tk.Label(
+            latency_panel,
+            text="Deadline misses: --",
+            font=("Arial", 9),
+            bg=self.panel_color,
+            fg="#cccccc"
+        )
+        self.deadline_label.pack()
+        
+        self.latency_table = tk.Label(
+            latency_panel,
+            text="No clicks yet.",
+            font=("Courier", 8),
+            bg=self.panel_color,
+            fg="#cccccc",
+            justify=tk.LEFT,
+            anchor="w"
+        )
+        self.latency_table.pack(pady=(4, 10), padx=15, fill=tk.X)
+        
         # Session history
         history_panel = tk.Frame(page, bg=self.panel_color, relief=tk.RIDGE, bd=2)
         history_panel.pack(fill=tk.BOTH, expand=True)
@@ -866,10 +910,8 @@ Folder Structure:
         
         setattr(self, var_name, value)
     
-    def create_page_graphs(self):
+    def create_page_graphs(self, page):
         """Graphs page"""
-        page = tk.Frame(self.content_frame, bg=self.bgcolor)
-        self.pages.append(page)
         
         # CPS Line Graph
         graph_panel = tk.Frame(page, bg=self.panel_color, relief=tk.RIDGE, bd=2)
@@ -877,7 +919,7 @@ Folder Structure:
         
         tk.Label(
             graph_panel,
-            text="📈 Real-Time CPS (30s Rolling)",
+            text="📈 CPS Timeline",
             font=("Arial", 11, "bold"),
             bg=self.panel_color,
             fg=self.fg_color
@@ -886,6 +928,26 @@ Folder Structure:
         self.cps_graph = CPSLineGraph(graph_panel, width=560, height=200)
         self.cps_graph.pack(pady=5, padx=10)
         
+        zoom_frame = tk.Frame(graph_panel, bg=self.panel_color)
+        zoom_frame.pack()
+        
+        self.zoom_buttons = {}
+        for label, span in CPSLineGraph.ZOOM_LEVELS:
+            btn = tk.Button(
+                zoom_frame,
+                text=label,
+                font=("Arial", 8, "bold"),
+                bg=self.active_tab if span == self.cps_graph.zoom else self.inactive_tab,
+                fg=self.fg_color,
+                activebackground=self.button_hover,
+                relief=tk.FLAT,
+                cursor="hand2",
+                command=lambda s=span: self.set_graph_zoom(s),
+                width=5
+            )
+            btn.pack(side=tk.LEFT, padx=2)
+            self.zoom_buttons[span] = btn
+        
         tk.Label(
             graph_panel,
             text="Green zone: Optimal 7-12 CPS",
@@ -898,20 +960,45 @@ Folder Structure:
         histogram_panel = tk.Frame(page, bg=self.panel_color, relief=tk.RIDGE, bd=2)
         histogram_panel.pack(fill=tk.BOTH, expand=True)
         
+        header = tk.Frame(histogram_panel, bg=self.panel_color)
+        header.pack(fill=tk.X, padx=10, pady=(10, 5))
+        self.delay_header = header
+        
         tk.Label(
-            histogram_panel,
+            header,
             text="📊 Click Delay Distribution",
             font=("Arial", 11, "bold"),
             bg=self.panel_color,
             fg=self.fg_color
-        ).pack(pady=(10, 5))
+        ).pack(side=tk.LEFT)
+        
+        # Histogram of the recent window, or the whole session as a heatmap
+        self.delay_view = "histogram"
+        self.delay_view_buttons = {}
+        for view, label in (("heatmap", "Heatmap"), ("histogram", "Histogram")):
+            btn = tk.Button(
+                header,
+                text=label,
+                font=("Arial", 8, "bold"),
+                bg=self.active_tab if view == self.delay_view else self.inactive_tab,
+                fg=self.fg_color,
+                activebackground=self.button_hover,
+                relief=tk.FLAT,
+                cursor="hand2",
+                command=lambda v=view: self.set_delay_view(v),
+                width=9
+            )
+            btn.pack(side=tk.RIGHT, padx=2)
+            self.delay_view_buttons[view] = btn
         
         self.histogram = HistogramCanvas(histogram_panel, width=560, height=240)
         self.histogram.pack(pady=5, padx=10)
+        self.heatmap = HeatmapCanvas(histogram_panel, width=560, height=240)
         
         # Legend
         legend_frame = tk.Frame(histogram_panel, bg=self.panel_color)
         legend_frame.pack(pady=5)
+        self.histogram_legend = legend_frame
         
         legend_items = [
             ("█", "#4CAF50", "Optimal"),
@@ -941,10 +1028,8 @@ Folder Structure:
         
         tk.Label(histogram_panel, text="", bg=self.panel_color, height=1).pack()
     
-    def create_page_training(self):
+    def create_page_training(self, page):
         """Training page"""
-        page = tk.Frame(self.content_frame, bg=self.bgcolor)
-        self.pages.append(page)
         
         # Title
         title_panel = tk.Frame(page, bg=self.panel_color, relief=tk.RIDGE, bd=2)
@@ -1145,10 +1230,8 @@ Folder Structure:
         
         tk.Label(info_panel, text="", bg=self.panel_color, height=1).pack()
     
-    def create_page_history(self):
+    def create_page_history(self, page):
         """History page"""
-        page = tk.Frame(self.content_frame, bg=self.bgcolor)
-        self.pages.append(page)
         
         # Title
         title_panel = tk.Frame(page, bg=self.panel_color, relief=tk.RIDGE, bd=2)
@@ -1195,7 +1278,7 @@ Folder Structure:
             width=15
         )
         filter_menu.pack(side=tk.LEFT, padx=5)
-        filter_menu.bind("<<ComboboxSelected>>", lambda e: self.update_history_list())
+        filter_menu.bind("<<ComboboxSelected>>", lambda e: self.update_history_list(page=0))
         
         refresh_btn = tk.Button(
             filter_frame,
@@ -1242,6 +1325,34 @@ Folder Structure:
         self.history_list.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.config(command=self.history_list.yview)
         
+        # Pagination
+        page_frame = tk.Frame(list_panel, bg=self.panel_color)
+        page_frame.pack(pady=(0, 4))
+        
+        self.history_page = 0
+        for text, step in (("◀ Newer", -1), ("Older ▶", 1)):
+            tk.Button(
+                page_frame,
+                text=text,
+                font=("Arial", 8),
+                bg=self.button_color,
+                fg=self.fg_color,
+                activebackground=self.button_hover,
+                relief=tk.FLAT,
+                cursor="hand2",
+                command=lambda step=step: self.update_history_list(page=self.history_page + step),
+                width=9
+            ).pack(side=tk.LEFT, padx=5)
+        
+        self.history_page_label = tk.Label(
+            page_frame,
+            text="",
+            font=("Arial", 8),
+            bg=self.panel_color,
+            fg="#888888"
+        )
+        self.history_page_label.pack(side=tk.LEFT, padx=8)
+        
         # Action buttons
         action_frame = tk.Frame(list_panel, bg=self.panel_color)
         action_frame.pack(pady=10)
@@ -1267,13 +1378,9 @@ Folder Structure:
             bg=self.panel_color,
             fg="#888888"
         ).pack(pady=(0, 10))
-        
-        self.update_history_list()
     
-    def create_page_differential(self):
+    def create_page_differential(self, page):
         """Differential analysis page"""
-        page = tk.Frame(self.content_frame, bg=self.bgcolor)
-        self.pages.append(page)
         
         # Title
         title_panel = tk.Frame(page, bg=self.panel_color, relief=tk.RIDGE, bd=2)
@@ -1402,14 +1509,20 @@ Folder Structure:
         
         self.update_differential_options()
     
-    def update_history_list(self):
-        """Update training session history list"""
+    def update_history_list(self, page=None):
+        """Update training session history list, one page at a time"""
         filter_type = self.history_filter.get()
-        
-        if filter_type == "All":
-            sessions = self.session_manager.get_training_sessions()
-        else:
-            sessions = self.session_manager.get_training_sessions(filter_type)
+        click_type = None if filter_type == "All" else filter_type
+        
+        page_size = self.session_manager.PAGE_SIZE
+        total = self.session_manager.count_sessions("training", click_type)
+        pages = max(1, -(-total // page_size))
+        if page is not None:
+            self.history_page = page
+        self.history_page = min(max(0, self.history_page), pages - 1)
+        sessions = self.session_manager.get_training_page(click_type, self.history_page, page_size)
+        self.history_page_label.config(
+            text=f"Page {self.history_page + 1} of {pages}  ({total} sessions)")
         
         self.history_list.config(state=tk.NORMAL)
         self.history_list.delete("1.0", tk.END)
@@ -1421,7 +1534,7 @@ Folder Structure:
             self.history_list.insert("1.0", header)
             self.history_list.insert("2.0", "-" * 70 + "\n")
             
-            for session in reversed(sessions[-20:]):
+            for session in sessions:
                 timestamp = session.get('timestamp', 'Unknown')
                 try:
                     dt = datetime.fromisoformat(timestamp)
@@ -1436,15 +1549,29 @@ Folder Structure:
                 
                 line = f"{time_str:<20} {type_str:<12} {clicks:<8} {cps:<8.2f} {int(variance):<10}\n"
                 self.history_list.insert(tk.END, line)
+            
+            # Pooled over every session of this filter, merged from the saved
+            # sketches rather than by reloading the CSVs.
+            pooled = self.session_manager.aggregate("training", click_type)["delays"]
+            if pooled is not None:
+                ps = pooled.summary()
+                self.history_list.insert(tk.END, "-" * 70 + "\n")
+                self.history_list.insert(
+                    tk.END,
+                    f"All {filter_type.lower()} sessions: {ps['count']} delays  "
+                    f"P50 {ps['p50']:.1f}  P90 {ps['p90']:.1f}  P99 {ps['p99']:.1f} ms  "
+                    f"SD {ps['std_dev']:.1f}  skew {ps['skew']:.2f}\n")
         
         self.history_list.config(state=tk.DISABLED)
     
     def update_differential_options(self):
         """Update dropdown options for differential analysis"""
-        training_sessions = self.session_manager.get_training_sessions()
+        # Keep the rows the menus were built from, so a selection index maps
+        # to the session it showed even if more are saved in the meantime.
+        self.diff_training_sessions = self.session_manager.get_training_page(page_size=10)
         training_options = []
         
-        for i, session in enumerate(reversed(training_sessions[-10:])):
+        for i, session in enumerate(self.diff_training_sessions):
             timestamp = session.get('timestamp', 'Unknown')
             try:
                 dt = datetime.fromisoformat(timestamp)
@@ -1464,10 +1591,10 @@ Folder Structure:
         else:
             self.human_session_menu['values'] = ["No training sessions available"]
         
-        clicker_sessions = self.session_manager.get_clicker_sessions()
+        self.diff_clicker_sessions = self.session_manager.get_clicker_page(page_size=10)
         clicker_options = []
         
-        for i, session in enumerate(reversed(clicker_sessions[-10:])):
+        for i, session in enumerate(self.diff_clicker_sessions):
             timestamp = session.get('timestamp', 'Unknown')
             try:
                 dt = datetime.fromisoformat(timestamp)
@@ -1501,9 +1628,6 @@ Folder Structure:
             messagebox.showwarning("No Selection", "Please select a bot clicker session!")
             return
         
-        training_sessions = self.session_manager.get_training_sessions()
-        clicker_sessions = self.session_manager.get_clicker_sessions()
-        
         human_idx = self.human_session_menu.current()
         bot_idx = self.bot_session_menu.current()
         
@@ -1511,8 +1635,8 @@ Folder Structure:
             messagebox.showerror("Error", "Could not find selected sessions!")
             return
         
-        available_training = list(reversed(training_sessions[-10:]))
-        available_clicker = list(reversed(clicker_sessions[-10:]))
+        available_training = self.diff_training_sessions
+        available_clicker = self.diff_clicker_sessions
         
         if human_idx >= len(available_training) or bot_idx >= len(available_clicker):
             messagebox.showerror("Error", "Session index out of range!")
@@ -1653,15 +1777,25 @@ ANALYSIS:
         self.diff_results.insert("1.0", report)
         self.diff_results.config(state=tk.DISABLED)
     
+    def build_page(self, page_idx):
+        """Construct a page the first time it is needed. Returns its frame."""
+        page = self.pages[page_idx]
+        if page is None:
+            page = tk.Frame(self.content_frame, bg=self.bgcolor)
+            self.pages[page_idx] = page
+            self.page_builders[page_idx](page)
+        return page
+    
     def switch_page(self, page_idx):
         """Switch to specified page"""
         if page_idx < 0 or page_idx >= len(self.pages):
             return
         
         for page in self.pages:
-            page.pack_forget()
+            if page is not None:
+                page.pack_forget()
         
-        self.pages[page_idx].pack(fill=tk.BOTH, expand=True)
+        self.build_page(page_idx).pack(fill=tk.BOTH, expand=True)
         self.current_page = page_idx
         
         for i, btn in enumerate(self.tab_buttons):
@@ -1675,14 +1809,11 @@ ANALYSIS:
         self.prev_btn.config(state=tk.NORMAL if page_idx > 0 else tk.DISABLED)
         self.next_btn.config(state=tk.NORMAL if page_idx < len(self.pages) - 1 else tk.DISABLED)
         
-        if page_idx == 3 and self.engine:
-            if len(self.engine.cps_history) >= 2:
-                self.cps_graph.draw_graph(self.engine.cps_history, self.engine.cps_timestamps)
-            if len(self.engine.all_delays) >= 5:
-                mean = sum(self.engine.all_delays) / len(self.engine.all_delays)
-                stddev = self.engine.calculate_std_dev()
-                self.histogram.draw_histogram(self.engine.all_delays, mean, stddev, self.enhanced_mode)
-        elif page_idx == 5:
+        # Pushes whatever changed while this page was hidden.
+        if hasattr(self, 'refresh'):
+            self.refresh.set_page(page_idx)
+        
+        if page_idx == 5:
             self.update_history_list()
         elif page_idx == 6:
             self.update_differential_options()
@@ -1721,142 +1852,280 @@ ANALYSIS:
             minutes = int((seconds % 3600) // 60)
             return f"{hours}h {minutes}m"
     
-    def update_display(self):
-        """Update all GUI elements with visual risk indicators"""
-        if self.active and self.engine:
-            if self.clicking:
-                self.click_status.config(text="⚔️ CLICKING", fg=self.accent_color)
-            else:
-                self.click_status.config(text="Waiting for MB1...", fg="#888888")
-            
-            elapsed = (datetime.now() - self.engine.session_start).total_seconds()
+    def setup_refresh(self):
+        """Wire the live labels and graphs to the refresh scheduler.
+
+        Every metric but the timer is keyed on _refresh_key(), so nothing is
+        recomputed or reconfigured until a click lands (or the mode changes),
+        and only widgets on the visible page are touched.
+        """
+        s = self.refresh = RefreshScheduler(
+            self.root, self._refresh_key, self._refresh_live,
+            Config.REFRESH_FAST_MS, Config.REFRESH_IDLE_MS
+        )
+        s.metric('status', lambda: self.click_loop.clicking,
+                 lambda: (self._refresh_key()[0], self.click_loop.clicking))
+        s.metric('elapsed', self._session_elapsed,
+                 lambda: (self._refresh_key()[:2], int(self._session_elapsed())))
+        s.metric('clicks', lambda: self._refresh_key())
+        s.metric('rates', self._compute_rates)
+        s.metric('stats', self._compute_stats)
+        s.metric('risk', self._compute_risk)
+        s.metric('latency', self._compute_latency)
+        
+        s.subscribe('status', 0, self._show_status)
+        s.subscribe('elapsed', 0, self._show_timer)
+        s.subscribe('clicks', 0, self._show_clicks)
+        s.subscribe('rates', 0, self._show_rates)
+        s.subscribe('risk', 0, self._show_risk)
+        s.subscribe('risk', 2, self._show_analytics)
+        s.subscribe('latency', 2, self._show_latency)
+        s.subscribe('clicks', 3, self._show_graphs)
+        s.subscribe('clicks', 4, self._show_training_progress)
+        
+        # Restoring a minimized window restarts a sleeping scheduler.
+        self.root.bind('<Map>', lambda e: s.wake() if e.widget is self.root else None, add='+')
+        s.wake()
+    
+    def _refresh_key(self):
+        """(mode, session, clicks) -- changes exactly when a click lands."""
+        engine = self.engine
+        if self.active and engine:
+            return ('clicker', id(engine), engine.total_clicks)
+        if self.human_tracker.is_tracking:
+            return ('training', self.human_tracker.session_start, self.human_tracker.total_clicks)
+        return ('idle', None, 0)
+    
+    def _refresh_live(self):
+        return bool(self.active and self.engine) or self.human_tracker.is_tracking
+    
+    def _session_elapsed(self):
+        engine = self.engine
+        if self.active and engine:
+            return (datetime.now() - engine.session_start).total_seconds()
+        if self.human_tracker.is_tracking and self.human_tracker.session_start:
+            return self.human_tracker.elapsed()
+        return 0.0
+    
+    def _compute_rates(self):
+        """(cps, variance, std_dev) once the clicker has 10+ clicks, else None"""
+        engine = self.engine
+        if not (self.active and engine) or engine.total_clicks <= 10:
+            return None
+        variance = engine.calculate_overall_variance() if len(engine.all_delays) >= 20 else engine.calculate_variance()
+        return engine.get_current_cps(), variance, engine.calculate_std_dev()
+    
+    def _compute_stats(self):
+        engine = self.engine
+        if not (self.active and engine) or engine.total_clicks <= 10:
+            return None
+        return engine.get_detailed_stats()
+    
+    def _compute_risk(self):
+        stats = self.refresh.value('stats')
+        return RiskAssessor.assess(stats) if stats else None
+    
+    def _show_status(self, clicking):
+        if self._refresh_key()[0] != 'clicker':
+            return
+        if clicking:
+            self.click_status.config(text="⚔️ CLICKING", fg=self.accent_color)
+        else:
+            self.click_status.config(text="Waiting for MB1...", fg="#888888")
+    
+    def _show_timer(self, elapsed):
+        if self._refresh_key()[0] == 'idle':
+            self.session_timer.config(text="⏱️ 0:00")
+        else:
             self.session_timer.config(text=f"⏱️ {self.format_time_elapsed(elapsed)}")
-            
-            self.total_clicks_card.config(text=str(self.engine.total_clicks))
-            
-            if self.engine.total_clicks > 10:
-                current_cps = self.engine.get_current_cps()
-                self.current_cps_card.config(text=f"{current_cps:.1f}")
-                
-                variance = self.engine.calculate_overall_variance() if len(self.engine.all_delays) >= 20 else self.engine.calculate_variance()
-                self.variance_card.config(text=f"{int(variance)}")
-                
-                std_dev = self.engine.calculate_std_dev()
-                self.std_dev_card.config(text=f"{std_dev:.1f}")
-                
-                stats = self.engine.get_detailed_stats()
-                if stats:
-                    self.avg_cps_card.config(text=f"{stats['avg_cps']:.2f}")
-                    
-                    risk_assessment = RiskAssessor.assess(stats)
-                    self.risk_card.config(text=risk_assessment['risk'], fg=risk_assessment['color'])
-                    
-                    if stats.get('total', 0) >= 20:
-                        score = risk_assessment['score']
-                        risk_level = RiskVisualization.get_risk_level(score)
-                        
-                        self.risk_score_label.config(
-                            text=f"{risk_level['emoji']} {score}/100 - {risk_level['label']}",
-                            fg=risk_level['color']
-                        )
-                        
-                        thresholds = risk_assessment['thresholds']
-                        
-                        if variance >= thresholds['target_variance']:
-                            v_icon, v_color = "🟢", "#4CAF50"
-                        elif variance >= thresholds['ideal_variance']:
-                            v_icon, v_color = "🟡", "#FFC107"
-                        else:
-                            v_icon, v_color = "🔴", "#F44336"
-                        
-                        self.variance_health.config(
-                            text=f"{v_icon} Variance: {int(variance)} (Target: {thresholds['target_variance']})",
-                            fg=v_color
-                        )
-                        
-                        max_cps = stats.get('max_cps', 0)
-                        if max_cps >= thresholds['spike_cps']:
-                            c_icon, c_color = "🟢", "#4CAF50"
-                        elif max_cps >= thresholds['max_cps']:
-                            c_icon, c_color = "🟡", "#FFC107"
-                        else:
-                            c_icon, c_color = "🔴", "#F44336"
-                        
-                        self.cps_health.config(
-                            text=f"{c_icon} CPS Range: {max_cps:.1f} max (Target: {thresholds['spike_cps']}+)",
-                            fg=c_color
-                        )
-                        
-                        breaks = stats.get('pattern_breaks', 0)
-                        total = stats.get('total', 1)
-                        break_ratio = breaks / (total / 20) if total > 20 else 0
-                        
-                        if break_ratio >= 0.75:
-                            p_icon, p_color = "🟢", "#4CAF50"
-                        elif break_ratio >= 0.50:
-                            p_icon, p_color = "🟡", "#FFC107"
-                        else:
-                            p_icon, p_color = "🔴", "#F44336"
-                        
-                        self.pattern_health.config(
-                            text=f"{p_icon} Pattern Breaks: {breaks} ({break_ratio*100:.0f}% rate)",
-                            fg=p_color
-                        )
-                    
-                    self.risk_level.config(text=risk_assessment['risk'], fg=risk_assessment['color'])
-                    self.risk_score.config(text=f"{risk_assessment['score']}/100")
-                    self.burst_events.config(text=str(stats.get('burst_count', 0)))
-                    self.pause_events.config(text=str(stats.get('pause_count', 0)))
-                    self.outlier_count.config(text=str(stats.get('outlier_count', 0)))
-                    
-                    if self.current_page == 3:
-                        if len(self.engine.cps_history) >= 2:
-                            self.cps_graph.draw_graph(self.engine.cps_history, self.engine.cps_timestamps)
-                        if len(self.engine.all_delays) >= 5:
-                            mean = sum(self.engine.all_delays) / len(self.engine.all_delays)
-                            self.histogram.draw_histogram(self.engine.all_delays, mean, std_dev, self.enhanced_mode)
-        
-        elif self.human_tracker.is_tracking:
-            self.total_clicks_card.config(text=str(self.human_tracker.total_clicks))
+    
+    def _show_clicks(self, key):
+        mode, _, clicks = key
+        self.total_clicks_card.config(text=str(clicks))
+        if mode == 'training':
             self.current_cps_card.config(text="TRAIN")
-            
-            clicks = self.human_tracker.total_clicks
-            if clicks < Config.TRAINING_MIN_CLICKS:
-                progress = f"Progress: {clicks}/{Config.TRAINING_MIN_CLICKS} minimum"
-                progress_color = "#888888"
-            elif clicks < Config.TRAINING_RECOMMENDED_CLICKS:
-                progress = f"Progress: {clicks}/{Config.TRAINING_RECOMMENDED_CLICKS} recommended"
-                progress_color = self.training_color
-            elif clicks < Config.TRAINING_COMPLETE_CLICKS:
-                progress = f"Almost there: {clicks}/{Config.TRAINING_COMPLETE_CLICKS}"
-                progress_color = self.training_color
-            else:
-                progress = f"✅ {clicks} clicks - COMPLETE!"
-                progress_color = self.accent_color
-            
-            self.training_progress.config(text=progress, fg=progress_color)
-            
-            if self.human_tracker.session_start:
-                elapsed = (datetime.now() - self.human_tracker.session_start).total_seconds()
-                self.session_timer.config(text=f"⏱️ {self.format_time_elapsed(elapsed)}")
-        
-        else:
-            self.total_clicks_card.config(text="0")
+    
+    def _show_rates(self, rates):
+        mode = self._refresh_key()[0]
+        if mode == 'idle':
             self.current_cps_card.config(text="--")
             self.variance_card.config(text="--")
             self.std_dev_card.config(text="--")
+        elif rates:
+            current_cps, variance, std_dev = rates
+            self.current_cps_card.config(text=f"{current_cps:.1f}")
+            self.variance_card.config(text=f"{int(variance)}")
+            self.std_dev_card.config(text=f"{std_dev:.1f}")
+    
+    def _show_risk(self, risk_assessment):
+        """Dashboard cards and the risk assessment panel"""
+        if self._refresh_key()[0] == 'idle':
             self.avg_cps_card.config(text="--")
             self.risk_card.config(text="--", fg=self.accent_color)
-            self.session_timer.config(text="⏱️ 0:00")
+            return
+        stats = self.refresh.value('stats')
+        if not risk_assessment:
+            return
+        
+        self.avg_cps_card.config(text=f"{stats['avg_cps']:.2f}")
+        self.risk_card.config(text=risk_assessment['risk'], fg=risk_assessment['color'])
+        
+        if stats.get('total', 0) < 20:
+            return
+        
+        score = risk_assessment['score']
+        risk_level = RiskVisualization.get_risk_level(score)
+        
+        self.risk_score_label.config(
+            text=f"{risk_level['emoji']} {score}/100 - {risk_level['label']}",
+            fg=risk_level['color']
+        )
+        
+        thresholds = risk_assessment['thresholds']
+        variance = self.refresh.value('rates')[1]
+        
+        if variance >= thresholds['target_variance']:
+            v_icon, v_color = "🟢", "#4CAF50"
+        elif variance >= thresholds['ideal_variance']:
+            v_icon, v_color = "🟡", "#FFC107"
+        else:
+            v_icon, v_color = "🔴", "#F44336"
+        
+        self.variance_health.config(
+            text=f"{v_icon} Variance: {int(variance)} (Target: {thresholds['target_variance']})",
+            fg=v_color
+        )
+        
+        max_cps = stats.get('max_cps', 0)
+        if max_cps >= thresholds['spike_cps']:
+            c_icon, c_color = "🟢", "#4CAF50"
+        elif max_cps >= thresholds['max_cps']:
+            c_icon, c_color = "🟡", "#FFC107"
+        else:
+            c_icon, c_color = "🔴", "#F44336"
+        
+        self.cps_health.config(
+            text=f"{c_icon} CPS Range: {max_cps:.1f} max (Target: {thresholds['spike_cps']}+)",
+            fg=c_color
+        )
+        
+        breaks = stats.get('pattern_breaks', 0)
+        total = stats.get('total', 1)
+        break_ratio = breaks / (total / 20) if total > 20 else 0
+        
+        if break_ratio >= 0.75:
+            p_icon, p_color = "🟢", "#4CAF50"
+        elif break_ratio >= 0.50:
+            p_icon, p_color = "🟡", "#FFC107"
+        else:
+            p_icon, p_color = "🔴", "#F44336"
+        
+        self.pattern_health.config(
+            text=f"{p_icon} Pattern Breaks: {breaks} ({break_ratio*100:.0f}% rate)",
+            fg=p_color
+        )
+    
+    def _show_analytics(self, risk_assessment):
+        if not risk_assessment:
+            return
+        stats = self.refresh.value('stats')
+        self.risk_level.config(text=risk_assessment['risk'], fg=risk_assessment['color'])
+        self.risk_score.config(text=f"{risk_assessment['score']}/100")
+        self.burst_events.config(text=str(stats.get('burst_count', 0)))
+        self.pause_events.config(text=str(stats.get('pause_count', 0)))
+        self.outlier_count.config(text=str(stats.get('outlier_count', 0)))
+    
+    def _compute_latency(self):
+        """(clicks, misses, slack_ms, summary rows) from the engine's profiler, else None"""
+        engine = self.engine
+        if not (self.active and engine) or not engine.profiler.clicks:
+            return None
+        prof = engine.profiler
+        return prof.clicks, prof.deadline_misses, prof.deadline_slack_ns / 1e6, prof.summary_rows()
+    
+    def _show_latency(self, latency):
+        if not latency:
+            return
+        clicks, misses, slack_ms, rows = latency
+        rate = misses / clicks * 100
+        self.deadline_label.config(
+            text=f"Deadline misses: {misses}/{clicks} ({rate:.1f}%) at +{slack_ms:g}ms slack",
+            fg=self.accent_color if rate < 1 else ("#FFC107" if rate < 5 else "#F44336")
+        )
+        lines = [f"{'stage':<16}{'n':>8}{'p50 µs':>10}{'p99 µs':>10}{'max µs':>10}"]
+        lines += [f"{name:<16}{n:>8}{p50:>10.1f}{p99:>10.1f}{mx:>10.1f}"
+                  for name, n, p50, p99, mx in rows]
+        self.latency_table.config(text="\n".join(lines))
+    
+    def _show_graphs(self, key):
+        engine = self.engine
+        if not (self.active and engine):
+            return
+        if engine.cps_timeline.count >= 2:
+            self.cps_graph.draw_timeline(engine.cps_timeline)
+        if self.delay_view == "heatmap":
+            self.heatmap.draw_heatmap(engine.heatmap)
+            return
+        hists = engine.histograms
+        if hists.window.total >= 5:
+            self.histogram.draw_counts(hists.window, hists.window_mean(), self.enhanced_mode)
+    
+    def set_graph_zoom(self, span):
+        """Change the CPS graph's time span and redraw it"""
+        self.cps_graph.set_zoom(span)
+        for s, btn in self.zoom_buttons.items():
+            btn.config(bg=self.active_tab if s == span else self.inactive_tab)
+        self._show_graphs(None)
+    
+    def set_delay_view(self, view):
+        """Show the delay histogram or the delay heatmap"""
+        if view == self.delay_view:
+            return
+        self.delay_view = view
+        if view == "heatmap":
+            self.histogram.canvas.pack_forget()
+            self.histogram_legend.pack_forget()
+            self.heatmap.pack(pady=5, padx=10, after=self.delay_header)
+        else:
+            self.heatmap.canvas.pack_forget()
+            self.histogram.pack(pady=5, padx=10, after=self.delay_header)
+            self.histogram_legend.pack(pady=5, after=self.histogram.canvas)
+        for v, btn in self.delay_view_buttons.items():
+            btn.config(bg=self.active_tab if v == view else self.inactive_tab)
+        self._show_graphs(None)
+    
+    def _show_training_progress(self, key):
+        mode, _, clicks = key
+        if mode != 'training':
             self.training_progress.config(text="")
+            return
+        if clicks < Config.TRAINING_MIN_CLICKS:
+            progress = f"Progress: {clicks}/{Config.TRAINING_MIN_CLICKS} minimum"
+            progress_color = "#888888"
+        elif clicks < Config.TRAINING_RECOMMENDED_CLICKS:
+            progress = f"Progress: {clicks}/{Config.TRAINING_RECOMMENDED_CLICKS} recommended"
+            progress_color = self.training_color
+        elif clicks < Config.TRAINING_COMPLETE_CLICKS:
+            progress = f"Almost there: {clicks}/{Config.TRAINING_COMPLETE_CLICKS}"
+            progress_color = self.training_color
+        else:
+            progress = f"✅ {clicks} clicks - COMPLETE!"
+            progress_color = self.accent_color
         
-        self.root.after(500, self.update_display)
+        self.training_progress.config(text=progress, fg=progress_color)
     
     def toggle_active(self):
         """Toggle clicker on/off"""
         if self.human_tracker.is_tracking:
             messagebox.showwarning("Training Active", "Stop training mode first (F7)")
             return
+        if not self.active and not WIN32_AVAILABLE:
+            messagebox.showerror(
+                "Missing Dependency",
+                "pywin32 is required to send clicks\n\n"
+                "Install with: pip install pywin32"
+            )
+            return
         
         self.active = not self.active
         
@@ -1866,9 +2135,8 @@ ANALYSIS:
             self.toggle_btn.config(text="⏸ Deactivate (F4)", bg="#f44336")
             print("\n[MIMIC] Activated - Hold LEFT CLICK to click\n")
         else:
-            # Stop clicking FIRST
-            self.clicking = False
-            self.physical_left_held = False  # Also reset physical state
+            # Stop clicking FIRST (resets the physical state too)
+            self.click_loop.held = False
             
             # Then safely stop engine
             if self.engine:
@@ -1880,6 +2148,9 @@ ANALYSIS:
             self.status_indicator.config(text="⚫ INACTIVE", fg=self.inactive_color)
             self.toggle_btn.config(text="▶ Activate (F4)", bg=self.accent_color)
             print("\n[MIMIC] Deactivated\n")
+        
+        self.click_loop.poke()
+        self.refresh.wake()
 
 
     
@@ -1890,6 +2161,7 @@ ANALYSIS:
             return
         
         self.enhanced_mode = not self.enhanced_mode
+        self.build_page(1)
         
         if self.enhanced_mode:
             self.mode_indicator.config(text="✨ Enhanced Adaptive Mode", fg=self.enhanced_color)
@@ -1915,6 +2187,8 @@ ANALYSIS:
             messagebox.showwarning("Clicker Active", "Stop clicker first (F4)")
             return
         
+        self.build_page(4)
+        
         if not self.human_tracker.is_tracking:
             if self.human_tracker.training_type == "normal" and not hasattr(self, '_type_selected'):
                 messagebox.showwarning("No Type Selected", "Please select a click type first!")
@@ -1930,6 +2204,8 @@ ANALYSIS:
             self.human_tracker.stop_tracking()
             self.training_status_label.config(text="Inactive - Select a type above", fg="#888888")
             self.train_start_btn.config(text="▶ Start Training (F7)", bg=self.training_color)
+        
+        self.refresh.wake()
     
     def launch_MimicBenchmarkTool(self):
         """
@@ -1959,6 +2235,9 @@ ANALYSIS:
         ═══════════════════════════════════════════════════════════════════════
         """)
         try:
+            # Imported on first launch: it pulls in the analysis package,
+            # which most sessions never need.
+            from MimicBenchmarkTool import ClickTrackerGUI, PYNPUT_AVAILABLE, TKINTER_AVAILABLE
             
             # Check dependencies
             if not PYNPUT_AVAILABLE:
@@ -2007,18 +2286,22 @@ ANALYSIS:
             messagebox.showwarning("No Data", "No clicker data to export!")
             return
         
-        stats = self.engine.get_detailed_stats()
-        if not stats:
-            return
-        
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = f"mimic_session_{timestamp}.txt"
         filepath = os.path.join(Config.get_clicker_data_path(), filename)
-        
-        try:
-            os.makedirs(Config.get_clicker_data_path(), exist_ok=True)
-            
-            report = f"""
+        # Statistics, report and sketches are all built on the writer thread;
+        # the local reference keeps this session's engine if the clicker is
+        # deactivated meanwhile.
+        engine = self.engine
+        built = {}
+        
+        def build_report():
+            stats = engine.get_detailed_stats()
+            if not stats:
+                raise ValueError("not enough clicks for a report")
+            built['stats'] = stats
+            built['sketches'] = engine.session_sketches()
+            built['report'] = f"""
 ═══════════════════════════════════════════════════════════════════════════
 MIMIC SESSION REPORT v3.7
 ═══════════════════════════════════════════════════════════════════════════
@@ -2031,6 +2314,7 @@ Average CPS: {stats['avg_cps']:.2f}
 Max CPS: {stats['max_cps']:.2f}
 Variance: {int(stats['variance'])}
 Std Dev: {stats['std_dev']:.2f}
+Delay P50 / P90 / P99: {stats['p50_delay']:.1f} / {stats['p90_delay']:.1f} / {stats['p99_delay']:.1f} ms
 
 ANTI-DETECTION:
 Pattern Breaks: {stats['pattern_breaks']}
@@ -2040,35 +2324,79 @@ Outliers: {stats['outlier_count']}
 
 ═══════════════════════════════════════════════════════════════════════════
 """
-            
+        
+        def write_report():
+            os.makedirs(Config.get_clicker_data_path(), exist_ok=True)
             with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(report)
-            
-            self.session_manager.add_clicker_session(stats, filepath)
-            
+                f.write(built['report'])
+        
+        def record_session():
+            self.session_manager.add_clicker_session(built['stats'], filepath, built['sketches'])
+        
+        def done(_results):
             messagebox.showinfo("Export Success", f"Saved to:\n{filepath}")
             print(f"\n[EXPORT] Stats saved to: {filepath}\n")
         
-        except Exception as e:
-            messagebox.showerror("Export Failed", str(e))
+        self.exporter.submit(
+            "session report",
+            [("stats", build_report), ("report", write_report), ("history", record_session)],
+            done, self.export_failed
+        )
     
     def export_csv(self):
         """Export CSV data"""
-        if not self.engine or not self.engine.all_delays:
+        engine = self.engine
+        if not engine or not engine.all_delays:
             messagebox.showwarning("No Data", "No clicker data to export!")
             return
         
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"mimic_data_{timestamp}.csv"
-        filepath = os.path.join(Config.get_clicker_data_path(), filename)
-        
-        try:
-            os.makedirs(Config.get_clicker_data_path(), exist_ok=True)
-            self.engine.export_to_csv(filepath)
-            messagebox.showinfo("Export Success", f"CSV saved to:\n{filepath}")
-            print(f"\n[EXPORT] CSV saved to: {filepath}\n")
-        except Exception as e:
-            messagebox.showerror("Export Failed", str(e))
+        folder = Config.get_clicker_data_path()
+        filepath = os.path.join(folder, f"mimic_data_{timestamp}.csv")
+        hist_path = os.path.join(folder, f"mimic_hist_{timestamp}.csv")
+        heatmap_path = os.path.join(folder, f"mimic_heatmap_{timestamp}.npz")
+        latency_path = os.path.join(folder, f"mimic_latency_{timestamp}.json")
+        
+        # The engine's export methods only read engine state, so they can run
+        # on the writer thread while clicking continues. The local reference
+        # keeps this session's engine if the clicker is deactivated meanwhile.
+        def done(results):
+            png_path, trace_path = results[-2:]
+            messagebox.showinfo("Export Success", f"CSV saved to:\n{filepath}\n\nHistograms:\n{hist_path}"
+                                                  f"\n\nHeatmap:\n{heatmap_path}\n{png_path}"
+                                                  f"\n\nLatency:\n{latency_path}\n{trace_path}")
+            print(f"\n[EXPORT] CSV saved to: {filepath}")
+            print(f"[EXPORT] Histograms saved to: {hist_path}")
+            print(f"[EXPORT] Heatmap saved to: {heatmap_path} (+ {os.path.basename(png_path)})")
+            print(f"[EXPORT] Latency saved to: {latency_path} (+ {os.path.basename(trace_path)})\n")
+        
+        self.exporter.submit(
+            "clicker CSV",
+            [("folder", lambda: os.makedirs(folder, exist_ok=True)),
+             ("delays", lambda: engine.export_to_csv(filepath)),
+             ("histograms", lambda: engine.export_histogram_csv(hist_path)),
+             ("heatmap", lambda: engine.export_heatmap(heatmap_path)),
+             ("latency", lambda: engine.export_latency(latency_path))],
+            done, self.export_failed
+        )
+    
+    def export_failed(self, error):
+        """Writer-thread error callback shared by the exports"""
+        if isinstance(error, ExportCancelled):
+            return
+        messagebox.showerror("Export Failed", str(error))
+    
+    def on_export_busy(self, name):
+        """Header indicator while the export writer has work; click cancels"""
+        if name:
+            self.path_indicator.config(text=f"💾 Exporting {name}... (click to cancel)", fg=self.tech_accent,
+                                       cursor="hand2")
+        else:
+            self.path_indicator.config(text=self.path_indicator_text, fg="#666666", cursor="")
+    
+    def cancel_exports(self, event=None):
+        if self.exporter.cancel_all():
+            print("[EXPORT] Cancelling pending exports")
     
     def export_human_baseline(self):
         """Export human training baseline"""
@@ -2076,7 +2404,7 @@ Outliers: {stats['outlier_count']}
             messagebox.showwarning("No Data", "Record training data first (F7)!")
             return
         
-        self.human_tracker.export_human_stats()
+        self.human_tracker.export_human_stats(self.exporter)
     
     def toggle_mini_mode(self):
         """Toggle mini mode (placeholder)"""
@@ -2086,51 +2414,30 @@ Outliers: {stats['outlier_count']}
         """Start background threads"""
         self.running = True
         
-        threading.Thread(target=self.mouse_button_listener, daemon=True).start()
-        threading.Thread(target=self.clicking_loop, daemon=True).start()
-    
-    def mouse_button_listener(self):
-        """Monitor for training mode only - clicking handled by pynput"""
-        while self.running:
-            # Training mode (unchanged)
-            if self.human_tracker.is_tracking:
-                left_state = win32api.GetAsyncKeyState(0x01)
-                if left_state & 0x8000:
-                    self.human_tracker.record_click()
-                    time.sleep(0.05)
-            
-            time.sleep(0.01)
-
+        # Training-mode capture runs on HumanClickTracker's own input source
+        # (hook, or polling if the hook fails); it used to be polled here
+        # unconditionally, on top of the hook, counting presses twice.
+        self.click_loop.start()
+        
+        if Config.METRICS_SERVER_ENABLED:
+            from .metrics import MetricsServer    # http.server only when enabled
+            server = MetricsServer(lambda: self.engine if self.active else None,
+                                   lambda: self.human_tracker,
+                                   Config.METRICS_HOST, Config.METRICS_PORT)
+            try:
+                self.metrics_server = server.start()
+                print(f"[METRICS] Serving on {server.url}")
+            except OSError as e:
+                print(f"[ERROR] Metrics server failed to start: {e}")
     
-    def clicking_loop(self):
-        """Main clicking loop - uses pynput for reliable state tracking"""
-        while self.running:
-            if self.active and self.engine:  # Check self.engine exists
-                # Check the PHYSICAL state (unaffected by synthetic clicks)
-                if self.physical_left_held:
-                    if not self.clicking:
-                        self.clicking = True
-                        print("[MIMIC] Started auto-clicking")
-                        # REMOVED: self.engine.start_clicking() <-- THIS WAS THE 90ms DELAY
-                    
-                    # Send synthetic click - CHECK ENGINE EXISTS
-                    if self.engine:  # Add this check
-                        self.engine.click()
-                
-                else:
-                    if self.clicking:
-                        self.clicking = False
-                        if self.engine:  # Check before calling
-                            self.engine.stop_clicking()
-                        print("[MIMIC] Stopped auto-clicking")
-                    time.sleep(0.01)
-            else:
-                time.sleep(0.01)
-
-
     def on_close(self):
         """Handle window close"""
         self.running = False
+        self.click_loop.stop()
+        self.refresh.stop()
+        self.exporter.stop()
+        if self.metrics_server:
+            self.metrics_server.stop()
         self.mouse_listener.stop()  # ADD THIS LINE - Stop pynput listener
         self.root.destroy()
 
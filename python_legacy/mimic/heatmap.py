@@ -0,0 +1,144 @@
+"""Delay-versus-sequence heatmap kept by the engine (TODO item O).
+
+Part of Mimic. Counts (click number, delay) pairs into a fixed grid of
+delay rows by sequence columns. A column starts out covering one click; when
+the grid fills, neighbouring columns are merged pairwise and each covers
+twice as many, so a session of any length fits the same array and adding a
+click stays O(1) amortized.
+
+Rendering never goes through canvas items: the grid is colour-mapped in
+NumPy, scaled to the plot size by index arrays, and handed to Tk as one PPM
+image, so a 100k-click session costs the same to draw as a 100-click one.
+The counts export to .npz for offline work, and the rendered image to PNG.
+"""
+
+import struct
+import zlib
+
+import numpy as np
+
+
+# Colour stops for log-scaled counts, dark to bright (panel background,
+# the GUI's purple and cyan accents, then white for the densest cells).
+COLORMAP_STOPS = (
+    (0.00, (0x1a, 0x1a, 0x1a)),
+    (0.35, (0x4a, 0x2a, 0xa0)),
+    (0.65, (0x7c, 0x4d, 0xff)),
+    (0.85, (0x00, 0xe5, 0xff)),
+    (1.00, (0xff, 0xff, 0xff)),
+)
+
+
+def colormap_lut(stops=COLORMAP_STOPS, size=256) -> np.ndarray:
+    """(size, 3) uint8 lookup table interpolated between the stops."""
+    pos = np.array([s[0] for s in stops])
+    rgb = np.array([s[1] for s in stops], dtype=float)
+    x = np.linspace(0.0, 1.0, size)
+    return np.stack([np.interp(x, pos, rgb[:, k]) for k in range(3)], axis=1).astype(np.uint8)
+
+
+class DelayHeatmap:
+    """Counts of delay (rows, linear from lo to hi) against click sequence.
+
+    counts[r, c]: row 0 is the lowest delays; delays outside [lo, hi) are
+    clamped into the end rows. Column c covers clicks
+    [c * per_col, (c + 1) * per_col). version changes on every add.
+    """
+
+    LUT = colormap_lut()
+
+    def __init__(self, lo: float, hi: float, rows: int = 100, cols: int = 256):
+        if cols % 2:
+            raise ValueError("cols must be even so columns can be merged pairwise")
+        self.lo = lo
+        self.hi = hi
+        self.rows = rows
+        self.cols = cols
+        self.row_width = (hi - lo) / rows
+        self.counts = np.zeros((rows, cols), dtype=np.int32)
+        self.per_col = 1
+        self.total = 0
+        self.version = 0
+
+    @property
+    def used_cols(self) -> int:
+        return -(-self.total // self.per_col)
+
+    def add(self, delay: float) -> None:
+        col = self.total // self.per_col
+        if col >= self.cols:
+            self._merge()
+            col = self.total // self.per_col
+        row = int((delay - self.lo) / self.row_width)
+        row = 0 if row < 0 else (self.rows - 1 if row >= self.rows else row)
+        self.counts[row, col] += 1
+        self.total += 1
+        self.version += 1
+
+    def _merge(self) -> None:
+        """Halve the sequence resolution: column pairs become one column."""
+        half = self.cols // 2
+        merged = self.counts[:, 0::2] + self.counts[:, 1::2]
+        self.counts[:, :half] = merged
+        self.counts[:, half:] = 0
+        self.per_col *= 2
+
+    def clear(self) -> None:
+        self.counts[:] = 0
+        self.per_col = 1
+        self.total = 0
+        self.version += 1
+
+    def to_rgb(self, width: int, height: int) -> np.ndarray:
+        """(height, width, 3) uint8 image of the occupied columns.
+
+        Counts are log-scaled so sparse outliers stay visible next to the
+        main band, and saturate at the 99th percentile of occupied cells so
+        the clamped end rows don't wash out everything else. Low delays are
+        at the bottom.
+        """
+        used = max(1, self.used_cols)
+        grid = self.counts[:, :used]
+        occupied = grid[grid > 0]
+        if occupied.size:
+            peak = max(1.0, float(np.percentile(occupied, 99)))
+            level = np.minimum(np.log1p(grid) / np.log1p(peak), 1.0) * (len(self.LUT) - 1)
+        else:
+            level = np.zeros(grid.shape)
+        rgb = self.LUT[level.astype(np.intp)]
+        ri = (self.rows - 1) - (np.arange(height) * self.rows // height)
+        ci = np.arange(width) * used // width
+        return rgb[ri[:, None], ci[None, :]]
+
+    def export(self, filepath: str) -> None:
+        """Save the counts and their axes as .npz."""
+        np.savez_compressed(
+            filepath,
+            counts=self.counts[:, :self.used_cols],
+            delay_edges=self.lo + self.row_width * np.arange(self.rows + 1),
+            clicks_per_col=self.per_col,
+            total=self.total,
+        )
+
+
+def to_ppm(rgb: np.ndarray) -> bytes:
+    """Binary PPM (P6) for tk.PhotoImage(data=...)."""
+    h, w, _ = rgb.shape
+    return b"P6 %d %d 255\n" % (w, h) + np.ascontiguousarray(rgb, dtype=np.uint8).tobytes()
+
+
+def save_png(filepath: str, rgb: np.ndarray) -> None:
+    """Write an RGB array as a PNG, without an imaging library."""
+    h, w, _ = rgb.shape
+    raw = np.zeros((h, w * 3 + 1), dtype=np.uint8)    # filter byte 0 per row
+    raw[:, 1:] = rgb.reshape(h, w * 3)
+
+    def chunk(tag, data):
+        return (struct.pack(">I", len(data)) + tag + data
+                + struct.pack(">I", zlib.crc32(tag + data) & 0xffffffff))
+
+    with open(filepath, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8, 2, 0, 0, 0)))
+        f.write(chunk(b"IDAT", zlib.compress(raw.tobytes(), 6)))
+        f.write(chunk(b"IEND", b""))
@@ -0,0 +1,174 @@
+"""Incremental delay histograms kept by the engine.
+
+Part of Mimic. The Graphs page used to re-bin every retained delay in Python
+on each refresh. The engine now files each interval into fixed bins as it is
+emitted -- an O(1) index computation, no search -- and takes it back out when
+it falls off the end of the retained window, so reading a histogram costs
+the number of bins, whatever the number of clicks.
+
+Two layouts are kept: uniform bins for the body of the distribution, and
+log-spaced bins that keep resolution in the right tail, where a linear
+layout lumps every long pause into a handful of bins.
+"""
+
+import math
+import bisect
+
+
+class IncrementalHistogram:
+    """Counts over fixed bins, plus one underflow and one overflow bin.
+
+    counts[0] is below edges[0], counts[-1] at or above edges[-1]; counts[i]
+    for 1 <= i <= bins covers [edges[i-1], edges[i]). version changes on
+    every add/remove, so readers can skip redrawing an unchanged histogram.
+    """
+
+    def __init__(self, edges):
+        self.edges = list(edges)
+        self.bins = len(self.edges) - 1
+        self.counts = [0] * (self.bins + 2)
+        self.total = 0
+        self.version = 0
+
+    def index(self, x: float) -> int:
+        """Slot in counts for x: a binary search over arbitrary edges.
+
+        The uniform and log layouts below replace it with O(1) arithmetic.
+        """
+        return bisect.bisect_right(self.edges, x)
+
+    def add(self, x: float) -> None:
+        self.counts[self.index(x)] += 1
+        self.total += 1
+        self.version += 1
+
+    def remove(self, x: float) -> None:
+        self.counts[self.index(x)] -= 1
+        self.total -= 1
+        self.version += 1
+
+    def clear(self) -> None:
+        self.counts = [0] * (self.bins + 2)
+        self.total = 0
+        self.version += 1
+
+    def occupied(self):
+        """(first, last) in-range bin numbers holding counts, or None."""
+        body = self.counts[1:-1]
+        first = next((i for i, c in enumerate(body) if c), None)
+        if first is None:
+            return None
+        last = len(body) - 1 - next(i for i, c in enumerate(reversed(body)) if c)
+        return first, last
+
+    def quantile(self, q: float) -> float:
+        """Approximate quantile, interpolated within the bin it falls in."""
+        if not self.total:
+            return 0.0
+        target = q * self.total
+        seen = self.counts[0]
+        if target <= seen:
+            return self.edges[0]
+        for i in range(self.bins):
+            c = self.counts[i + 1]
+            if seen + c >= target and c:
+                lo, hi = self.edges[i], self.edges[i + 1]
+                return lo + (hi - lo) * (target - seen) / c
+            seen += c
+        return self.edges[-1]
+
+    def rebin(self, max_bars: int):
+        """Merge the occupied range into at most max_bars display bars.
+
+        Returns (edges, counts) covering only bins that hold data -- the
+        shape HistogramCanvas draws. Out-of-range counts are folded into the
+        end bars so nothing disappears from the picture.
+        """
+        span = self.occupied()
+        if span is None:
+            return [], []
+        first, last = span
+        group = max(1, -(-(last - first + 1) // max_bars))
+        edges, counts = [], []
+        for start in range(first, last + 1, group):
+            stop = min(start + group, last + 1)
+            edges.append(self.edges[start])
+            counts.append(sum(self.counts[start + 1:stop + 1]))
+        edges.append(self.edges[min(first + len(counts) * group, self.bins)])
+        counts[0] += self.counts[0]
+        counts[-1] += self.counts[-1]
+        return edges, counts
+
+    def to_rows(self):
+        """(lo, hi, count) per bin, under/overflow included with open ends."""
+        rows = [(None, self.edges[0], self.counts[0])]
+        rows += [(self.edges[i], self.edges[i + 1], self.counts[i + 1])
+                 for i in range(self.bins)]
+        rows.append((self.edges[-1], None, self.counts[-1]))
+        return rows
+
+
+class LinearHistogram(IncrementalHistogram):
+    """Uniform bins of width ms from lo to hi."""
+
+    def __init__(self, lo: float, hi: float, width: float):
+        n = int(math.ceil((hi - lo) / width))
+        super().__init__([lo + i * width for i in range(n + 1)])
+        self.lo = lo
+        self.width = width
+
+    def index(self, x: float) -> int:
+        i = int(math.floor((x - self.lo) / self.width))
+        return 0 if i < 0 else (self.bins + 1 if i >= self.bins else i + 1)
+
+
+class LogHistogram(IncrementalHistogram):
+    """Log-spaced bins, per_decade to each factor of ten, from lo to hi."""
+
+    def __init__(self, lo: float, hi: float, per_decade: int):
+        n = int(math.ceil(math.log10(hi / lo) * per_decade))
+        super().__init__([lo * 10 ** (i / per_decade) for i in range(n + 1)])
+        self.log_lo = math.log10(lo)
+        self.per_decade = per_decade
+
+    def index(self, x: float) -> int:
+        if x <= 0:
+            return 0
+        i = int(math.floor((math.log10(x) - self.log_lo) * self.per_decade))
+        return 0 if i < 0 else (self.bins + 1 if i >= self.bins else i + 1)
+
+
+class DelayHistograms:
+    """Session-wide and sliding-window histograms, both layouts.
+
+    The window mirrors the engine's retained delay buffer: the caller
+    passes the value the buffer evicts, and it is decremented here. A
+    running sum gives the window mean in O(1) as well.
+    """
+
+    def __init__(self, lo, hi, width, log_lo, log_hi, per_decade):
+        self.session = LinearHistogram(lo, hi, width)
+        self.session_log = LogHistogram(log_lo, log_hi, per_decade)
+        self.window = LinearHistogram(lo, hi, width)
+        self.window_log = LogHistogram(log_lo, log_hi, per_decade)
+        self.window_sum = 0.0
+
+    def add(self, x: float, evicted: float = None) -> None:
+        self.session.add(x)
+        self.session_log.add(x)
+        if evicted is not None:
+            self.window.remove(evicted)
+            self.window_log.remove(evicted)
+            self.window_sum -= evicted
+        self.window.add(x)
+        self.window_log.add(x)
+        self.window_sum += x
+
+    def window_mean(self) -> float:
+        n = self.window.total
+        return self.window_sum / n if n else 0.0
+
+    def clear(self) -> None:
+        for h in (self.session, self.session_log, self.window, self.window_log):
+            h.clear()
+        self.window_sum = 0.0
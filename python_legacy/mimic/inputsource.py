@@ -0,0 +1,300 @@
+"""Pluggable mouse input sources for click capture.
+
+Part of Mimic. HumanClickTracker and the benchmark's ClickTrackerGUI used to
+talk to live Windows input directly, so capture could only be exercised by
+a human clicking on a Windows box. They now take an InputSource instead:
+
+    Win32HookSource   WH_MOUSE_LL low-level hook (training mode)
+    Win32PollSource   GetAsyncKeyState polling, fallback if the hook fails
+    PynputSource      pynput mouse listener (benchmark)
+    ReplaySource      a recorded click_data/ CSV or a synthetic stream,
+                      replayed at 1x, Nx or unthrottled speed
+
+Every source calls on_press(t, button) and on_release(t, button) from its
+own thread, with t taken from the source's clock, so a replay drives exactly
+the same recording code as a live mouse. A callback returning False stops
+the source (pynput's convention).
+"""
+
+import csv
+import math
+import random
+import threading
+import time
+
+
+class InputSource:
+    """Base class. Subclasses deliver events by calling _press/_release."""
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.on_press = None
+        self.on_release = None
+        self.running = False
+        self.started_at = None
+
+    def now(self):
+        """Current time on the clock this source stamps events with."""
+        return self.clock()
+
+    def start(self, on_press, on_release=None):
+        self.on_press = on_press
+        self.on_release = on_release
+        self.running = True
+        # Stamped before any event can fire, so it is a safe session start.
+        self.started_at = self.clock()
+        self._start()
+        return self
+
+    def stop(self):
+        self.running = False
+        self._stop()
+
+    def join(self, timeout=None):
+        """Wait for the source to run out of events. Live sources never do."""
+        return not self.running
+
+    def _start(self):
+        pass
+
+    def _stop(self):
+        pass
+
+    def _press(self, t, button="left"):
+        if self.running and self.on_press and self.on_press(t, button) is False:
+            self.stop()
+
+    def _release(self, t, button="left"):
+        if self.running and self.on_release and self.on_release(t, button) is False:
+            self.stop()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# LIVE SOURCES
+# ─────────────────────────────────────────────────────────────────────────────
+
+class Win32HookSource(InputSource):
+    """Low-level mouse hook. Install from a thread that pumps messages (Tk's)."""
+
+    WH_MOUSE_LL = 14
+    BUTTONS = {0x0201: ("left", True), 0x0202: ("left", False),
+               0x0204: ("right", True), 0x0205: ("right", False)}
+
+    def __init__(self, clock=time.perf_counter):
+        super().__init__(clock)
+        self.hook_id = None
+        self.hook_callback = None
+
+    @property
+    def installed(self):
+        return bool(self.hook_id)
+
+    def _start(self):
+        import ctypes
+        from ctypes import wintypes
+
+        HOOKPROC = ctypes.WINFUNCTYPE(ctypes.c_int, ctypes.c_int, wintypes.WPARAM, wintypes.LPARAM)
+
+        def mouse_hook_proc(nCode, wParam, lParam):
+            if nCode >= 0 and self.running and wParam in self.BUTTONS:
+                button, pressed = self.BUTTONS[wParam]
+                if pressed:
+                    self._press(self.clock(), button)
+                else:
+                    self._release(self.clock(), button)
+
+            return ctypes.windll.user32.CallNextHookEx(self.hook_id, nCode, wParam, lParam)
+
+        self.hook_callback = HOOKPROC(mouse_hook_proc)
+
+        self.hook_id = ctypes.windll.user32.SetWindowsHookExA(
+            self.WH_MOUSE_LL,
+            self.hook_callback,
+            ctypes.windll.kernel32.GetModuleHandleW(None),
+            0
+        )
+
+        if not self.hook_id:
+            print("[WARNING] Failed to install mouse hook - falling back to manual tracking")
+
+    def _stop(self):
+        if self.hook_id:
+            import ctypes
+            ctypes.windll.user32.UnhookWindowsHookEx(self.hook_id)
+            self.hook_id = None
+            self.hook_callback = None
+
+
+class Win32PollSource(InputSource):
+    """GetAsyncKeyState polling. Coarse (10ms), but needs no hook."""
+
+    def __init__(self, clock=time.perf_counter, interval=0.01):
+        super().__init__(clock)
+        self.interval = interval
+        self._thread = None
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._poll, daemon=True)
+        self._thread.start()
+
+    def _poll(self):
+        import win32api
+        held = False
+        while self.running:
+            down = bool(win32api.GetAsyncKeyState(0x01) & 0x8000)
+            if down != held:
+                held = down
+                (self._press if down else self._release)(self.clock(), "left")
+            time.sleep(self.interval)
+
+
+class PynputSource(InputSource):
+    """pynput mouse listener."""
+
+    def __init__(self, clock=time.time):
+        super().__init__(clock)
+        self.listener = None
+
+    def _start(self):
+        from pynput import mouse
+
+        def on_click(x, y, button, pressed):
+            name = str(button).split('.')[-1]
+            if pressed:
+                self._press(self.clock(), name)
+            else:
+                self._release(self.clock(), name)
+            if not self.running:
+                return False
+
+        self.listener = mouse.Listener(on_click=on_click)
+        self.listener.start()
+
+    def _stop(self):
+        if self.listener:
+            self.listener.stop()
+            self.listener = None
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# REPLAY
+# ─────────────────────────────────────────────────────────────────────────────
+
+class ReplaySource(InputSource):
+    """Feeds a recorded or synthetic click stream through the capture path.
+
+    presses: list of (offset_s, hold_s, button), offsets from the first press.
+    speed:   1.0 = real time, N = N times faster, None = as fast as possible.
+
+    Event times are start-of-replay plus the recorded offset, whatever the
+    speed, so an unthrottled replay produces the same intervals, holds and
+    CPS as the recording -- only the wall-clock cost changes. now() follows
+    the same virtual timeline.
+    """
+
+    def __init__(self, presses, speed=1.0, clock=time.perf_counter):
+        super().__init__(clock)
+        if speed is not None and speed <= 0:
+            raise ValueError("speed must be positive, or None for unthrottled")
+        self.speed = speed
+        self.presses = sorted(presses)
+        events = []
+        for offset, hold, button in self.presses:
+            events.append((offset, 0, button))
+            if hold > 0:
+                events.append((offset + hold, 1, button))
+        # Releases sort after a press at the same instant on the 0/1 key.
+        self.events = sorted(events)
+        self.events_sent = 0
+        self._t0 = 0.0
+        self._wall0 = 0.0
+        self._virtual = 0.0
+        self._done = threading.Event()
+        self._thread = None
+
+    @property
+    def duration(self):
+        return self.events[-1][0] if self.events else 0.0
+
+    def now(self):
+        if self.speed is None or self._done.is_set():
+            return self._t0 + self._virtual
+        return self._t0 + min(self.duration, (self.clock() - self._wall0) * self.speed)
+
+    def _start(self):
+        self._done.clear()
+        self.events_sent = 0
+        self._t0 = self._wall0 = self.started_at
+        self._virtual = 0.0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            for offset, kind, button in self.events:
+                if not self.running:
+                    break
+                if self.speed is not None:
+                    wait = self._wall0 + offset / self.speed - self.clock()
+                    if wait > 0:
+                        time.sleep(wait)
+                self._virtual = offset
+                if kind == 0:
+                    self._press(self._t0 + offset, button)
+                else:
+                    self._release(self._t0 + offset, button)
+                self.events_sent += 1
+        finally:
+            self.running = False
+            self._done.set()
+
+    def join(self, timeout=None):
+        return self._done.wait(timeout)
+
+    @classmethod
+    def from_csv(cls, filename, speed=1.0, **kwargs):
+        """Replay a click_data/ CSV, or a training CSV from HumanClickTracker.
+
+        click_data/ rows carry an absolute timestamp and (newer ones) hold_ms;
+        training exports only have Delay_MS, so presses are rebuilt from the
+        running sum of delays and carry no hold.
+        """
+        presses = []
+        with open(filename, 'r', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            fields = reader.fieldnames or []
+            if 'timestamp' in fields:
+                t0 = None
+                for row in reader:
+                    t = float(row['timestamp'])
+                    t0 = t if t0 is None else t0
+                    hold = float(row.get('hold_ms') or 0.0) / 1000.0
+                    presses.append((t - t0, hold, str(row.get('button') or 'left').lower()))
+            elif 'Delay_MS' in fields:
+                t = 0.0
+                presses.append((0.0, 0.0, 'left'))
+                for row in reader:
+                    t += float(row['Delay_MS']) / 1000.0
+                    presses.append((t, 0.0, 'left'))
+            else:
+                raise ValueError(f"{filename}: no timestamp or Delay_MS column")
+        return cls(presses, speed=speed, **kwargs)
+
+    @classmethod
+    def synthetic(cls, n_clicks, cps=10.0, cv=0.3, hold_ms=26.0, hold_sd_ms=8.0,
+                  speed=None, seed=None, **kwargs):
+        """A log-normal interval stream with gaussian holds, for load tests.
+
+        Holds are clipped to 90% of the following interval so a press is
+        always released before the next one, as on a real mouse.
+        """
+        rng = random.Random(seed)
+        sigma = math.sqrt(math.log(1.0 + cv * cv))
+        mu = math.log(1.0 / cps) - sigma * sigma / 2.0
+        presses, t = [], 0.0
+        for _ in range(n_clicks):
+            gap = rng.lognormvariate(mu, sigma)
+            hold = max(0.001, rng.gauss(hold_ms, hold_sd_ms) / 1000.0)
+            presses.append((t, min(hold, 0.9 * gap), 'left'))
+            t += gap
+        return cls(presses, speed=speed, **kwargs)
@@ -0,0 +1,285 @@
+"""Per-stage latency of the click path.
+
+Part of Mimic. When a click period comes out long there was no way to tell
+which step stretched it -- the CPS check, the delay draw, the hold draw, a
+mouse_event call, a sleep that overshot, or the CPS bookkeeping. The engine
+now times each stage of click() with perf_counter_ns and files the result in
+a fixed-bucket histogram per stage, HDR style: 32 sub-buckets per power of
+two, so every value from 1ns to ~68s lands within 3% of its true size in one
+1024-slot list, and recording is a few integer operations.
+
+Sleep stages record their overshoot past the requested duration, not the
+duration itself. Each click also checks its deadline -- period start plus
+the drawn delay -- and counts a miss when it ends later than the slack
+allows. The last few thousand clicks keep their stage spans for a Chrome
+trace (chrome://tracing, Perfetto) of any window of them.
+
+All of this costs under 10us per click, a few thousandths of a percent of
+the interval (benchmarks/clickpath.py).
+"""
+
+import json
+import time
+from collections import deque
+
+SUB_BITS = 5                       # 32 sub-buckets per octave
+SUB = 1 << SUB_BITS
+MAX_NS = (1 << 36) - 1             # ~68.7s; longer values clamp here
+
+
+def bucket_index(ns: int) -> int:
+    """Bucket holding a non-negative nanosecond value.
+
+    Below 2*SUB every value has its own bucket. Above, a value keeps its top
+    SUB_BITS + 1 bits (the mantissa, SUB..2*SUB-1) and the number of bits
+    dropped selects the octave.
+    """
+    if ns < 2 * SUB:
+        return ns
+    if ns > MAX_NS:
+        ns = MAX_NS
+    shift = ns.bit_length() - SUB_BITS - 1
+    return (shift << SUB_BITS) + (ns >> shift)
+
+
+def bucket_bounds(i: int):
+    """(lo, hi) nanoseconds covered by bucket i, hi exclusive."""
+    if i < 2 * SUB:
+        return i, i + 1
+    shift = (i >> SUB_BITS) - 1
+    mantissa = (i & (SUB - 1)) + SUB
+    return mantissa << shift, (mantissa + 1) << shift
+
+
+BUCKETS = bucket_index(MAX_NS) + 1
+
+
+class LatencyHistogram:
+    """Fixed-bucket log-linear histogram of nanosecond latencies."""
+
+    __slots__ = ("counts", "count", "total_ns", "min_ns", "max_ns")
+
+    def __init__(self):
+        self.counts = [0] * BUCKETS
+        self.count = 0
+        self.total_ns = 0
+        self.min_ns = 0
+        self.max_ns = 0
+
+    def record(self, ns: int) -> None:
+        if ns < 0:
+            ns = 0
+        self.counts[bucket_index(ns)] += 1
+        if not self.count or ns < self.min_ns:
+            self.min_ns = ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+        self.count += 1
+        self.total_ns += ns
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        for i, c in enumerate(other.counts):
+            if c:
+                self.counts[i] += c
+        if other.count:
+            self.min_ns = other.min_ns if not self.count else min(self.min_ns, other.min_ns)
+            self.max_ns = max(self.max_ns, other.max_ns)
+        self.count += other.count
+        self.total_ns += other.total_ns
+
+    def clear(self) -> None:
+        self.counts = [0] * BUCKETS
+        self.count = 0
+        self.total_ns = 0
+        self.min_ns = 0
+        self.max_ns = 0
+
+    @property
+    def mean_ns(self) -> float:
+        return self.total_ns / self.count if self.count else 0.0
+
+    def quantiles(self, qs) -> list:
+        """Values at ascending quantiles qs in ns, in one pass over the buckets.
+
+        Each is the containing bucket's midpoint, clamped to the observed
+        min and max.
+        """
+        if not self.count:
+            return [0.0] * len(qs)
+        out = []
+        k = 0
+        seen = 0
+        for i, c in enumerate(self.counts):
+            if not c:
+                continue
+            seen += c
+            while k < len(qs) and seen >= qs[k] * self.count:
+                lo, hi = bucket_bounds(i)
+                out.append(float(min(max((lo + hi - 1) / 2.0, self.min_ns), self.max_ns)))
+                k += 1
+            if k == len(qs):
+                break
+        return out + [float(self.max_ns)] * (len(qs) - k)
+
+    def quantile(self, q: float) -> float:
+        return self.quantiles((q,))[0]
+
+    def to_dict(self) -> dict:
+        """Summary in microseconds plus the non-empty buckets in ns."""
+        us = 1e-3
+        p50, p90, p99, p999 = self.quantiles((0.50, 0.90, 0.99, 0.999))
+        return {
+            "count": self.count,
+            "mean_us": round(self.mean_ns * us, 3),
+            "min_us": round(self.min_ns * us, 3),
+            "p50_us": round(p50 * us, 3),
+            "p90_us": round(p90 * us, 3),
+            "p99_us": round(p99 * us, 3),
+            "p999_us": round(p999 * us, 3),
+            "max_us": round(self.max_ns * us, 3),
+            "buckets_ns": [[*bucket_bounds(i), c] for i, c in enumerate(self.counts) if c],
+        }
+
+
+class ClickProfiler:
+    """Stage timer threaded through AdaptiveClickerEngine.click().
+
+    click() calls begin(), then lap() after each compute stage and slept()
+    after each sleep, passing back the timestamp the previous call returned,
+    and finally end_click(). Stages appear in first-seen order.
+
+    deadline_slack_ms: lateness tolerated before a click counts as a miss.
+    trace_clicks:      clicks whose stage spans are kept for Chrome traces
+                       (0 disables tracing).
+    """
+
+    def __init__(self, deadline_slack_ms: float = 1.0, trace_clicks: int = 2000):
+        self.deadline_slack_ns = int(deadline_slack_ms * 1e6)
+        self.stages = {}
+        self.sleep_stages = set()              # stages recorded by slept()
+        self.work = LatencyHistogram()         # non-sleep time per click
+        self.lateness = LatencyHistogram()     # end of click past its deadline
+        self.clicks = 0
+        self.deadline_misses = 0
+        self.trace = deque(maxlen=trace_clicks) if trace_clicks else None
+        self._spans = []
+        self._work = 0
+        self._click_t0 = 0
+
+    def _hist(self, stage, sleep=False):
+        h = self.stages.get(stage)
+        if h is None:
+            h = self.stages[stage] = LatencyHistogram()
+            if sleep:
+                self.sleep_stages.add(stage)
+        return h
+
+    def begin(self) -> int:
+        t = time.perf_counter_ns()
+        self._click_t0 = t
+        self._work = 0
+        if self.trace is not None:
+            self._spans = []
+        return t
+
+    def lap(self, stage: str, t0: int) -> int:
+        """A compute stage that started at t0 just ended."""
+        t = time.perf_counter_ns()
+        d = t - t0
+        self._hist(stage).record(d)
+        self._work += d
+        if self.trace is not None:
+            self._spans.append((stage, t0, t))
+        return t
+
+    def slept(self, stage: str, t0: int, requested_s: float) -> int:
+        """A sleep of requested_s that started at t0 just ended; records overshoot."""
+        t = time.perf_counter_ns()
+        self._hist(stage, True).record(t - t0 - int(requested_s * 1e9))
+        if self.trace is not None:
+            self._spans.append((stage, t0, t))
+        return t
+
+    def end_click(self, period_start: int, delay_ms: float, t: int) -> None:
+        """Close the click. Its deadline is period_start + delay_ms."""
+        late = t - period_start - int(delay_ms * 1e6)
+        self.lateness.record(late)
+        self.work.record(self._work)
+        self.clicks += 1
+        if late > self.deadline_slack_ns:
+            self.deadline_misses += 1
+        if self.trace is not None:
+            self.trace.append((self.clicks, self._click_t0, t, delay_ms, late, self._spans))
+
+    def clear(self) -> None:
+        self.stages = {}
+        self.sleep_stages = set()
+        self.work.clear()
+        self.lateness.clear()
+        self.clicks = 0
+        self.deadline_misses = 0
+        if self.trace is not None:
+            self.trace.clear()
+
+    # ── reporting ────────────────────────────────────────────────────────
+
+    def summary_rows(self):
+        """[(stage, count, p50_us, p99_us, max_us)] for display, click-path order."""
+        rows = []
+        for name, h in list(self.stages.items()) + [("work/click", self.work),
+                                                     ("lateness", self.lateness)]:
+            if h.count:
+                p50, p99 = h.quantiles((0.50, 0.99))
+                rows.append((name, h.count, p50 / 1e3, p99 / 1e3, h.max_ns / 1e3))
+        return rows
+
+    def snapshot(self) -> dict:
+        return {
+            "clicks": self.clicks,
+            "deadline_misses": self.deadline_misses,
+            "miss_rate": self.deadline_misses / self.clicks if self.clicks else 0.0,
+            "deadline_slack_ms": self.deadline_slack_ns / 1e6,
+            "sleep_stages_record": "overshoot",
+            "work_per_click": self.work.to_dict(),
+            "lateness": self.lateness.to_dict(),
+            "stages": {name: h.to_dict() for name, h in list(self.stages.items())},
+        }
+
+    def export_json(self, filepath: str) -> None:
+        with open(filepath, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+    def trace_events(self, first: int = None, last: int = None) -> list:
+        """Chrome trace events for retained clicks numbered first..last (inclusive).
+
+        One complete ("X") event per click on thread 1 and one per stage on
+        thread 2, with timestamps in microseconds from the first click shown.
+        """
+        clicks = [c for c in list(self.trace or ())
+                  if (first is None or c[0] >= first) and (last is None or c[0] <= last)]
+        if not clicks:
+            return []
+        origin = clicks[0][1]
+        us = lambda ns: (ns - origin) / 1e3
+        events = [
+            {"name": "thread_name", "ph": "M", "pid": 1, "tid": 1, "args": {"name": "clicks"}},
+            {"name": "thread_name", "ph": "M", "pid": 1, "tid": 2, "args": {"name": "stages"}},
+        ]
+        for n, t0, t1, delay_ms, late, spans in clicks:
+            events.append({
+                "name": f"click {n}", "cat": "click", "ph": "X", "pid": 1, "tid": 1,
+                "ts": us(t0), "dur": (t1 - t0) / 1e3,
+                "args": {"delay_ms": round(delay_ms, 3), "late_us": round(late / 1e3, 1),
+                         "missed": late > self.deadline_slack_ns},
+            })
+            for stage, s0, s1 in spans:
+                events.append({"name": stage, "cat": "stage", "ph": "X", "pid": 1, "tid": 2,
+                               "ts": us(s0), "dur": (s1 - s0) / 1e3})
+        return events
+
+    def export_chrome_trace(self, filepath: str, first: int = None, last: int = None) -> int:
+        """Write retained clicks first..last as a Chrome trace. Returns clicks written."""
+        events = self.trace_events(first, last)
+        with open(filepath, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return sum(1 for e in events if e.get("cat") == "click")
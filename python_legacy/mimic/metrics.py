@@ -0,0 +1,288 @@
+"""Localhost metrics endpoint for the engine and training capture.
+
+Part of Mimic. The Tk window was the only way to watch a running session,
+and redrawing it is itself a load on the machine doing the clicking. With
+Config.METRICS_SERVER_ENABLED the GUI also starts a small HTTP server on its
+own thread, bound to loopback only, serving:
+
+    /metrics        Prometheus text exposition format
+    /metrics.json   the same snapshot as JSON
+
+Counters (clicks, doubles, pauses, outliers), current and measured CPS, the
+Welford delay moments, per-stage click latency and sleep overshoot from the
+engine's ClickProfiler (mimic.latency), and the training capture's counts.
+A scrape reads plain attributes and the profiler's histograms; it never
+takes a lock the click thread waits on.
+
+Requests are answered by MetricsServer.handle(method, path), which needs no
+socket, so a stand-in client can exercise every route directly.
+"""
+
+import bisect
+import json
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from .engine import STATE_NAMES
+
+LOOPBACK_HOSTS = ("127.0.0.1", "localhost")
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+def _latency_summary(hist) -> dict:
+    """A LatencyHistogram as count / sum / quantiles / max, in seconds."""
+    qs = hist.quantiles(QUANTILES)
+    return {
+        "count": hist.count,
+        "sum_s": hist.total_ns / 1e9,
+        "quantiles_s": {str(q): v / 1e9 for q, v in zip(QUANTILES, qs)},
+        "max_s": hist.max_ns / 1e9,
+    }
+
+
+def engine_metrics(engine) -> dict:
+    """Counters and gauges from an AdaptiveClickerEngine."""
+    return {
+        "preset": engine.preset_name,
+        "enhanced_mode": engine.enhanced_mode,
+        "clicking": engine.is_actively_clicking,
+        "state": STATE_NAMES[engine._idx],
+        "clicks": engine.total_clicks,
+        "delays": engine._n,
+        "doubles": engine.double_count,
+        "pauses": engine.pause_count,
+        "outliers": engine.outlier_count,
+        "bursts": engine.burst_count,
+        "pattern_breaks": engine.pattern_breaks,
+        "cps": engine.get_current_cps(),
+        "measured_cps": engine.get_measured_cps(),
+        "delay_mean_ms": engine._mean,
+        "delay_variance_ms2": engine.calculate_overall_variance(),
+        "delay_std_ms": engine.calculate_std_dev(),
+    }
+
+
+def latency_metrics(profiler) -> dict:
+    """Per-stage latency, sleep overshoot and deadline misses from a ClickProfiler."""
+    stages = list(profiler.stages.items())
+    sleeps = profiler.sleep_stages
+    return {
+        "clicks": profiler.clicks,
+        "deadline_misses": profiler.deadline_misses,
+        "deadline_slack_s": profiler.deadline_slack_ns / 1e9,
+        "work": _latency_summary(profiler.work),
+        "lateness": _latency_summary(profiler.lateness),
+        "stages": {n: _latency_summary(h) for n, h in stages if n not in sleeps},
+        "sleep_overshoot": {n: _latency_summary(h) for n, h in stages if n in sleeps},
+    }
+
+
+def capture_metrics(tracker) -> dict:
+    """Training-capture counts from a HumanClickTracker."""
+    times = tracker.click_times
+    cps = 0.0
+    if len(times) >= 2:
+        last = times[-1]
+        cps = float(len(times) - bisect.bisect_left(times, last - 1.0))
+    return {
+        "active": tracker.is_tracking,
+        "training_type": tracker.training_type,
+        "clicks": tracker.total_clicks,
+        "intervals": len(tracker.click_delays),
+        "cps": cps,
+        "elapsed_s": tracker.elapsed(),
+    }
+
+
+def collect(engine=None, tracker=None) -> dict:
+    """One snapshot of everything; sections are None when their source is absent."""
+    return {
+        "time": time.time(),
+        "engine": engine_metrics(engine) if engine else None,
+        "latency": latency_metrics(engine.profiler) if engine else None,
+        "capture": capture_metrics(tracker) if tracker else None,
+    }
+
+
+# ── Prometheus text format ─────────────────────────────────────────────────
+
+def _fmt(value) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, float) and not math.isfinite(value):
+        return "NaN" if math.isnan(value) else ("+Inf" if value > 0 else "-Inf")
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    esc = lambda v: str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in labels.items()) + "}"
+
+
+class _Exposition:
+    def __init__(self):
+        self.lines = []
+
+    def metric(self, name, kind, help_text, samples):
+        """samples: [(labels dict, value)] or a bare value."""
+        if not isinstance(samples, list):
+            samples = [({}, samples)]
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            self.lines.append(f"{name}{_labels(labels)} {_fmt(value)}")
+
+    def summary(self, name, help_text, summaries, label):
+        """summaries: {label value: _latency_summary dict}."""
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} summary")
+        for key, s in summaries.items():
+            base = {label: key} if label else {}
+            for q, v in s["quantiles_s"].items():
+                self.lines.append(f"{name}{_labels({**base, 'quantile': q})} {_fmt(v)}")
+            self.lines.append(f"{name}_sum{_labels(base)} {_fmt(s['sum_s'])}")
+            self.lines.append(f"{name}_count{_labels(base)} {s['count']}")
+
+    def text(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+def to_prometheus(snapshot: dict) -> str:
+    out = _Exposition()
+    eng = snapshot["engine"]
+    out.metric("mimic_engine_active", "gauge", "1 while a clicker engine is armed.", eng is not None)
+    if eng:
+        info = {"preset": eng["preset"], "enhanced": str(eng["enhanced_mode"]).lower()}
+        out.metric("mimic_engine_info", "gauge", "Preset and mode of the armed engine.", [(info, 1)])
+        out.metric("mimic_engine_clicking", "gauge", "1 while the button is held and clicks are sent.",
+                   eng["clicking"])
+        out.metric("mimic_engine_state", "gauge", "Current Markov technique state.",
+                   [({"state": eng["state"]}, 1)])
+        for key, help_text in (("clicks", "Synthetic presses sent, doubles included."),
+                               ("delays", "Intervals drawn."),
+                               ("doubles", "Emulated hardware doubles."),
+                               ("pauses", "Injected long-tail pauses."),
+                               ("outliers", "Delays beyond 2.5 sigma of the current state."),
+                               ("bursts", "Entries into the fastest state."),
+                               ("pattern_breaks", "Markov state changes.")):
+            out.metric(f"mimic_{key}_total", "counter", help_text, eng[key])
+        out.metric("mimic_cps", "gauge", "CPS by source: the modelled period or wall-clock presses.",
+                   [({"source": "model"}, eng["cps"]), ({"source": "measured"}, eng["measured_cps"])])
+        out.metric("mimic_delay_mean_ms", "gauge", "Whole-session mean delay (Welford).", eng["delay_mean_ms"])
+        out.metric("mimic_delay_variance_ms2", "gauge", "Whole-session delay variance (Welford).",
+                   eng["delay_variance_ms2"])
+        out.metric("mimic_delay_stddev_ms", "gauge", "Whole-session delay standard deviation.",
+                   eng["delay_std_ms"])
+
+    lat = snapshot["latency"]
+    if lat:
+        out.metric("mimic_profiled_clicks_total", "counter", "Clicks timed by the click-path profiler.",
+                   lat["clicks"])
+        out.metric("mimic_deadline_misses_total", "counter",
+                   "Clicks that ended later than their drawn period plus slack.", lat["deadline_misses"])
+        out.metric("mimic_deadline_slack_seconds", "gauge", "Lateness tolerated before a miss.",
+                   lat["deadline_slack_s"])
+        out.summary("mimic_stage_latency_seconds", "Time spent in each compute stage of click().",
+                    lat["stages"], "stage")
+        out.summary("mimic_sleep_overshoot_seconds", "How far each sleep in click() ran past its request.",
+                    lat["sleep_overshoot"], "stage")
+        out.summary("mimic_click_work_seconds", "Non-sleep time per click.", {"": lat["work"]}, None)
+        out.summary("mimic_click_lateness_seconds", "How late each click ended past its deadline.",
+                    {"": lat["lateness"]}, None)
+
+    cap = snapshot["capture"]
+    if cap:
+        out.metric("mimic_capture_active", "gauge", "1 while training capture is recording.", cap["active"])
+        out.metric("mimic_capture_clicks_total", "counter", "Presses recorded by training capture.",
+                   cap["clicks"])
+        out.metric("mimic_capture_intervals_total", "counter", "Intervals kept by training capture.",
+                   cap["intervals"])
+        out.metric("mimic_capture_cps", "gauge", "Presses in the second before the last one.", cap["cps"])
+        out.metric("mimic_capture_elapsed_seconds", "gauge", "Length of the capture session.",
+                   cap["elapsed_s"])
+    return out.text()
+
+
+# ── server ─────────────────────────────────────────────────────────────────
+
+class _Handler(BaseHTTPRequestHandler):
+    def _respond(self, body_wanted):
+        status, content_type, body = self.server.metrics.handle(self.command, self.path)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body_wanted:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        self._respond(True)
+
+    def do_HEAD(self):
+        self._respond(False)
+
+    def log_message(self, fmt, *args):
+        pass    # a scraper every few seconds would flood the console
+
+
+class MetricsServer:
+    """HTTP metrics on a loopback address, served from one daemon thread.
+
+    get_engine() / get_tracker() return the current objects or None; they
+    are called on every scrape, so a new engine after re-arming is picked up.
+    port 0 binds an ephemeral port; read .port after start().
+    """
+
+    def __init__(self, get_engine, get_tracker=None, host="127.0.0.1", port=9464):
+        if host not in LOOPBACK_HOSTS:
+            raise ValueError(f"metrics server only binds to loopback, not {host!r}")
+        self.get_engine = get_engine
+        self.get_tracker = get_tracker or (lambda: None)
+        self.host = host
+        self.port = port
+        self.scrapes = 0
+        self._httpd = None
+        self._thread = None
+
+    def snapshot(self) -> dict:
+        return collect(self.get_engine(), self.get_tracker())
+
+    def handle(self, method: str, path: str):
+        """(status, content type, body bytes) for one request."""
+        if method not in ("GET", "HEAD"):
+            return 405, "text/plain; charset=utf-8", b"method not allowed\n"
+        path = path.split("?", 1)[0]
+        if path == "/metrics":
+            self.scrapes += 1
+            return 200, PROMETHEUS_CONTENT_TYPE, to_prometheus(self.snapshot()).encode("utf-8")
+        if path == "/metrics.json":
+            self.scrapes += 1
+            return 200, "application/json", json.dumps(self.snapshot()).encode("utf-8")
+        if path == "/":
+            return 200, "text/plain; charset=utf-8", b"Mimic metrics: /metrics, /metrics.json\n"
+        return 404, "text/plain; charset=utf-8", b"not found\n"
+
+    def start(self):
+        """Bind and start serving. Raises OSError if the port is taken."""
+        self._httpd = HTTPServer((self.host, self.port), _Handler)
+        self._httpd.metrics = self
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True,
+                                        name="mimic-metrics")
+        self._thread.start()
+        return self
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/metrics"
+
+    def stop(self):
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
@@ -0,0 +1,130 @@
+"""Headless replay of click streams through the capture and report path.
+
+Part of Mimic. Drives HumanClickTracker (training mode) or the benchmark's
+ClickSession through a ReplaySource, then builds the same statistics the
+GUIs would, and reports how long capture and analysis took. Works on any OS
+and needs no mouse, so the recording-to-report path can be profiled and
+load-tested.
+
+    cd python_legacy
+    python -m mimic.replay ../click_data/ClickData_20260807_150644.csv --speed 1
+    python -m mimic.replay --synthetic 100000 --target tracker
+    python -m mimic.replay --synthetic 20000 --target benchmark --profile
+"""
+
+import os
+import time
+import argparse
+import cProfile
+import pstats
+
+from .inputsource import ReplaySource
+from .session import HumanClickTracker
+
+
+def replay_tracker(source, training_type="normal"):
+    """Training-mode capture. Returns (tracker, capture_s)."""
+    tracker = HumanClickTracker(session_manager=None)
+    t0 = time.perf_counter()
+    tracker.start_tracking(training_type, source=source)
+    source.join()
+    tracker.stop_tracking()
+    return tracker, time.perf_counter() - t0
+
+
+def replay_benchmark(source, technique="unlabelled", duration=None):
+    """Benchmark capture. Returns (session, capture_s).
+
+    duration defaults to the whole stream; give one to exercise the
+    cut-off the GUI applies.
+    """
+    from MimicBenchmarkTool import ClickSession, BenchmarkRecorder
+
+    if duration is None:
+        duration = source.duration + 1.0
+    session = ClickSession(session_name="replay", duration_seconds=int(duration),
+                           technique=technique)
+    recorder = BenchmarkRecorder(session, duration)
+    t0 = time.perf_counter()
+    source.start(recorder.on_press, recorder.on_release)
+    source.join()
+    recorder.finish(source.now())
+    return session, time.perf_counter() - t0
+
+
+def run(source, target="tracker", label="normal", duration=None, export=None):
+    """Replay one stream end to end and print the timings. Returns the stats."""
+    if target == "tracker":
+        recorder, capture_s = replay_tracker(source, label)
+        t0 = time.perf_counter()
+        stats = recorder.get_stats()
+        if stats and export:
+            recorder.export_to_csv(os.path.join(export, f"replay_{label}.csv"))
+            with open(os.path.join(export, f"replay_{label}.txt"), 'w', encoding='utf-8') as f:
+                f.write(recorder.format_report(stats))
+    else:
+        recorder, capture_s = replay_benchmark(source, label, duration)
+        t0 = time.perf_counter()
+        stats = recorder.get_stats()
+        if stats and export:
+            # Writes ClickData_replay_STATS.txt beside it.
+            recorder.export_to_csv(os.path.join(export, "ClickData_replay.csv"))
+    report_s = time.perf_counter() - t0
+
+    events = source.events_sent
+    rate = events / capture_s if capture_s > 0 else float('inf')
+    speed = "unthrottled" if source.speed is None else f"{source.speed:g}x"
+    print(f"[REPLAY] {target}, {speed}: {events} events in {capture_s:.3f}s "
+          f"({rate:,.0f} events/s), stream span {source.duration:.1f}s")
+    print(f"[REPLAY] report: {report_s:.3f}s")
+    if stats:
+        cps = stats.get('avg_cps', stats.get('cps'))
+        clicks = stats.get('total', stats.get('total_clicks'))
+        print(f"[REPLAY] {clicks} clicks, CPS {cps:.2f}")
+    else:
+        print("[REPLAY] not enough clicks for statistics")
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Replay a click recording or synthetic stream through capture and analysis.")
+    parser.add_argument("csv", nargs="?", help="click_data/ or training CSV to replay")
+    parser.add_argument("--synthetic", type=int, metavar="N",
+                        help="replay N synthetic clicks instead of a file")
+    parser.add_argument("--cps", type=float, default=10.0, help="synthetic stream rate")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--speed", type=float, default=None,
+                        help="1 = real time, N = N times faster (default: unthrottled)")
+    parser.add_argument("--target", choices=("tracker", "benchmark"), default="benchmark",
+                        help="HumanClickTracker (training) or the benchmark's ClickSession")
+    parser.add_argument("--label", default=None,
+                        help="training type / technique recorded with the session")
+    parser.add_argument("--duration", type=float, default=None,
+                        help="benchmark test length in seconds (default: whole stream)")
+    parser.add_argument("--export", default=None, help="also write the CSV and its report here")
+    parser.add_argument("--profile", action="store_true", help="print the top cProfile entries")
+    args = parser.parse_args(argv)
+
+    if args.synthetic:
+        source = ReplaySource.synthetic(args.synthetic, cps=args.cps, speed=args.speed,
+                                        seed=args.seed)
+    elif args.csv:
+        source = ReplaySource.from_csv(args.csv, speed=args.speed)
+    else:
+        parser.error("give a CSV to replay or --synthetic N")
+    if args.export:
+        os.makedirs(args.export, exist_ok=True)
+
+    label = args.label or ("normal" if args.target == "tracker" else "unlabelled")
+    if args.profile:
+        profiler = cProfile.Profile()
+        profiler.runcall(run, source, args.target, label, args.duration, args.export)
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(15)
+    else:
+        run(source, args.target, label, args.duration, args.export)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,144 @@
+"""Event-driven refresh scheduling for the main window.
+
+Part of Mimic. The GUI used to run one 500ms loop that recomputed every
+statistic and reconfigured every label, whether or not a click had happened,
+the window was minimized, or the labels were on the page being shown.
+
+Widgets now subscribe to named metrics instead. Each metric has a version
+key -- normally the click count of whatever is producing clicks -- and a
+tick only pushes a metric to the subscribers on the visible page whose last
+pushed key differs. A metric is computed at most once per key, and only when
+a visible subscriber needs it, so a metric other metrics are derived from
+(the detailed stats behind the risk assessment) is shared, not recomputed.
+
+The tick rate follows the clicks: fast while the default key is moving,
+doubling back to a slow poll while the clicker is armed but idle, and
+stopping entirely when nothing is live or the window is hidden. wake()
+restarts it.
+"""
+
+_UNSET = object()
+
+
+class _Metric:
+    __slots__ = ('name', 'compute', 'version', 'key', 'value', 'subscribers')
+
+    def __init__(self, name, compute, version):
+        self.name = name
+        self.compute = compute
+        self.version = version
+        self.key = _UNSET
+        self.value = None
+        self.subscribers = []
+
+
+class _Subscriber:
+    __slots__ = ('page', 'callback', 'pushed')
+
+    def __init__(self, page, callback):
+        self.page = page
+        self.callback = callback
+        self.pushed = _UNSET
+
+
+class RefreshScheduler:
+    """Pushes changed metrics to the widgets on the visible page.
+
+    version: default version key for metrics that don't give their own.
+    is_live: True while something can change metrics without a GUI event
+             (clicker armed, training recording); the scheduler sleeps
+             otherwise, until wake().
+    """
+
+    def __init__(self, root, version, is_live, fast_ms=200, idle_ms=1000):
+        self.root = root
+        self.default_version = version
+        self.is_live = is_live
+        self.fast_ms = fast_ms
+        self.idle_ms = idle_ms
+        self.interval = fast_ms
+        self.page = 0
+        self.metrics = {}
+        self.ticks = 0
+        self.pushes = 0
+        self._after_id = None
+        self._last_key = _UNSET
+        self._wake_pending = False
+        self._stopped = False
+
+    def metric(self, name, compute, version=None):
+        """Register a metric. compute() takes no arguments; use value() inside
+        it to build on another metric."""
+        self.metrics[name] = _Metric(name, compute, version or self.default_version)
+
+    def subscribe(self, name, page, callback):
+        """callback(value) whenever name changes while page is visible.
+        page=None subscribes on every page."""
+        self.metrics[name].subscribers.append(_Subscriber(page, callback))
+
+    def value(self, name):
+        """Current value of a metric, computed only if its key moved on."""
+        m = self.metrics[name]
+        key = m.version()
+        if key != m.key:
+            m.value = m.compute()
+            m.key = key
+        return m.value
+
+    def set_page(self, page):
+        self.page = page
+        self.wake()
+
+    def wake(self):
+        """Tick as soon as Tk is idle. Coalesces, so it is cheap to over-call."""
+        if self._stopped or self._wake_pending:
+            return
+        self._wake_pending = True
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+        self.interval = self.fast_ms
+        self.root.after_idle(self._tick)
+
+    def stop(self):
+        self._stopped = True
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _visible(self):
+        try:
+            return self.root.state() not in ('iconic', 'withdrawn')
+        except Exception:
+            return False
+
+    def _tick(self):
+        self._wake_pending = False
+        self._after_id = None
+        if self._stopped:
+            return
+        self.ticks += 1
+
+        # A hidden window sleeps until <Map> wakes it.
+        if not self._visible():
+            return
+        for m in self.metrics.values():
+            subs = [s for s in m.subscribers if s.page is None or s.page == self.page]
+            if not subs:
+                continue
+            key = m.version()
+            for s in subs:
+                if s.pushed != key:
+                    s.callback(self.value(m.name))
+                    s.pushed = key
+                    self.pushes += 1
+
+        key = self.default_version()
+        if key != self._last_key:
+            self._last_key = key
+            self.interval = self.fast_ms
+        elif not self.is_live():
+            return
+        else:
+            self.interval = min(self.interval * 2, self.idle_ms)
+        self._after_id = self.root.after(self.interval, self._tick)
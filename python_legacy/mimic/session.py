@@ -8,6 +8,8 @@ import csv
 import json
 import math
 import time
+import sqlite3
+import threading
 import statistics
 from datetime import datetime
 from collections import deque
@@ -15,6 +17,9 @@ from collections import deque
 from tkinter import messagebox
 
 from .config import Config, RiskAssessor
+from .exporter import ExportCancelled
+from .inputsource import Win32HookSource, Win32PollSource
+from .sketch import DistributionSketch
 
 
 # ═════════════════════════════════════════════════════════════════════════════
@@ -22,36 +27,175 @@ from .config import Config, RiskAssessor
 # ═════════════════════════════════════════════════════════════════════════════
 
 class SessionManager:
-    """Manages session history and persistence"""
-    
-    def __init__(self):
+    """Manages session history and persistence
+
+    History lives in SQLite (sessions.db, beside the old sessions.json).
+    Adding a session is one INSERT rather than a rewrite of the whole file,
+    WAL journalling means a crash mid-write costs at most that one row, and
+    the (kind, type/mode, timestamp) indexes let the History and Differential
+    pages fetch one page at a time however long the history grows. An
+    existing sessions.json is imported once, the first time it is seen.
+
+    Sessions can also save mergeable sketches of their delays and holds
+    (mimic.sketch) in a side table, so aggregate() can answer quantile and
+    moment queries over any filtered set of sessions without the raw data.
+    """
+
+    PAGE_SIZE = 20
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS sessions (
+            id        INTEGER PRIMARY KEY,
+            kind      TEXT NOT NULL,     -- 'training' or 'clicker'
+            timestamp TEXT NOT NULL,     -- ISO 8601, sorts chronologically
+            label     TEXT,              -- training type / clicker mode
+            data      TEXT NOT NULL      -- the full session dict as JSON
+        );
+        CREATE INDEX IF NOT EXISTS idx_sessions_kind_ts
+            ON sessions (kind, timestamp);
+        CREATE INDEX IF NOT EXISTS idx_sessions_kind_label_ts
+            ON sessions (kind, label, timestamp);
+        CREATE TABLE IF NOT EXISTS sketches (
+            session_id INTEGER PRIMARY KEY REFERENCES sessions (id),
+            delays     TEXT,             -- DistributionSketch.to_dict() as JSON
+            holds      TEXT
+        );
+        CREATE TABLE IF NOT EXISTS imports (
+            source      TEXT PRIMARY KEY,
+            imported_at TEXT NOT NULL
+        );
+    """
+
+    # Which session field each kind is filtered on.
+    LABEL_FIELD = {"training": "type", "clicker": "mode"}
+
+    def __init__(self, db_file=None):
+        self.db_file = db_file or Config.get_sessions_db()
         self.sessions_file = Config.get_sessions_file()
-        self.sessions = self.load_sessions()
-    
-    def load_sessions(self):
-        """Load session history from JSON"""
+        # Sessions are added from the hook thread as well as the Tk thread.
+        self._lock = threading.Lock()
+        self.conn = self._connect()
+        self.import_json(self.sessions_file)
+
+    def _connect(self):
+        try:
+            os.makedirs(os.path.dirname(self.db_file), exist_ok=True)
+            conn = sqlite3.connect(self.db_file, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+        except (OSError, sqlite3.Error) as e:
+            print(f"[WARNING] Could not open {self.db_file}: {e} -- history will not persist")
+            conn = sqlite3.connect(":memory:", check_same_thread=False)
+        conn.executescript(self.SCHEMA)
+        return conn
+
+    def import_json(self, path):
+        """Import a legacy sessions.json. Each file is only ever imported once."""
+        source = os.path.abspath(path)
+        if not os.path.exists(source):
+            return 0
+        with self._lock:
+            if self.conn.execute("SELECT 1 FROM imports WHERE source = ?",
+                                 (source,)).fetchone():
+                return 0
         try:
-            if os.path.exists(self.sessions_file):
-                with open(self.sessions_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            return {"training": [], "clicker": []}
+            with open(source, 'r', encoding='utf-8') as f:
+                legacy = json.load(f)
         except Exception as e:
-            print(f"[WARNING] Could not load sessions: {e}")
-            return {"training": [], "clicker": []}
-    
-    def save_sessions(self):
-        """Save session history to JSON"""
+            print(f"[WARNING] Could not import sessions from {source}: {e}")
+            return 0
+
+        rows = [self._row(kind, session)
+                for kind in self.LABEL_FIELD
+                for session in legacy.get(kind, [])]
         try:
-            os.makedirs(os.path.dirname(self.sessions_file), exist_ok=True)
-            with open(self.sessions_file, 'w', encoding='utf-8') as f:
-                json.dump(self.sessions, f, indent=2, ensure_ascii=False)
+            with self._lock, self.conn:
+                self.conn.executemany(
+                    "INSERT INTO sessions (kind, timestamp, label, data) VALUES (?, ?, ?, ?)",
+                    rows)
+                self.conn.execute("INSERT INTO imports VALUES (?, ?)",
+                                  (source, datetime.now().isoformat()))
+        except sqlite3.Error as e:
+            print(f"[ERROR] Could not import sessions: {e}")
+            return 0
+        print(f"[SESSIONS] Imported {len(rows)} sessions from {source}")
+        return len(rows)
+
+    def _row(self, kind, session):
+        return (kind, session.get("timestamp", ""),
+                session.get(self.LABEL_FIELD[kind]), json.dumps(session, ensure_ascii=False))
+
+    def _insert(self, kind, session, sketches=None):
+        """Insert one session, and its sketches ({"delays"/"holds": sketch}) if given."""
+        try:
+            with self._lock, self.conn:
+                cur = self.conn.execute(
+                    "INSERT INTO sessions (kind, timestamp, label, data) VALUES (?, ?, ?, ?)",
+                    self._row(kind, session))
+                if sketches:
+                    dump = lambda s: json.dumps(s.to_dict()) if s is not None and s.count else None
+                    self.conn.execute(
+                        "INSERT INTO sketches (session_id, delays, holds) VALUES (?, ?, ?)",
+                        (cur.lastrowid, dump(sketches.get("delays")), dump(sketches.get("holds"))))
             return True
-        except Exception as e:
-            print(f"[ERROR] Could not save sessions: {e}")
+        except sqlite3.Error as e:
+            print(f"[ERROR] Could not save session: {e}")
             return False
-    
-    def add_training_session(self, stats, filepath):
-        """Add training session to history"""
+
+    def query_sessions(self, kind, label=None, limit=None, offset=0, newest_first=True):
+        """Sessions of one kind, optionally one type/mode, in timestamp order."""
+        sql = "SELECT data FROM sessions WHERE kind = ?"
+        args = [kind]
+        if label:
+            sql += " AND label = ?"
+            args.append(label)
+        order = "DESC" if newest_first else "ASC"
+        sql += f" ORDER BY timestamp {order}, id {order}"
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            args += [int(limit), int(offset)]
+        with self._lock:
+            rows = self.conn.execute(sql, args).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def count_sessions(self, kind, label=None):
+        sql = "SELECT COUNT(*) FROM sessions WHERE kind = ?"
+        args = [kind]
+        if label:
+            sql += " AND label = ?"
+            args.append(label)
+        with self._lock:
+            return self.conn.execute(sql, args).fetchone()[0]
+
+    def aggregate(self, kind, label=None, since=None, until=None):
+        """Merged delay and hold sketches of every matching session that saved them.
+
+        since/until are datetimes or ISO strings (since inclusive, until
+        exclusive). Returns {"sessions": n, "delays": DistributionSketch or
+        None, "holds": ...}; query the sketches with quantile() / summary().
+        """
+        sql = ("SELECT k.delays, k.holds FROM sketches k JOIN sessions s ON s.id = k.session_id"
+               " WHERE s.kind = ?")
+        args = [kind]
+        if label:
+            sql += " AND s.label = ?"
+            args.append(label)
+        if since is not None:
+            sql += " AND s.timestamp >= ?"
+            args.append(since.isoformat() if isinstance(since, datetime) else since)
+        if until is not None:
+            sql += " AND s.timestamp < ?"
+            args.append(until.isoformat() if isinstance(until, datetime) else until)
+        with self._lock:
+            rows = self.conn.execute(sql, args).fetchall()
+
+        out = {"sessions": len(rows)}
+        for i, key in enumerate(("delays", "holds")):
+            parts = [DistributionSketch.from_dict(json.loads(r[i])) for r in rows if r[i]]
+            out[key] = DistributionSketch.merged(parts) if parts else None
+        return out
+
+    def add_training_session(self, stats, filepath, delays=None):
+        """Add training session to history, with a sketch of its delays if given"""
         session = {
             "timestamp": datetime.now().isoformat(),
             "type": stats.get('training_type', 'unknown'),
@@ -61,12 +205,12 @@ class SessionManager:
             "std_dev": stats.get('std_dev', 0),
             "filepath": filepath
         }
-        self.sessions["training"].append(session)
-        self.save_sessions()
+        sketches = {"delays": DistributionSketch.of(delays)} if delays else None
+        self._insert("training", session, sketches)
         return session
     
-    def add_clicker_session(self, stats, filepath):
-        """Add clicker session to history"""
+    def add_clicker_session(self, stats, filepath, sketches=None):
+        """Add clicker session to history; sketches as from engine.session_sketches()"""
         risk_assessment = RiskAssessor.assess(stats)
         session = {
             "timestamp": datetime.now().isoformat(),
@@ -79,30 +223,36 @@ class SessionManager:
             "score": risk_assessment['score'],
             "filepath": filepath
         }
-        self.sessions["clicker"].append(session)
-        self.save_sessions()
+        self._insert("clicker", session, sketches)
         return session
     
     def get_training_sessions(self, click_type=None):
-        """Get training sessions, optionally filtered by type"""
-        sessions = self.sessions.get("training", [])
-        if click_type:
-            return [s for s in sessions if s.get('type') == click_type]
-        return sessions
+        """Get all training sessions, oldest first, optionally filtered by type"""
+        return self.query_sessions("training", click_type, newest_first=False)
     
     def get_clicker_sessions(self, mode=None):
-        """Get clicker sessions, optionally filtered by mode"""
-        sessions = self.sessions.get("clicker", [])
-        if mode:
-            return [s for s in sessions if s.get('mode') == mode]
-        return sessions
+        """Get all clicker sessions, oldest first, optionally filtered by mode"""
+        return self.query_sessions("clicker", mode, newest_first=False)
+
+    def get_training_page(self, click_type=None, page=0, page_size=PAGE_SIZE):
+        """One page of training sessions, newest first"""
+        return self.query_sessions("training", click_type, page_size, page * page_size)
+
+    def get_clicker_page(self, mode=None, page=0, page_size=PAGE_SIZE):
+        """One page of clicker sessions, newest first"""
+        return self.query_sessions("clicker", mode, page_size, page * page_size)
 
 
 # HUMAN CLICK TRACKER - WITH SESSION INTEGRATION
 # ═════════════════════════════════════════════════════════════════════════════
 
 class HumanClickTracker:
-    """Tracks legitimate clicks for baseline analysis"""
+    """Tracks legitimate clicks for baseline analysis
+
+    Clicks arrive from an InputSource: the Win32 hook by default, polling if
+    the hook will not install, or a ReplaySource to push a recording or a
+    synthetic stream through the same path (see mimic.inputsource).
+    """
     
     def __init__(self, session_manager):
         self.session_manager = session_manager
@@ -114,11 +264,11 @@ class HumanClickTracker:
         self.total_clicks = 0
         self.training_type = "normal"
         
-        # Win32 hook variables
-        self.hook_id = None
-        self.hook_callback = None
+        self.source = None
+        self.session_start_t = None
+        self.session_end_t = None
     
-    def start_tracking(self, training_type="normal"):
+    def start_tracking(self, training_type="normal", source=None):
         self.is_tracking = True
         self.training_type = training_type
         self.session_start = datetime.now()
@@ -127,51 +277,36 @@ class HumanClickTracker:
         self.last_click_time = None
         self.total_clicks = 0
         
-        self._install_mouse_hook()
-        print(f"\n[TRAINING MODE: {training_type.upper()}] Recording with Win32 hook (high-precision)...\n")
+        if source is None:
+            source = Win32HookSource()
+            source.start(self._on_press)
+            if not source.installed:
+                source.stop()
+                source = Win32PollSource().start(self._on_press)
+            label = "Win32 hook (high-precision)" if isinstance(source, Win32HookSource) else "Win32 polling"
+        else:
+            source.start(self._on_press)
+            label = type(source).__name__
+        self.source = source
+        self.session_start_t = source.started_at
+        self.session_end_t = None
+        print(f"\n[TRAINING MODE: {training_type.upper()}] Recording with {label}...\n")
     
     def stop_tracking(self):
         self.is_tracking = False
-        self._uninstall_mouse_hook()
+        if self.source:
+            self.session_end_t = self.source.now()
+            self.source.stop()
         print(f"\n[TRAINING MODE: {self.training_type.upper()}] Stopped recording.\n")
     
-    def _install_mouse_hook(self):
-        """Install low-level mouse hook for precise click tracking"""
-        import ctypes
-        from ctypes import wintypes
-        
-        HOOKPROC = ctypes.WINFUNCTYPE(ctypes.c_int, ctypes.c_int, wintypes.WPARAM, wintypes.LPARAM)
-        
-        def mouse_hook_proc(nCode, wParam, lParam):
-            if nCode >= 0 and self.is_tracking:
-                if wParam == 0x0201:  # WM_LBUTTONDOWN
-                    self._record_click_precise()
-            
-            return ctypes.windll.user32.CallNextHookEx(self.hook_id, nCode, wParam, lParam)
-        
-        self.hook_callback = HOOKPROC(mouse_hook_proc)
-        
-        self.hook_id = ctypes.windll.user32.SetWindowsHookExA(
-            14,  # WH_MOUSE_LL
-            self.hook_callback,
-            ctypes.windll.kernel32.GetModuleHandleW(None),
-            0
-        )
-        
-        if not self.hook_id:
-            print("[WARNING] Failed to install mouse hook - falling back to manual tracking")
+    def _on_press(self, t, button):
+        if self.is_tracking and button == "left":
+            self._record_click_precise(t)
     
-    def _uninstall_mouse_hook(self):
-        """Remove mouse hook"""
-        if self.hook_id:
-            import ctypes
-            ctypes.windll.user32.UnhookWindowsHookEx(self.hook_id)
-            self.hook_id = None
-            self.hook_callback = None
-    
-    def _record_click_precise(self):
-        """High-precision click recording via Win32 hook"""
-        current_time = time.perf_counter()
+    def _record_click_precise(self, current_time=None):
+        """High-precision click recording, timestamped by the input source"""
+        if current_time is None:
+            current_time = time.perf_counter()
         self.click_times.append(current_time)
         self.total_clicks += 1
         
@@ -184,17 +319,30 @@ class HumanClickTracker:
         self.last_click_time = current_time
     
     def record_click(self):
-        """Fallback method if hook fails"""
+        """Manual entry point; clicks normally arrive from the input source"""
         if not self.is_tracking:
             return
-        current_time = time.perf_counter()
-        self.click_times.append(current_time)
-        self.total_clicks += 1
-        if self.last_click_time is not None:
-            delay_ms = (current_time - self.last_click_time) * 1000
-            if 1 <= delay_ms < 2000:
-                self.click_delays.append(delay_ms)
-        self.last_click_time = current_time
+        self._record_click_precise()
+    
+    def elapsed(self):
+        """Seconds since tracking started, on the input source's clock"""
+        if self.source is None or self.session_start_t is None:
+            return 0.0
+        end = self.session_end_t if self.session_end_t is not None else self.source.now()
+        return end - self.session_start_t
+    
+    def snapshot(self):
+        """Detached copy of the recorded clicks, frozen at the current elapsed time"""
+        snap = HumanClickTracker(self.session_manager)
+        snap.training_type = self.training_type
+        snap.click_times = list(self.click_times)
+        snap.click_delays = list(self.click_delays)
+        snap.total_clicks = self.total_clicks
+        snap.source = self.source
+        snap.session_start_t = self.session_start_t
+        if self.session_start_t is not None:
+            snap.session_end_t = self.session_start_t + self.elapsed()
+        return snap
     
     def get_rolling_cps(self, window_seconds=1.0):
         """Calculate CPS using rolling window (like Minecraft mods)"""
@@ -214,17 +362,18 @@ class HumanClickTracker:
         if len(self.click_times) < 10:
             return 0.0
         
-        max_cps = 0.0
-        
-        for i in range(len(self.click_times)):
-            timestamp = self.click_times[i]
+        # Two pointers over the (already sorted) click times: O(n) rather
+        # than rescanning every click for every window.
+        max_count = 0
+        lo = 0
+        times = self.click_times
+        for hi, timestamp in enumerate(times):
             cutoff = timestamp - window_seconds
-            
-            clicks_in_window = sum(1 for t in self.click_times if cutoff <= t <= timestamp)
-            cps = clicks_in_window / window_seconds
-            max_cps = max(max_cps, cps)
+            while times[lo] < cutoff:
+                lo += 1
+            max_count = max(max_count, hi - lo + 1)
         
-        return max_cps
+        return max_count / window_seconds
     
     def calculate_variance(self):
         if len(self.click_delays) < 10:
@@ -243,7 +392,7 @@ class HumanClickTracker:
         p10 = sorted_delays[int(len(sorted_delays) * 0.10)]
         p50 = sorted_delays[int(len(sorted_delays) * 0.50)]
         p90 = sorted_delays[int(len(sorted_delays) * 0.90)]
-        session_duration = (datetime.now() - self.session_start).total_seconds()
+        session_duration = self.elapsed()
         
         capture_rate = len(delays) / self.total_clicks if self.total_clicks > 0 else 0
         
@@ -274,14 +423,16 @@ class HumanClickTracker:
             "training_type": self.training_type
         }
     
-    def export_to_csv(self, filename):
-        """Export training data to CSV with UTF-8 encoding"""
+    def export_to_csv(self, filename, delays=None):
+        """Export training data (or a snapshot of it) to CSV with UTF-8 encoding"""
+        if delays is None:
+            delays = self.click_delays
         try:
             with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
                 writer = csv.writer(csvfile)
                 writer.writerow(['Click_Number', 'Delay_MS', 'CPS', 'Training_Type'])
                 
-                for i, delay in enumerate(self.click_delays, 1):
+                for i, delay in enumerate(delays, 1):
                     cps = 1000.0 / delay if delay > 0 else 0
                     writer.writerow([i, f"{delay:.2f}", f"{cps:.2f}", self.training_type])
             
@@ -290,20 +441,8 @@ class HumanClickTracker:
             print(f"[ERROR] CSV export failed: {e}")
             return False
     
-    def export_human_stats(self):
-        """Export complete human clicking statistics with session tracking"""
-        stats = self.get_stats()
-        
-        if not stats:
-            print(f"\n[!] Not enough data. Need at least 10 clicks! (Current: {self.total_clicks})\n")
-            messagebox.showwarning("Insufficient Data", f"Need at least 10 valid clicks!\n\nCurrent clicks: {self.total_clicks}")
-            return
-        
-        if stats['capture_rate'] < 0.95:
-            capture_pct = stats['capture_rate'] * 100
-            missed_clicks = stats['total'] - stats['valid_delays']
-            print(f"[WARNING] Capture rate: {capture_pct:.1f}% ({missed_clicks} clicks missed/filtered)\n")
-        
+    def format_report(self, stats):
+        """Baseline report text for a get_stats() result"""
         training_type = stats['training_type'].upper()
         # So tedious :(
         report = f""" 
@@ -420,32 +559,76 @@ RECOMMENDATION FOR MIMIC:
 FILE SAVED TO DESKTOP
 ══════════════════════════════════════════════════════════════════════════════
 """
+        return report
+
+    def export_human_stats(self, writer=None):
+        """Export complete human clicking statistics with session tracking
+
+        With an ExportWriter the statistics, the report and the files are all
+        built on its thread and the result is reported from the Tk thread;
+        without one, inline. Only the click-count check and a snapshot() of
+        the tracker run on the caller, so a new run started while the export
+        is queued cannot change what gets written.
+        """
+        if len(self.click_delays) < 10:
+            print(f"\n[!] Not enough data. Need at least 10 clicks! (Current: {self.total_clicks})\n")
+            messagebox.showwarning("Insufficient Data", f"Need at least 10 valid clicks!\n\nCurrent clicks: {self.total_clicks}")
+            return
         
-        print(report)
-        
-        training_type_safe = stats['training_type'].lower().replace(' ', '_')
+        training_type_safe = self.training_type.lower().replace(' ', '_')
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         txt_filename = f"{training_type_safe}_baseline_{timestamp}.txt"
         csv_filename = f"{training_type_safe}_baseline_{timestamp}.csv"
         
         folder_path = os.path.join(Config.get_training_data_path(), training_type_safe)
-        
-        try:
+        txt_full_path = os.path.join(folder_path, txt_filename)
+        csv_full_path = os.path.join(folder_path, csv_filename)
+        # Snapshot: recording may still be adding clicks, or restart, while the writer runs.
+        snap = self.snapshot()
+        delays = snap.click_delays
+        built = {}
+        
+        def build_report():
+            stats = snap.get_stats()
+            if stats['capture_rate'] < 0.95:
+                capture_pct = stats['capture_rate'] * 100
+                missed_clicks = stats['total'] - stats['valid_delays']
+                print(f"[WARNING] Capture rate: {capture_pct:.1f}% ({missed_clicks} clicks missed/filtered)\n")
+            built['stats'] = stats
+            built['report'] = self.format_report(stats)
+        
+        def write_report():
             os.makedirs(folder_path, exist_ok=True)
-            
-            txt_full_path = os.path.join(folder_path, txt_filename)
             with open(txt_full_path, 'w', encoding='utf-8') as f:
-                f.write(report)
+                f.write(built['report'])
             print(f"[SUCCESS] TXT report saved to: {txt_full_path}\n")
-            
-            csv_full_path = os.path.join(folder_path, csv_filename)
-            self.export_to_csv(csv_full_path)
+        
+        def write_csv():
+            if not snap.export_to_csv(csv_full_path, delays):
+                raise OSError(f"could not write {csv_full_path}")
             print(f"[SUCCESS] CSV data saved to: {csv_full_path}\n")
-            
-            self.session_manager.add_training_session(stats, txt_full_path)
-            
+        
+        def record_session():
+            if self.session_manager:
+                self.session_manager.add_training_session(built['stats'], txt_full_path, delays)
+        
+        def done(_results):
             messagebox.showinfo("Export Successful", f"Training data exported!\n\n📁 {folder_path}")
         
-        except Exception as e:
+        def failed(e):
+            if isinstance(e, ExportCancelled):
+                return
             print(f"[ERROR] Export failed: {e}\n")
             messagebox.showerror("Export Failed", f"Could not save files:\n{e}")
+        
+        steps = [("stats", build_report), ("report", write_report), ("csv", write_csv),
+                 ("history", record_session)]
+        if writer is not None:
+            return writer.submit(f"{self.training_type.upper()} baseline", steps, done, failed)
+        
+        try:
+            results = [fn() for _, fn in steps]
+        except Exception as e:
+            failed(e)
+        else:
+            done(results)
@@ -0,0 +1,429 @@
+"""Offline simulation of the full event stream click() produces.
+
+Part of Mimic. simulate_stream() predates hold modelling and has drifted
+from click(): it draws the double gap independently of the hold, never
+calls _draw_hold(), applies DOUBLE_MIN_REMAINDER_MS without the bounce
+hold, and returns intervals only. Validating it said little about what
+the live path sends.
+
+simulate_events() makes click()'s decisions -- the check_cps() backoff,
+idle fatigue recovery, calculate_delay(), the double decision, both hold
+draws and the bounce remainder -- without sleeping or touching the mouse,
+and returns every press with its hold, bounce flag and technique state.
+Compute time between stages is taken as zero, so press times are the ideal
+schedule the live path aims for.
+
+It is batched in NumPy. Everything that does not feed back on earlier
+output is drawn for a block of presses up front: the Markov path (as
+geometric run lengths), the smoothstep blends, the AR(1) noise and the OU
+drift (linear recurrences, solved by a log-depth scan), rhythm, pauses and
+poll jitter. Two things do feed back -- fatigue recovery depends on the
+previous interval, and the CPS backoff on recent press times. Recovery
+fires on a few percent of presses and runs in one lean per-press pass over
+plain floats; the backoff is rare, so the pass assumes it does not fire,
+checks a stretch of presses at once with array operations, and rewinds to
+the first press that does back off. A million presses take about three
+seconds.
+"""
+
+import csv
+import math
+
+import numpy as np
+
+from .config import Config
+from .engine import (
+    STATE_NAMES, TRANSITION_MATRIX, CPS_WINDOW_S, BURST_CLICKS, BURST_BACKOFF_S,
+    SUSTAINED_BACKOFF_S, IDLE_RECOVERY_S, IDLE_RECOVERY_TAU_S, FATIGUE_LAMBDA,
+    FATIGUE_MAX_SLOWDOWN, RHYTHM_STEP, RHYTHM_AMOUNT_ENHANCED, RHYTHM_AMOUNT_STANDARD,
+    PAUSE_RATE, PAUSE_STD_MS,
+)
+
+BLOCK = 65536          # presses drawn per batch
+SPECULATE = 512        # presses run ahead before checking for a backoff
+RECENT = 20            # AdaptiveClickerEngine.recent_click_times maxlen
+DOUBLE_CLICK_THRESHOLD_MS = 50.0    # MimicBenchmarkTool's click_type cut-off
+
+
+def linear_recurrence(a: np.ndarray, b: np.ndarray, x0: float) -> np.ndarray:
+    """x[k] = a[k] * x[k-1] + b[k] with x[-1] = x0, for all k at once.
+
+    Hillis-Steele doubling scan: log2(n) passes, each composing every
+    element's affine map with the one `step` places before it.
+    """
+    A = np.array(a, dtype=float)
+    B = np.array(b, dtype=float)
+    step = 1
+    while step < len(A):
+        B[step:] = A[step:] * B[:-step] + B[step:]
+        A[step:] = A[step:] * A[:-step]
+        step *= 2
+    return A * x0 + B
+
+
+def _smoothstep_weights(steps: int) -> np.ndarray:
+    """Blend weight on the target for the 1st..steps-th press after a switch."""
+    alpha = np.arange(1, steps + 1) / steps
+    return alpha * alpha * (3.0 - 2.0 * alpha)
+
+
+class EventTable:
+    """Every press of a simulated hold, in time order.
+
+    press_ms: press time from the first press
+    hold_ms:  press-to-release duration
+    bounce:   True for a switch-bounce (emulated double) press
+    state:    technique index (engine.STATE_NAMES) of the intentional press
+    """
+
+    def __init__(self, press_ms, hold_ms, bounce, state):
+        self.press_ms = press_ms
+        self.hold_ms = hold_ms
+        self.bounce = bounce
+        self.state = state
+
+    def __len__(self):
+        return len(self.press_ms)
+
+    @property
+    def release_ms(self) -> np.ndarray:
+        return self.press_ms + self.hold_ms
+
+    @property
+    def delay_ms(self) -> np.ndarray:
+        """Press-to-press intervals as click_data/ records them (0 for the first)."""
+        d = np.empty_like(self.press_ms)
+        d[:1] = 0.0
+        d[1:] = np.diff(self.press_ms)
+        return d
+
+    def intervals(self) -> np.ndarray:
+        """What the game sees: every interval of the merged stream."""
+        return np.diff(self.press_ms)
+
+    def to_csv(self, filepath: str, start_time: float = 0.0) -> int:
+        """Write in MimicBenchmarkTool's click_data/ schema. Returns rows written.
+
+        Two columns are appended that recordings do not have: bounce (0/1)
+        and state (technique index). Readers that use csv.DictReader, like
+        ClickSession.from_csv() and analysis.batch, ignore them.
+        """
+        n = len(self)
+        delay = self.delay_ms
+        number = np.arange(1, n + 1)
+        click_type = np.where((delay < DOUBLE_CLICK_THRESHOLD_MS) & (number > 1),
+                              "double-click", "single-click")
+        with open(filepath, "w", newline="", encoding="utf-8") as fh:
+            w = csv.writer(fh)
+            w.writerow(["click_number", "timestamp", "relative_time_ms", "delay_ms",
+                        "hold_ms", "button", "click_type", "bounce", "state"])
+            for lo in range(0, n, BLOCK):
+                hi = min(n, lo + BLOCK)
+                w.writerows(zip(
+                    number[lo:hi].tolist(),
+                    np.round(start_time + self.press_ms[lo:hi] / 1000.0, 6).tolist(),
+                    np.round(self.press_ms[lo:hi], 3).tolist(),
+                    np.round(delay[lo:hi], 3).tolist(),
+                    np.round(self.hold_ms[lo:hi], 3).tolist(),
+                    ["left"] * (hi - lo),
+                    click_type[lo:hi].tolist(),
+                    self.bounce[lo:hi].astype(np.int8).tolist(),
+                    self.state[lo:hi].tolist(),
+                ))
+        return n
+
+
+class _Simulation:
+    """Engine state copied out of an AdaptiveClickerEngine and advanced offline."""
+
+    def __init__(self, engine, rng):
+        self.rng = rng
+        states = [engine.states[name] for name in STATE_NAMES]
+        self.t_phi = np.array([s.phi for s in states])
+        self.t_sigma = np.array([s.sigma for s in states])
+        self.t_base = np.array([s.base_rate for s in states])
+        self.hold_median = np.array([s.hold_median for s in states])
+        self.hold_sigma = np.array([s.hold_sigma for s in states])
+        self.hold_rho = np.array([s.hold_rho for s in states])
+        self.double_rate = np.array([s.double_rate for s in states])
+        self.stay = np.diag(TRANSITION_MATRIX).copy()
+
+        self.enhanced = engine.enhanced_mode
+        self.user_baseline = engine.user_baseline
+        self.double_factor = engine.double_session_factor
+        self.blend_steps = engine.blend_steps
+        self.weights = _smoothstep_weights(engine.blend_steps)
+        self.grid = 1000.0 / Config.POLL_RATE_HZ if Config.POLL_RATE_HZ else None
+        if self.enhanced:
+            self.lo, self.hi = Config.ENHANCED_MIN_DELAY_MS, Config.ENHANCED_MAX_DELAY_MS
+        else:
+            self.lo, self.hi = Config.ABSOLUTE_MIN_DELAY_MS, Config.ABSOLUTE_MAX_DELAY_MS
+
+        # Model state carried from block to block
+        self.idx = engine._idx
+        self.cur = (engine._phi, engine._sigma, engine._base)
+        self.blend_from = (engine._from_phi, engine._from_sigma, engine._from_base)
+        self.blend_done = engine.blend_steps - engine._blend_remaining
+        self.u = engine._u
+        self.drift = engine.drift
+        self.phase = engine.rhythm_phase
+
+        # Timing state carried from press to press. One continuous hold, so
+        # the first press has no previous one to recover fatigue from.
+        self.consecutive = engine.consecutive_clicks
+        self.last_now = None           # seconds
+        self.prev_delay = 0.0          # ms
+        self.recent = []               # last RECENT press times, seconds
+
+    # ── per-block draws ──────────────────────────────────────────────────
+
+    def _markov_path(self, n):
+        """State per press plus the indices where a switch happens."""
+        rng = self.rng
+        idx = np.empty(n, dtype=np.int8)
+        switches = []
+        cur = self.idx
+        k = 0
+        while k < n:
+            end = min(n, k + int(rng.geometric(1.0 - self.stay[cur])) - 1)
+            idx[k:end] = cur
+            k = end
+            if k < n:
+                p = TRANSITION_MATRIX[cur].copy()
+                p[cur] = 0.0
+                cur = int(rng.choice(len(p), p=p / p.sum()))
+                idx[k] = cur
+                switches.append(k)
+                k += 1
+        self.idx = cur
+        return idx, switches
+
+    def _blend(self, idx, switches):
+        """phi, sigma, base per press: _advance_blend() over the whole block.
+
+        Each switch starts a smoothstep from the values of the press before
+        it (itself possibly mid-blend), so segments are applied in order.
+        """
+        params = [t[idx].astype(float) for t in (self.t_phi, self.t_sigma, self.t_base)]
+        n = len(idx)
+        steps = self.blend_steps
+        origin, done = self.blend_from, self.blend_done
+        start = 0
+        for stop in switches + [n]:
+            length = min(stop - start, steps - done)
+            if length > 0:
+                w = self.weights[done:done + length]
+                for p, o in zip(params, origin):
+                    p[start:start + length] = (1.0 - w) * o + w * p[start:start + length]
+            done = min(steps, done + (stop - start))
+            if stop < n:
+                origin = tuple(float(p[stop - 1]) for p in params) if stop else self.cur
+                done = 0
+                start = stop
+        self.blend_from, self.blend_done = origin, done
+        self.cur = tuple(float(p[-1]) for p in params)
+        return params
+
+    def _draw_block(self, n):
+        rng = self.rng
+        idx, switches = self._markov_path(n)
+        phi, sigma, base = self._blend(idx, switches)
+
+        u = linear_recurrence(phi, np.sqrt(1.0 - phi * phi) * rng.standard_normal(n), self.u)
+        self.u = float(u[-1])
+
+        rho = Config.DRIFT_REVERSION
+        shock = Config.DRIFT_SIGMA * math.sqrt(1.0 - rho * rho)
+        drift = linear_recurrence(np.full(n, rho), shock * rng.standard_normal(n), self.drift)
+        self.drift = float(drift[-1])
+
+        phase = (self.phase + np.cumsum(rng.uniform(*RHYTHM_STEP, n))) % (2 * math.pi)
+        self.phase = float(phase[-1])
+        amount = RHYTHM_AMOUNT_ENHANCED if self.enhanced else RHYTHM_AMOUNT_STANDARD
+
+        pause = np.where(rng.random(n) < PAUSE_RATE, np.abs(rng.normal(0.0, PAUSE_STD_MS, n)), 0.0)
+        return {
+            "idx": idx,
+            "u": u,
+            "pre": base * np.exp(sigma * u),                      # before fatigue
+            "post": self.user_baseline * (1.0 + drift) * (1.0 + np.sin(phase) * amount),
+            "pause": pause,
+            "jitter": rng.normal(0.0, Config.POLL_JITTER_MS, n),
+        }
+
+    def _delay(self, pre, post, pause, jitter, consecutive):
+        """calculate_delay() steps 2-7 for one press, given its drawn inputs."""
+        fatigue = 1.0 + FATIGUE_MAX_SLOWDOWN * (1.0 - math.exp(-consecutive / FATIGUE_LAMBDA))
+        d = pre * fatigue * post + pause
+        lo, hi = self.lo, self.hi
+        for _ in range(4):
+            if d < lo:
+                d = lo + (lo - d)
+            elif d > hi:
+                d = hi - (d - hi)
+            else:
+                break
+        d = min(hi, max(lo, d))
+        if self.grid:
+            d = min(hi, max(lo, round(d / self.grid) * self.grid + jitter))
+        return d
+
+    # ── feedback: check_cps() and idle recovery ──────────────────────────
+
+    @staticmethod
+    def _backoff(recent, current):
+        """check_cps() for one press, given the press times before it."""
+        kept = [t for t in recent if not current - t > CPS_WINDOW_S]
+        if len(kept) >= 2:
+            if sum(1 for t in kept if current - t <= 1.0) >= BURST_CLICKS:
+                return BURST_BACKOFF_S
+            span = current - kept[0]
+            if (len(kept) / span if span > 0 else 0) > Config.SUSTAINED_CPS_CAP:
+                return SUSTAINED_BACKOFF_S
+        return 0.0
+
+    @staticmethod
+    def _backoff_vec(recent, now):
+        """Which presses at times `now` check_cps() would hold back.
+
+        Assumes none before them did, so only the first True is exact.
+        """
+        history = np.full(RECENT, -np.inf)
+        if recent:
+            history[-len(recent):] = recent
+        windows = np.lib.stride_tricks.sliding_window_view(
+            np.concatenate([history, now]), RECENT)[:len(now)]
+        age = now[:, None] - windows
+        keep = ~(age > CPS_WINDOW_S)
+        count = keep.sum(axis=1)
+        burst = (keep & (age <= 1.0)).sum(axis=1) >= BURST_CLICKS
+        oldest = windows[np.arange(len(now)), RECENT - np.maximum(count, 1)]
+        span = now - oldest
+        with np.errstate(divide="ignore", invalid="ignore"):
+            avg = np.where(span > 0, count / span, 0.0)
+        return (count >= 2) & (burst | (avg > Config.SUSTAINED_CPS_CAP))
+
+    def _press(self, blk, k, backoff):
+        """click() up to calculate_delay() for press k; returns (delay, press time)."""
+        current = 0.0 if self.last_now is None else self.last_now + self.prev_delay / 1000.0
+        t = current + backoff
+        if self.last_now is not None:
+            idle = t - self.last_now
+            if idle > IDLE_RECOVERY_S:
+                self.consecutive = int(self.consecutive * math.exp(-idle / IDLE_RECOVERY_TAU_S))
+        d = self._delay(blk["pre"][k], blk["post"][k], blk["pause"][k], blk["jitter"][k],
+                        self.consecutive)
+        self.consecutive += 1
+        self.recent = (self.recent + [t])[-RECENT:]
+        self.last_now = t
+        self.prev_delay = d
+        return d, t
+
+    def _time_block(self, blk):
+        """Delay and press time for every press of a block, exactly.
+
+        Fatigue recovery fires on a few percent of presses, so it runs in
+        the per-press pass over plain floats. The CPS backoff almost never
+        fires, so the pass runs SPECULATE presses assuming it does not,
+        checks them all at once, and on a hit rewinds and restarts after the
+        first press that does back off.
+        """
+        n = len(blk["idx"])
+        floats = {key: blk[key].tolist() for key in ("pre", "post", "pause", "jitter")}
+        delay = np.empty(n)
+        now = np.empty(n)
+        p = 0
+        if self.last_now is None:
+            # First press of the hold: nothing to recover from or back off for.
+            delay[0], now[0] = self._press(floats, 0, 0.0)
+            p = 1
+        while p < n:
+            end = min(n, p + SPECULATE)
+            saved = (self.consecutive, self.last_now, self.prev_delay, self.recent)
+            for k in range(p, end):
+                delay[k], now[k] = self._press(floats, k, 0.0)
+            backs = self._backoff_vec(saved[3], now[p:end])
+            if not backs.any():
+                p = end
+                continue
+            # Rewind to just before the first press that backs off, and take
+            # that one with its backoff.
+            k = p + int(np.argmax(backs))
+            self.consecutive, self.last_now, self.prev_delay, self.recent = saved
+            for j in range(p, k):
+                self._press(floats, j, 0.0)
+            current = self.last_now + self.prev_delay / 1000.0
+            delay[k], now[k] = self._press(floats, k, self._backoff(self.recent, current))
+            p = k + 1
+        return delay, now
+
+    # ── click(): double decision and holds ───────────────────────────────
+
+    def _holds(self, blk, delay):
+        """click()'s double decision, _draw_hold() for the press and the bounce."""
+        rng = self.rng
+        n = len(delay)
+        idx = blk["idx"]
+        u = blk["u"]
+
+        def draw_hold():
+            rho = self.hold_rho[idx]
+            z = rho * u + np.sqrt(np.maximum(0.0, 1.0 - rho * rho)) * rng.standard_normal(n)
+            hold = np.maximum(Config.HOLD_MIN_MS, self.hold_median[idx] * np.exp(self.hold_sigma[idx] * z))
+            return np.minimum(hold, delay * 0.6)
+
+        gap = rng.normal(Config.DOUBLE_GAP_MS, Config.DOUBLE_GAP_STD_MS, n)
+        rate = np.minimum(0.85, self.double_rate[idx] * self.double_factor)
+        will_double = ((rng.random(n) < rate)
+                       & (delay - (gap + Config.DOUBLE_HOLD_MS) >= Config.DOUBLE_MIN_REMAINDER_MS))
+        if not Config.DOUBLE_CLICK_EMULATION:
+            will_double[:] = False
+        double_hold = np.maximum(1.0, rng.normal(Config.DOUBLE_PRESS_HOLD_MS,
+                                                 Config.DOUBLE_PRESS_HOLD_STD_MS, n))
+        pressure = np.where(will_double, double_hold, draw_hold())
+
+        bounce = will_double & (gap > pressure)
+        budget = delay - gap - Config.DOUBLE_MIN_REMAINDER_MS
+        bounce_hold = np.minimum(draw_hold(), np.maximum(1.0, budget))
+        return pressure, bounce, gap, bounce_hold
+
+    def run(self, n) -> EventTable:
+        parts = []
+        done = 0
+        while done < n:
+            m = min(BLOCK, n - done)
+            blk = self._draw_block(m)
+            delay, now = self._time_block(blk)
+            pressure, bounce, gap, bounce_hold = self._holds(blk, delay)
+
+            # Interleave each bounce press right after its intentional press.
+            count = 1 + bounce
+            first = np.cumsum(count) - count
+            total = int(count.sum())
+            press = np.empty(total)
+            hold = np.empty(total)
+            is_bounce = np.zeros(total, dtype=bool)
+            state = np.empty(total, dtype=np.int8)
+            press[first] = now * 1000.0
+            hold[first] = pressure
+            state[first] = blk["idx"]
+            second = first[bounce] + 1
+            press[second] = now[bounce] * 1000.0 + gap[bounce]
+            hold[second] = bounce_hold[bounce]
+            is_bounce[second] = True
+            state[second] = blk["idx"][bounce]
+            parts.append((press, hold, is_bounce, state))
+            done += m
+        return EventTable(*(np.concatenate(col) for col in zip(*parts)))
+
+
+def simulate_events(engine, n: int, seed=None) -> EventTable:
+    """The presses click() would make over n intentional presses of one hold.
+
+    Starts from engine's current model state (technique, blend, AR noise,
+    drift, rhythm, fatigue, preset) and does not modify the engine.
+    """
+    if n <= 0:
+        empty = np.empty(0)
+        return EventTable(empty, empty.copy(), np.empty(0, dtype=bool), np.empty(0, dtype=np.int8))
+    return _Simulation(engine, np.random.default_rng(seed)).run(n)
@@ -0,0 +1,120 @@
+"""Multi-resolution CPS timeline kept by the engine.
+
+Part of Mimic. cps_history only holds the last 60 samples, enough for the
+30-second live graph but not for looking back over a long session. The
+timeline keeps the CPS series at several resolutions at once -- every click,
+then 1s, 10s and 60s buckets holding min/mean/max -- each in a fixed-size
+ring, so memory is bounded per level whatever the session length.
+
+A click updates one entry per level (the open bucket, or a new one), O(1).
+A query picks the finest level whose points in the requested range fit the
+caller's budget (the graph passes its pixel width), so any range from the
+last 30 seconds to the whole session renders at the same cost.
+"""
+
+import math
+
+
+class Ring:
+    """Fixed-capacity buffer with O(1) append and O(1) indexing.
+
+    Entries are mutable [t, n, sum, lo, hi] lists so the newest bucket can
+    be updated in place.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.items = [None] * capacity
+        self.start = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.size
+        return self.items[(self.start + i) % self.capacity]
+
+    def append(self, item) -> None:
+        if self.size < self.capacity:
+            self.items[(self.start + self.size) % self.capacity] = item
+            self.size += 1
+        else:
+            self.items[self.start] = item
+            self.start = (self.start + 1) % self.capacity
+
+    def bisect(self, t: float) -> int:
+        """Index of the first entry with time >= t."""
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self[mid][0] < t:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+
+class CPSTimeline:
+    """The CPS series at per-click resolution plus coarser buckets.
+
+    levels:   bucket widths in seconds, finest first; the per-click level
+              (width 0) always comes before them.
+    capacity: entries kept per level.
+    """
+
+    def __init__(self, levels=(1, 10, 60), capacity=4096):
+        self.widths = (0,) + tuple(levels)
+        self.rings = [Ring(capacity) for _ in self.widths]
+        self.count = 0
+
+    def add(self, t: float, cps: float) -> None:
+        self.rings[0].append([t, 1, cps, cps, cps])
+        for width, ring in zip(self.widths[1:], self.rings[1:]):
+            start = math.floor(t / width) * width
+            last = ring[-1] if len(ring) else None
+            if last is not None and last[0] == start:
+                last[1] += 1
+                last[2] += cps
+                if cps < last[3]:
+                    last[3] = cps
+                if cps > last[4]:
+                    last[4] = cps
+            else:
+                ring.append([start, 1, cps, cps, cps])
+        self.count += 1
+
+    @property
+    def first_t(self):
+        """Earliest time any level still covers, or None when empty."""
+        ring = self.rings[-1]
+        return ring[0][0] if len(ring) else None
+
+    def view(self, t0: float, t1: float, max_points: int):
+        """Points covering [t0, t1] from the finest level that fits.
+
+        Returns (width, [(t, lo, mean, hi), ...]); width is 0 for per-click
+        points. Bucket times are bucket midpoints. A level is only used if
+        it still reaches back to t0 (or it is the coarsest), so a long range
+        never comes back truncated from a fine level that has wrapped.
+        """
+        for level, (width, ring) in enumerate(zip(self.widths, self.rings)):
+            if not len(ring):
+                return width, []
+            coarsest = level == len(self.rings) - 1
+            if ring[0][0] > t0 - width and not coarsest and ring.size == ring.capacity:
+                continue
+            i = ring.bisect(t0 - width)
+            j = ring.bisect(t1 + 1e-9)
+            if j - i > max_points and not coarsest:
+                continue
+            i = max(i, j - max_points)
+            half = width / 2.0
+            return width, [(e[0] + half, e[3], e[2] / e[1], e[4])
+                           for e in (ring[k] for k in range(i, j))]
+        return 0, []
+
+    def clear(self) -> None:
+        self.rings = [Ring(r.capacity) for r in self.rings]
+        self.count = 0
@@ -1,4 +1,4 @@
-"""Canvas widgets: live CPS line graph and delay histogram.
+"""Canvas widgets: live CPS line graph, delay histogram and delay heatmap.
 
 Part of Mimic. Split out of the original single-file Mimic.py.
 """
@@ -7,178 +7,334 @@ import math
 import time
 import tkinter as tk
 
+from .heatmap import to_ppm
+
 
 # ═════════════════════════════════════════════════════════════════════════════
 # VISUALIZATION COMPONENTS
 # ═════════════════════════════════════════════════════════════════════════════
 
 class CPSLineGraph:
-    """Real-time CPS line graph visualization"""
+    """Real-time CPS line graph visualization
+
+    Retained mode: axes, grid, zone and labels are created once and the
+    line and readout are moved with coords()/itemconfig() afterwards. A
+    refresh whose visible data matches the last one drawn touches Tk not at
+    all. invalidate() forces a full rebuild on the next draw.
+
+    draw_timeline() plots the engine's CPSTimeline over the zoom span,
+    using whichever resolution fits the plot width, with a min/max band
+    when the points are buckets.
+    """
+    
+    TIME_WINDOW = 30  # seconds shown by default, and the least "All" shows
+    GRID_STEP = 3     # CPS between grid lines
+    # (button label, seconds shown); None shows the whole session
+    ZOOM_LEVELS = (("30s", 30), ("5m", 300), ("30m", 1800), ("All", None))
     
     def __init__(self, parent, width=600, height=200):
         self.canvas = tk.Canvas(parent, width=width, height=height, bg="#1a1a1a", highlightthickness=0)
         self.width = width
         self.height = height
         self.padding = 40
+        self.items = None
+        self._drawn = None
+        self._scale = None
+        self._waiting = None
+        self.zoom = self.TIME_WINDOW
     
-    def draw_graph(self, cps_data, timestamps):
-        """Draw CPS line graph"""
+    def invalidate(self):
+        """Drop every item; the next draw_timeline() rebuilds from scratch"""
         self.canvas.delete("all")
+        self.items = None
+        self._drawn = None
+        self._scale = None
+        self._waiting = None
+    
+    def _y(self, cps, max_cps):
+        return self.height - self.padding - (cps / max_cps) * (self.height - 2 * self.padding)
+    
+    def _build(self):
+        c = self.canvas
+        right = self.width - 20
+        bottom = self.height - self.padding
+        # Stacking order matters: grid and zone under the line, readout on top.
+        self.items = {
+            'x_axis': c.create_line(self.padding, bottom, right, bottom, fill="#333333", width=2),
+            'y_axis': c.create_line(self.padding, self.padding, self.padding, bottom,
+                                    fill="#333333", width=2),
+            'grid': [],
+            'zone': c.create_rectangle(self.padding, 0, right, 0,
+                                       fill="#1b5e20", outline="", stipple="gray50"),
+            'band': c.create_polygon(0, 0, 0, 0, 0, 0, fill="#2e7d32", outline="",
+                                     stipple="gray25", state="hidden"),
+            'line': c.create_line(0, 0, 0, 0, fill="#4CAF50", width=2, smooth=True,
+                                  state="hidden"),
+            'readout': c.create_text(self.width - 30, self.padding, text="", fill="#4CAF50",
+                                     font=("Arial", 12, "bold"), anchor="ne"),
+            'waiting': c.create_text(self.width // 2, self.height // 2, text="Waiting for data...",
+                                     fill="#888888", font=("Arial", 10), state="hidden"),
+            'span': c.create_text(self.padding, bottom + 12, text="", fill="#666666",
+                                  font=("Arial", 8), anchor="w"),
+        }
+    
+    def _set_scale(self, max_cps):
+        """Reposition grid, grid labels and zone for a new y-axis maximum"""
+        c = self.canvas
+        right = self.width - 20
+        grid = self.items['grid']
+        levels = list(range(0, int(max_cps) + 1, self.GRID_STEP))
+        while len(grid) < len(levels):
+            line = c.create_line(0, 0, 0, 0, fill="#2a2a2a", dash=(2, 4))
+            label = c.create_text(0, 0, text="", fill="#666666", font=("Arial", 8), anchor="e")
+            c.tag_lower(line, self.items['zone'])
+            c.tag_lower(label, self.items['zone'])
+            grid.append((line, label))
+        for i, (line, label) in enumerate(grid):
+            if i < len(levels):
+                y = self._y(levels[i], max_cps)
+                c.coords(line, self.padding, y, right, y)
+                c.coords(label, self.padding - 10, y)
+                c.itemconfig(line, state="normal")
+                c.itemconfig(label, text=str(levels[i]), state="normal")
+            else:
+                c.itemconfig(line, state="hidden")
+                c.itemconfig(label, state="hidden")
         
-        if len(cps_data) < 2:
-            self.canvas.create_text(
-                self.width // 2, self.height // 2,
-                text="Waiting for data...",
-                fill="#888888",
-                font=("Arial", 10)
-            )
+        # Optimal zone (7-12 CPS)
+        c.coords(self.items['zone'], self.padding, self._y(12, max_cps), right, self._y(7, max_cps))
+        self._scale = max_cps
+    
+    def _show_waiting(self, waiting):
+        if waiting == self._waiting:
             return
+        c = self.canvas
+        c.itemconfig(self.items['waiting'], state="normal" if waiting else "hidden")
+        c.itemconfig(self.items['line'], state="hidden" if waiting else "normal")
+        if waiting:
+            c.itemconfig(self.items['readout'], text="")
+            c.itemconfig(self.items['band'], state="hidden")
+        self._waiting = waiting
+    
+    def set_zoom(self, span):
+        """Seconds shown by draw_timeline(); None for the whole session"""
+        self.zoom = span
+        self._drawn = None
+    
+    def draw_timeline(self, timeline, now=None):
+        """Draw a CPSTimeline over the zoom span (no-op if nothing changed)"""
+        now = time.time() if now is None else now
+        key = ('timeline', self.zoom, timeline.count)
+        if self.items is not None and key == self._drawn:
+            return False
+        if self.items is None:
+            self._build()
+        self._drawn = key
         
-        # Calculate bounds
-        current_time = time.time()
-        time_window = 30  # 30 second window
+        span = self.zoom
+        if span is None:
+            first = timeline.first_t
+            span = max(self.TIME_WINDOW, now - first) if first is not None else self.TIME_WINDOW
+        t0 = now - span
+        plot_w = self.width - self.padding - 20
+        width, points = timeline.view(t0, now, plot_w)
         
-        # Filter to last 30 seconds
-        visible_data = []
-        visible_times = []
-        for i, t in enumerate(timestamps):
-            if current_time - t <= time_window:
-                visible_data.append(cps_data[i])
-                visible_times.append(t)
+        c = self.canvas
+        label = next((name for name, s in self.ZOOM_LEVELS if s == self.zoom), f"{span:.0f}s")
+        c.itemconfig(self.items['span'],
+                     text=f"{label} · {'per click' if width == 0 else f'{width}s buckets'}")
         
-        if len(visible_data) < 2:
-            return
+        if len(points) < 2:
+            self._show_waiting(True)
+            return True
+        
+        max_cps = max(max(p[3] for p in points), 15)
+        if max_cps != self._scale:
+            self._set_scale(max_cps)
+        
+        def x_of(t):
+            return self.padding + max(0.0, t - t0) / span * plot_w
+        
+        line = []
+        for t, lo, mean, hi in points:
+            line.append(x_of(t))
+            line.append(self._y(mean, max_cps))
+        c.coords(self.items['line'], *line)
+        c.itemconfig(self.items['line'], smooth=width == 0)
+        self._show_waiting(False)
         
-        max_cps = max(max(visible_data), 15)
-        min_cps = 0
-        
-        # Draw axes
-        self.canvas.create_line(
-            self.padding, self.height - self.padding,
-            self.width - 20, self.height - self.padding,
-            fill="#333333", width=2
-        )
-        self.canvas.create_line(
-            self.padding, self.padding,
-            self.padding, self.height - self.padding,
-            fill="#333333", width=2
-        )
-        
-        # Draw horizontal grid lines and labels
-        for i in range(0, int(max_cps) + 1, 3):
-            y = self.height - self.padding - (i / max_cps) * (self.height - 2 * self.padding)
-            self.canvas.create_line(
-                self.padding, y,
-                self.width - 20, y,
-                fill="#2a2a2a", dash=(2, 4)
-            )
-            self.canvas.create_text(
-                self.padding - 10, y,
-                text=str(i),
-                fill="#666666",
-                font=("Arial", 8),
-                anchor="e"
-            )
-        
-        # Draw optimal zone (7-12 CPS)
-        y_7 = self.height - self.padding - (7 / max_cps) * (self.height - 2 * self.padding)
-        y_12 = self.height - self.padding - (12 / max_cps) * (self.height - 2 * self.padding)
-        
-        self.canvas.create_rectangle(
-            self.padding, y_12,
-            self.width - 20, y_7,
-            fill="#1b5e20", outline="", stipple="gray50"
-        )
-        
-        # Draw CPS line
-        points = []
-        for i, cps in enumerate(visible_data):
-            x = self.padding + (i / (len(visible_data) - 1)) * (self.width - self.padding - 20)
-            y = self.height - self.padding - (cps / max_cps) * (self.height - 2 * self.padding)
-            points.extend([x, y])
-        
-        if len(points) >= 4:
-            self.canvas.create_line(
-                points,
-                fill="#4CAF50",
-                width=2,
-                smooth=True
-            )
-        
-        # Draw current CPS indicator
-        if visible_data:
-            current_cps = visible_data[-1]
-            self.canvas.create_text(
-                self.width - 30, self.padding,
-                text=f"{current_cps:.1f}",
-                fill="#4CAF50",
-                font=("Arial", 12, "bold"),
-                anchor="ne"
-            )
+        if width:
+            upper = [v for t, lo, mean, hi in points for v in (x_of(t), self._y(hi, max_cps))]
+            lower = [v for t, lo, mean, hi in reversed(points) for v in (x_of(t), self._y(lo, max_cps))]
+            c.coords(self.items['band'], *upper, *lower)
+            c.itemconfig(self.items['band'], state="normal")
+        else:
+            c.itemconfig(self.items['band'], state="hidden")
+        
+        c.itemconfig(self.items['readout'], text=f"{points[-1][2]:.1f}")
+        return True
     
     def pack(self, **kwargs):
         self.canvas.pack(**kwargs)
 
 
 class HistogramCanvas:
-    """Click delay distribution histogram"""
+    """Click delay distribution histogram
+
+    Retained mode, like CPSLineGraph: the axes, a fixed pool of bars, the
+    mean line and the range labels exist once and are moved in place. Bars
+    whose geometry and colour are unchanged are not touched, and a refresh
+    with no new delays returns before binning. Bars may differ in width:
+    draw_counts() merges fixed engine bins, which need not divide evenly.
+    """
+    
+    NUM_BINS = 20
     
     def __init__(self, parent, width=600, height=250):
         self.canvas = tk.Canvas(parent, width=width, height=height, bg="#1a1a1a", highlightthickness=0)
         self.width = width
         self.height = height
         self.padding = 40
+        self.items = None
+        self._key = None
+        self._bars = None
+        self._waiting = None
     
-    def draw_histogram(self, delays, mean, std_dev, enhanced_mode):
-        """Draw delay distribution histogram"""
+    def invalidate(self):
+        """Drop every item; the next draw_histogram() rebuilds from scratch"""
         self.canvas.delete("all")
-        
-        if len(delays) < 10:
-            self.canvas.create_text(
-                self.width // 2, self.height // 2,
-                text="Need more clicks...",
-                fill="#888888",
-                font=("Arial", 10)
-            )
+        self.items = None
+        self._key = None
+        self._bars = None
+        self._waiting = None
+    
+    def _build(self):
+        c = self.canvas
+        right = self.width - 20
+        bottom = self.height - self.padding
+        self.items = {
+            'x_axis': c.create_line(self.padding, bottom, right, bottom, fill="#333333", width=2),
+            'y_axis': c.create_line(self.padding, self.padding, self.padding, bottom,
+                                    fill="#333333", width=2),
+            'bars': [c.create_rectangle(0, 0, 0, 0, fill="#4CAF50", outline="", state="hidden")
+                     for _ in range(self.NUM_BINS)],
+            'mean': c.create_line(0, 0, 0, 0, fill="#4CAF50", width=2, dash=(4, 4),
+                                  state="hidden"),
+            'min_label': c.create_text(self.padding, bottom + 20, text="",
+                                       fill="#666666", font=("Arial", 8)),
+            'max_label': c.create_text(right, bottom + 20, text="",
+                                       fill="#666666", font=("Arial", 8)),
+            'waiting': c.create_text(self.width // 2, self.height // 2, text="Need more clicks...",
+                                     fill="#888888", font=("Arial", 10), state="hidden"),
+        }
+        # Last (coords, colour) pushed to each bar; None = hidden.
+        self._bars = [None] * self.NUM_BINS
+    
+    def _set_bar(self, i, geometry):
+        if geometry == self._bars[i]:
             return
+        bar = self.items['bars'][i]
+        if geometry is None:
+            self.canvas.itemconfig(bar, state="hidden")
+        else:
+            coords, color = geometry
+            self.canvas.coords(bar, *coords)
+            if self._bars[i] is None:
+                self.canvas.itemconfig(bar, fill=color, state="normal")
+            elif self._bars[i][1] != color:
+                self.canvas.itemconfig(bar, fill=color)
+        self._bars[i] = geometry
+    
+    def _show_waiting(self, waiting):
+        if waiting == self._waiting:
+            return
+        c = self.canvas
+        c.itemconfig(self.items['waiting'], state="normal" if waiting else "hidden")
+        c.itemconfig(self.items['mean'], state="hidden" if waiting else "normal")
+        self._waiting = waiting
+        if waiting:
+            for i in range(self.NUM_BINS):
+                self._set_bar(i, None)
+            c.itemconfig(self.items['min_label'], text="")
+            c.itemconfig(self.items['max_label'], text="")
+    
+    def draw_histogram(self, delays, mean, std_dev, enhanced_mode):
+        """Draw delay distribution histogram (no-op if nothing has changed)
+
+        Bins the raw delays itself; the engine's own histograms are drawn
+        with draw_counts(), which does not depend on how many are retained.
+        """
+        # delays is append-only (a list or bounded deque), so its length and
+        # end values identify its contents well enough to skip a rebin.
+        n = len(delays)
+        key = (n, delays[0] if n else None, delays[-1] if n else None, mean, enhanced_mode)
+        if self.items is not None and key == self._key:
+            return False
+        self._key = key
+        
+        if n < 10:
+            return self._render([], [], mean, enhanced_mode)
         
         # Create bins
         min_delay = min(delays)
         max_delay = max(delays)
-        num_bins = 20
+        num_bins = self.NUM_BINS
         bin_width = (max_delay - min_delay) / num_bins
         
         bins = [0] * num_bins
-        for delay in delays:
-            bin_idx = min(int((delay - min_delay) / bin_width), num_bins - 1)
-            bins[bin_idx] += 1
-        
-        max_count = max(bins)
-        
-        # Draw axes
-        self.canvas.create_line(
-            self.padding, self.height - self.padding,
-            self.width - 20, self.height - self.padding,
-            fill="#333333", width=2
-        )
-        self.canvas.create_line(
-            self.padding, self.padding,
-            self.padding, self.height - self.padding,
-            fill="#333333", width=2
-        )
+        if bin_width > 0:
+            for delay in delays:
+                bin_idx = min(int((delay - min_delay) / bin_width), num_bins - 1)
+                bins[bin_idx] += 1
+        else:
+            bins[0] = n
+        
+        edges = [min_delay + i * bin_width for i in range(num_bins + 1)]
+        return self._render(edges, bins, mean, enhanced_mode)
+    
+    def draw_counts(self, hist, mean, enhanced_mode):
+        """Draw an engine-maintained IncrementalHistogram (see mimic.histogram)
+
+        Costs O(bins) whatever the click count, and nothing at all if the
+        histogram has not changed since the last draw.
+        """
+        key = (id(hist), hist.version, mean, enhanced_mode)
+        if self.items is not None and key == self._key:
+            return False
+        self._key = key
+        edges, counts = hist.rebin(self.NUM_BINS)
+        return self._render(edges, counts, mean, enhanced_mode)
+    
+    def _render(self, edges, counts, mean, enhanced_mode):
+        """Push bars for bins [edges[i], edges[i+1]) to the canvas"""
+        if self.items is None:
+            self._build()
+        
+        if sum(counts) < 10:
+            self._show_waiting(True)
+            return True
+        
+        min_delay, max_delay = edges[0], edges[-1]
+        span = max_delay - min_delay
+        plot_width = self.width - self.padding - 20
+        
+        def x_of(delay):
+            return self.padding + (((delay - min_delay) / span) if span else 0.5) * plot_width
+        
+        max_count = max(counts)
         
         # Danger zones
         ideal_min = 60 if enhanced_mode else 80
         ideal_max = 150 if enhanced_mode else 130
         
-        # Draw bars
-        bar_width = (self.width - self.padding - 20) / num_bins
-        
-        for i, count in enumerate(bins):
+        # Bars
+        for i in range(self.NUM_BINS):
+            count = counts[i] if i < len(counts) else 0
             if count == 0:
+                self._set_bar(i, None)
                 continue
             
-            bin_delay = min_delay + (i + 0.5) * bin_width
+            bin_delay = (edges[i] + edges[i + 1]) / 2
             
             # Color based on delay range
             if ideal_min <= bin_delay <= ideal_max:
@@ -186,37 +342,97 @@ class HistogramCanvas:
             else:
                 color = "#FFA500"  # Acceptable
             
-            x1 = self.padding + i * bar_width
+            x1 = x_of(edges[i])
             y1 = self.height - self.padding - (count / max_count) * (self.height - 2 * self.padding)
-            x2 = x1 + bar_width - 2
+            x2 = x_of(edges[i + 1]) - 2
             y2 = self.height - self.padding
-            
-            self.canvas.create_rectangle(
-                x1, y1, x2, y2,
-                fill=color, outline=""
-            )
-        
-        # Draw mean line
-        mean_x = self.padding + ((mean - min_delay) / (max_delay - min_delay)) * (self.width - self.padding - 20)
-        self.canvas.create_line(
-            mean_x, self.padding,
-            mean_x, self.height - self.padding,
-            fill="#4CAF50", width=2, dash=(4, 4)
-        )
+            self._set_bar(i, ((round(x1, 1), round(y1, 1), round(x2, 1), round(y2, 1)), color))
+        
+        # Mean line
+        mean_x = x_of(mean)
+        self.canvas.coords(self.items['mean'], mean_x, self.padding, mean_x, self.height - self.padding)
+        self._show_waiting(False)
         
         # Labels
-        self.canvas.create_text(
-            self.padding, self.height - self.padding + 20,
-            text=f"{min_delay:.0f}ms",
-            fill="#666666",
-            font=("Arial", 8)
-        )
-        self.canvas.create_text(
-            self.width - 20, self.height - self.padding + 20,
-            text=f"{max_delay:.0f}ms",
-            fill="#666666",
-            font=("Arial", 8)
-        )
+        self.canvas.itemconfig(self.items['min_label'], text=f"{min_delay:.0f}ms")
+        self.canvas.itemconfig(self.items['max_label'], text=f"{max_delay:.0f}ms")
+        return True
+    
+    def pack(self, **kwargs):
+        self.canvas.pack(**kwargs)
+
+
+class HeatmapCanvas:
+    """Delay-versus-click-number heatmap (see mimic.heatmap)
+
+    The plot is a single PhotoImage item. Each refresh re-renders the
+    engine's DelayHeatmap to an RGB array and replaces the image data in
+    one call, so the Tk cost does not grow with the number of cells or
+    clicks. Axis labels are the only other items and are retained.
+    """
+    
+    def __init__(self, parent, width=600, height=250):
+        self.canvas = tk.Canvas(parent, width=width, height=height, bg="#1a1a1a", highlightthickness=0)
+        self.width = width
+        self.height = height
+        self.padding = 40
+        self.plot_w = width - self.padding - 20
+        self.plot_h = height - 2 * self.padding
+        self.items = None
+        self.photo = None
+        self._key = None
+    
+    def invalidate(self):
+        """Drop every item; the next draw_heatmap() rebuilds from scratch"""
+        self.canvas.delete("all")
+        self.items = None
+        self.photo = None
+        self._key = None
+    
+    def _build(self):
+        c = self.canvas
+        bottom = self.height - self.padding
+        self.photo = tk.PhotoImage(width=self.plot_w, height=self.plot_h)
+        self.items = {
+            'image': c.create_image(self.padding, self.padding, image=self.photo, anchor="nw",
+                                    state="hidden"),
+            'y_hi': c.create_text(self.padding - 5, self.padding, text="", fill="#666666",
+                                  font=("Arial", 8), anchor="e"),
+            'y_lo': c.create_text(self.padding - 5, bottom, text="", fill="#666666",
+                                  font=("Arial", 8), anchor="e"),
+            'x_lo': c.create_text(self.padding, bottom + 12, text="1", fill="#666666",
+                                  font=("Arial", 8), anchor="w"),
+            'x_hi': c.create_text(self.width - 20, bottom + 12, text="", fill="#666666",
+                                  font=("Arial", 8), anchor="e"),
+            'axis': c.create_text(self.width // 2, bottom + 12, text="click # →   delay (ms) ↑",
+                                  fill="#666666", font=("Arial", 8)),
+            'waiting': c.create_text(self.width // 2, self.height // 2, text="Need more clicks...",
+                                     fill="#888888", font=("Arial", 10), state="hidden"),
+        }
+    
+    def draw_heatmap(self, heatmap):
+        """Render a DelayHeatmap (no-op if it has not changed)"""
+        key = (id(heatmap), heatmap.version)
+        if self.items is not None and key == self._key:
+            return False
+        if self.items is None:
+            self._build()
+            c = self.canvas
+            c.itemconfig(self.items['y_hi'], text=f"{heatmap.hi:.0f}+")
+            c.itemconfig(self.items['y_lo'], text=f"{heatmap.lo:.0f}")
+        self._key = key
+        
+        c = self.canvas
+        waiting = heatmap.total < 2
+        c.itemconfig(self.items['waiting'], state="normal" if waiting else "hidden")
+        c.itemconfig(self.items['image'], state="hidden" if waiting else "normal")
+        if waiting:
+            return True
+        
+        rgb = heatmap.to_rgb(self.plot_w, self.plot_h)
+        self.photo.configure(data=to_ppm(rgb), format="PPM")
+        c.itemconfig(self.items['x_hi'], text=f"{heatmap.total:,}")
+        return True
     
     def pack(self, **kwargs):
         self.canvas.pack(**kwargs)